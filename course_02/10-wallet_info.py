@@ -13,7 +13,15 @@ r'''
 
 from bit import PrivateKeyTestnet
 from datetime import datetime
-import requests
+from itertools import islice
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "course_05"))
+
+from tools.http_session import get_client
+from tools.async_fetcher import stats_to_balance
+from tools.tx_history import iter_address_txs, CHAIN_PAGE_SIZE
 
 def format_btc(value):
     """将科学计数法转换为8位小数格式"""
@@ -23,25 +31,24 @@ class BitcoinAddressInfo:
     def __init__(self):
         # 使用 mempool.space 的测试网 API
         self.base_url = "https://mempool.space/testnet/api"
+        # 共享连接池，带超时、重试和限速
+        self.client = get_client()
     
     def get_address_info(self, address):
         """获取地址基本信息"""
         try:
-            # 获取地址信息
-            response = requests.get(f"{self.base_url}/address/{address}")
+            # 获取地址信息 (余额和UTXO数量由统计信息直接计算，不再单独请求UTXO列表)
+            response = self.client.get(f"{self.base_url}/address/{address}")
             if response.status_code == 200:
                 data = response.json()
-                
-                # 获取 UTXO 信息
-                utxos_response = requests.get(f"{self.base_url}/address/{address}/utxo")
-                utxos = utxos_response.json() if utxos_response.status_code == 200 else []
+                balance = stats_to_balance(data)
                 
                 return {
-                    'balance': sum(utxo.get('value', 0) for utxo in utxos) / 1e8,
+                    'balance': balance['total'] / 1e8,
                     'tx_count': data.get('chain_stats', {}).get('tx_count', 0),
                     'funded_txo_count': data.get('chain_stats', {}).get('funded_txo_count', 0),
                     'spent_txo_count': data.get('chain_stats', {}).get('spent_txo_count', 0),
-                    'utxo_count': len(utxos)
+                    'utxo_count': balance['utxo_count']
                 }
             return None
         except Exception as e:
@@ -51,7 +58,7 @@ class BitcoinAddressInfo:
     def get_address_utxos(self, address):
         """获取地址的UTXO信息"""
         try:
-            response = requests.get(f"{self.base_url}/address/{address}/utxo")
+            response = self.client.get(f"{self.base_url}/address/{address}/utxo")
             if response.status_code == 200:
                 utxos = []
                 for utxo in response.json():
@@ -67,24 +74,29 @@ class BitcoinAddressInfo:
             print(f"获取UTXO信息出错: {e}")
             return None
 
+    @staticmethod
+    def _tx_info(tx):
+        """交易JSON转换为显示用的字段 (读取每页时转换，不保留完整JSON)"""
+        return {
+            'txid': tx.get('txid'),
+            'block_height': tx.get('status', {}).get('block_height', 'unconfirmed'),
+            'confirmed': tx.get('status', {}).get('confirmed', False),
+            'fee': tx.get('fee', 0) / 1e8,
+            'size': tx.get('size', 0),
+            'time': tx.get('status', {}).get('block_time')
+        }
+    
+    def iter_transaction_history(self, address):
+        """逐页读取地址的全部交易历史 (生成器，消费到哪一页才请求哪一页)"""
+        return iter_address_txs(address, self.base_url, transform=self._tx_info)
+    
     def get_transaction_history(self, address, limit=10):
-        """获取地址的交易历史"""
+        """获取地址的交易历史，limit为None时读取全部"""
         try:
-            response = requests.get(f"{self.base_url}/address/{address}/txs")
-            if response.status_code == 200:
-                txs = []
-                for tx in response.json()[:limit]:
-                    tx_info = {
-                        'txid': tx.get('txid'),
-                        'block_height': tx.get('status', {}).get('block_height', 'unconfirmed'),
-                        'confirmed': tx.get('status', {}).get('confirmed', False),
-                        'fee': tx.get('fee', 0) / 1e8,
-                        'size': tx.get('size', 0),
-                        'time': tx.get('status', {}).get('block_time')
-                    }
-                    txs.append(tx_info)
-                return txs
-            return None
+            # 只需要第一页时不预取下一页
+            prefetch = limit is None or limit > CHAIN_PAGE_SIZE
+            txs = iter_address_txs(address, self.base_url, prefetch=prefetch, transform=self._tx_info)
+            return list(islice(txs, limit))
         except Exception as e:
             print(f"获取交易历史出错: {e}")
             return None
@@ -2,9 +2,16 @@ from bitcoinutils.setup import setup
 from bitcoinutils.utils import to_satoshis
 from bitcoinutils.transactions import Transaction, TxInput, TxOutput, TxWitnessInput
 from bitcoinutils.keys import PrivateKey, P2trAddress
+import os
+import sys
+import math
 import requests
 from typing import Tuple, List, Dict
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "course_05"))
+
+from utils.tx_size import estimate_vsize
+
 def get_utxos(address: str, min_value: int = 600) -> List[Dict]:
     """获取地址的UTXO列表"""
     url = f"https://mempool.space/testnet/api/address/{address}/utxo"
@@ -105,11 +112,14 @@ def create_taproot_tx(
         )
     ]
     
-    # 创建交易
-    tx = Transaction(tx_inputs, tx_outputs, has_segwit=True)
-    
     # 估算费用,这里很重要，上节课有同学问到
-    fee = int(tx.get_vsize() * fee_rate)  
+    # 未签名交易没有见证，也还没有找零输出，用它的大小会少算手续费；
+    # 这里按输入类型和输出脚本直接算出签名后的大小 (Taproot签名固定64字节)，签名一次即可
+    vsize = estimate_vsize(
+        ["p2tr"] * len(tx_inputs),
+        [recipient_address.to_script_pub_key(), sender_address.to_script_pub_key()]
+    )
+    fee = math.ceil(vsize * fee_rate)
     
     # 计算找零金额
     change_amount = total_input - amount_to_send_sats - fee
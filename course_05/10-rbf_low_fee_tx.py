@@ -3,6 +3,7 @@ from bitcoinutils.utils import to_satoshis
 from bitcoinutils.transactions import Transaction, TxInput, TxOutput, TxWitnessInput
 from bitcoinutils.keys import PrivateKey, P2trAddress
 from tools.utxo_scanner import get_utxos
+from utils.taproot_signing import TaprootSigningContext
 from typing import Tuple, List, Dict
 import logging
 
@@ -112,14 +113,10 @@ def create_rbf_tx(
     # 创建交易
     tx = Transaction(tx_inputs, tx_outputs, has_segwit=True)
     
-    # 签名每个输入
+    # 签名每个输入 (交易级的sighash摘要只计算一次)
+    signing_context = TaprootSigningContext(tx, input_scripts, input_amounts)
     for i in range(len(tx_inputs)):
-        sig = sender_key.sign_taproot_input(
-            tx,
-            i,
-            input_scripts,
-            input_amounts
-        )
+        sig = signing_context.sign(sender_key, i)
         tx.witnesses.append(TxWitnessInput([sig]))
     
     # 获取签名后的交易
@@ -180,10 +177,12 @@ def compare_sequence_txid(
     tx1 = Transaction(tx_inputs1, tx_outputs, has_segwit=True)
     # RBF nSequence交易
     tx2 = Transaction(tx_inputs2, tx_outputs, has_segwit=True)
-    # 签名
+    # 签名 (两笔交易的sequence不同，各自一个签名上下文)
+    context1 = TaprootSigningContext(tx1, input_scripts, input_amounts)
+    context2 = TaprootSigningContext(tx2, input_scripts, input_amounts)
     for i in range(len(tx_inputs1)):
-        sig1 = sender_key.sign_taproot_input(tx1, i, input_scripts, input_amounts)
-        sig2 = sender_key.sign_taproot_input(tx2, i, input_scripts, input_amounts)
+        sig1 = context1.sign(sender_key, i)
+        sig2 = context2.sign(sender_key, i)
         tx1.witnesses.append(TxWitnessInput([sig1]))
         tx2.witnesses.append(TxWitnessInput([sig2]))
     print("\n=== nSequence = 0xffffffff (默认, 不支持RBF) ===")
@@ -3,6 +3,7 @@ from bitcoinutils.utils import to_satoshis
 from bitcoinutils.transactions import Transaction, TxInput, TxOutput, TxWitnessInput
 from bitcoinutils.keys import PrivateKey, P2trAddress
 from typing import Tuple, List, Dict
+from utils.taproot_signing import TaprootSigningContext
 import logging
 
 # 配置日志
@@ -96,14 +97,10 @@ def create_replacement_tx(
     # 创建交易
     tx = Transaction(tx_inputs, tx_outputs, has_segwit=True)
     
-    # 签名每个输入
+    # 签名每个输入 (交易级的sighash摘要只计算一次)
+    signing_context = TaprootSigningContext(tx, input_scripts, input_amounts)
     for i in range(len(tx_inputs)):
-        sig = sender_key.sign_taproot_input(
-            tx,
-            i,
-            input_scripts,
-            input_amounts
-        )
+        sig = signing_context.sign(sender_key, i)
         tx.witnesses.append(TxWitnessInput([sig]))
     
     # 获取签名后的交易
@@ -101,6 +101,7 @@ from bitcoinutils.utils import to_satoshis
 from bitcoinutils.transactions import Transaction, TxInput, TxOutput, TxWitnessInput
 from bitcoinutils.keys import P2pkhAddress, P2wpkhAddress, P2trAddress, PrivateKey
 from bitcoinutils.script import Script
+from utils.taproot_signing import TaprootSigningContext
 
 def main():
     # 设置测试网
@@ -191,12 +192,13 @@ def main():
     txin_segwit.script_sig = Script([])
     
     # 3. 签名 Taproot 输入 - 关键是提供所有输入的脚本和金额
-    taproot_sig = taproot_private_key.sign_taproot_input(
+    # 签名上下文对整笔交易只计算一次所有输入/输出的摘要，有多个Taproot输入时每个输入直接复用
+    taproot_context = TaprootSigningContext(
         tx,
-        2,  # 第三个输入的索引
         all_scripts,  # 所有输入的脚本
         all_amounts   # 所有输入的金额
     )
+    taproot_sig = taproot_context.sign(taproot_private_key, 2)  # 第三个输入的索引
     
     # Taproot 输入的 script_sig 必须为空
     txin_taproot.script_sig = Script([])
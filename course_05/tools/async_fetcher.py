@@ -0,0 +1,204 @@
+"""
+多地址UTXO和余额并发查询工具
+
+用途：
+- 输入任意数量的地址 (可以是生成器)，以有限并发查询每个地址的统计信息和UTXO
+- 结果按完成顺序逐个产出，不必等全部地址查完
+- 每个地址的统计和UTXO两个请求同时发出；余额直接由统计信息计算
+- 查询到的UTXO写入utxo_provider的缓存，之后的get_utxos不再重复请求
+
+HTTP请求通过共享的HttpClient (连接池、重试、限速) 在线程池中执行，
+asyncio负责调度和限制并发数
+
+使用示例：
+from tools.async_fetcher import fetch_addresses
+
+for result in fetch_addresses(["tb1p...", "tb1q..."]):
+    print(result["address"], result["balance"])
+
+本地对比顺序查询和并发查询 (在course_05目录运行):
+python -m tools.async_fetcher
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from tools.http_session import get_client
+from tools.utxo_provider import esplora_base_url, get_provider, make_utxo
+
+DEFAULT_CONCURRENCY = 16
+
+def stats_to_balance(data: Dict) -> Dict:
+    """
+    从Esplora的 /address/<address> 结果计算余额
+
+    Returns:
+        Dict: {"confirmed", "unconfirmed", "total", "tx_count", "utxo_count"}，金额单位为聪
+    """
+    chain = data.get("chain_stats", {})
+    mempool = data.get("mempool_stats", {})
+    confirmed = chain.get("funded_txo_sum", 0) - chain.get("spent_txo_sum", 0)
+    unconfirmed = mempool.get("funded_txo_sum", 0) - mempool.get("spent_txo_sum", 0)
+    return {
+        "confirmed": confirmed,
+        "unconfirmed": unconfirmed,
+        "total": confirmed + unconfirmed,
+        "tx_count": chain.get("tx_count", 0) + mempool.get("tx_count", 0),
+        "utxo_count": (chain.get("funded_txo_count", 0) - chain.get("spent_txo_count", 0)
+                       + mempool.get("funded_txo_count", 0) - mempool.get("spent_txo_count", 0))
+    }
+
+class AsyncAddressFetcher:
+    """以有限并发查询多个地址的统计信息和UTXO"""
+
+    def __init__(self, base_url: Optional[str] = None, concurrency: int = DEFAULT_CONCURRENCY,
+                 include_utxos: bool = True, prime_cache: bool = True):
+        """
+        Args:
+            base_url: Esplora API地址，默认mempool.space (按PROVIDER_CONFIG的网络)
+            concurrency: 同时查询的地址数 (每个地址2个请求，总数不要超过HttpClient的连接池大小)
+            include_utxos: 是否同时查询UTXO列表
+            prime_cache: 是否把查询到的UTXO写入utxo_provider的缓存
+        """
+        self.base_url = (base_url or esplora_base_url()).rstrip("/")
+        self.concurrency = concurrency
+        self.include_utxos = include_utxos
+        self.prime_cache = prime_cache
+        self.client = get_client()
+
+    def _get_json(self, path: str):
+        response = self.client.get(f"{self.base_url}{path}")
+        response.raise_for_status()
+        return response.json()
+
+    async def fetch_address(self, address: str, executor: ThreadPoolExecutor) -> Dict:
+        """
+        查询单个地址
+
+        Returns:
+            Dict: {"address", "balance", "stats", "utxos", "error"}
+        """
+        loop = asyncio.get_running_loop()
+        requests_ = [loop.run_in_executor(executor, self._get_json, f"/address/{address}")]
+        if self.include_utxos:
+            requests_.append(loop.run_in_executor(executor, self._get_json, f"/address/{address}/utxo"))
+
+        try:
+            responses = await asyncio.gather(*requests_)
+        except Exception as e:
+            return {"address": address, "balance": None, "stats": None, "utxos": None, "error": str(e)}
+
+        utxos = None
+        if self.include_utxos:
+            utxos = [
+                make_utxo(
+                    u["txid"], u["vout"], u["value"], address, "mempool",
+                    confirmed=u.get("status", {}).get("confirmed", False),
+                    block_height=u.get("status", {}).get("block_height")
+                )
+                for u in responses[1]
+            ]
+            if self.prime_cache:
+                get_provider().prime(address, utxos)
+
+        return {
+            "address": address,
+            "balance": stats_to_balance(responses[0]),
+            "stats": responses[0],
+            "utxos": utxos,
+            "error": None
+        }
+
+    async def stream(self, addresses: Iterable[str]) -> AsyncIterator[Dict]:
+        """
+        按完成顺序逐个产出查询结果
+
+        地址按需从iterable中读取，同一时间最多concurrency个地址在查询中
+        """
+        queue = asyncio.Queue()
+        address_iter = iter(addresses)
+        done = object()
+
+        # 每个地址最多2个并发请求
+        with ThreadPoolExecutor(max_workers=self.concurrency * 2) as executor:
+            async def worker():
+                for address in address_iter:
+                    await queue.put(await self.fetch_address(address, executor))
+                await queue.put(done)
+
+            workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+            finished = 0
+            try:
+                while finished < len(workers):
+                    result = await queue.get()
+                    if result is done:
+                        finished += 1
+                    else:
+                        yield result
+            finally:
+                for task in workers:
+                    task.cancel()
+
+def fetch_addresses(addresses: Iterable[str], concurrency: int = DEFAULT_CONCURRENCY,
+                    include_utxos: bool = True, base_url: Optional[str] = None) -> List[Dict]:
+    """
+    同步接口：并发查询全部地址，返回结果列表 (按完成顺序)
+    """
+    fetcher = AsyncAddressFetcher(base_url, concurrency, include_utxos)
+
+    async def collect():
+        return [result async for result in fetcher.stream(addresses)]
+
+    return asyncio.run(collect())
+
+def _run_local_benchmark(address_count: int = 200, latency: float = 0.05, concurrency: int = DEFAULT_CONCURRENCY):
+    """用本地模拟的Esplora服务 (每个请求固定延迟) 对比顺序查询和并发查询"""
+    import json
+    import threading
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path.endswith("/utxo"):
+                data = [{"txid": "11" * 32, "vout": 0, "value": 10000, "status": {"confirmed": True, "block_height": 1}}]
+            else:
+                data = {"chain_stats": {"funded_txo_count": 1, "funded_txo_sum": 10000, "spent_txo_count": 0,
+                                        "spent_txo_sum": 0, "tx_count": 1}, "mempool_stats": {}}
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    addresses = [f"addr{i}" for i in range(address_count)]
+    client = get_client()
+
+    print(f"=== {address_count} 个地址, 模拟延迟 {latency * 1000:.0f}ms ===")
+    start = time.perf_counter()
+    for address in addresses:
+        client.get(f"{base_url}/address/{address}").json()
+        client.get(f"{base_url}/address/{address}/utxo").json()
+    sequential = time.perf_counter() - start
+    print(f"顺序查询: {sequential:.2f}s")
+
+    start = time.perf_counter()
+    results = fetch_addresses(addresses, concurrency=concurrency, base_url=base_url)
+    concurrent = time.perf_counter() - start
+    print(f"并发查询 (并发 {concurrency}): {concurrent:.2f}s, {len(results)} 个结果")
+    print(f"加速: {sequential / concurrent:.1f}x")
+    server.shutdown()
+
+if __name__ == "__main__":
+    _run_local_benchmark()
@@ -0,0 +1,128 @@
+"""
+共享的HTTP客户端
+
+用途：
+- 所有访问mempool.space、blockstream、ord等HTTP接口的代码共用一个连接池 (keep-alive)
+- 统一的超时设置，避免请求永久挂起
+- 遇到429/5xx和连接错误时按指数退避+随机抖动重试，并遵守Retry-After
+- 按主机限速，批量任务不会因为请求过快被公共API限流
+
+使用示例：
+from tools.http_session import get_client
+
+response = get_client().get("https://mempool.space/testnet/api/blocks/tip/height")
+"""
+
+import time
+import random
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 默认配置
+HTTP_CONFIG = {
+    "timeout": 10,          # 默认超时（秒）
+    "retries": 3,           # 429/5xx/连接错误的最大重试次数
+    "backoff": 0.5,         # 第一次重试的基础等待时间（秒），之后每次翻倍
+    "max_backoff": 30,      # 单次等待的上限（秒）
+    "pool_size": 32,        # 每个主机保持的连接数 (不小于并发查询的请求数)
+    "rate_limits": {        # 每个主机每秒最多请求数，未列出的主机不限速
+        "mempool.space": 8,
+        "blockstream.info": 8
+    }
+}
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class RateLimiter:
+    """令牌桶限速器：每秒补充rate个令牌，最多积累burst个"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，令牌不足时等待"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+class HttpClient:
+    """带连接池、重试和按主机限速的HTTP客户端 (线程安全)"""
+
+    def __init__(self, timeout: float = 10, retries: int = 3, backoff: float = 0.5,
+                 max_backoff: float = 30, pool_size: int = 20, rate_limits: Optional[Dict[str, float]] = None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.limiters = {host: RateLimiter(rate) for host, rate in (rate_limits or {}).items()}
+
+    def _wait_time(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Retry-After优先，否则指数退避 + 全抖动"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        发送请求，429/5xx和连接错误自动重试
+
+        Args:
+            retry_status: 需要重试的状态码，默认RETRY_STATUS (JSON-RPC等用500表示业务错误的接口需要去掉500)
+
+        Returns:
+            requests.Response: 最后一次的响应 (重试用完后仍可能是429/5xx，由调用方检查)
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        retry_status = kwargs.pop("retry_status", RETRY_STATUS)
+        limiter = self.limiters.get(urlsplit(url).hostname)
+
+        for attempt in range(self.retries + 1):
+            if limiter:
+                limiter.acquire()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                time.sleep(self._wait_time(attempt))
+                continue
+
+            if response.status_code not in retry_status or attempt == self.retries:
+                return response
+            time.sleep(self._wait_time(attempt, response))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client() -> HttpClient:
+    """按HTTP_CONFIG创建的进程内共享客户端"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient(**HTTP_CONFIG)
+    return _default_client
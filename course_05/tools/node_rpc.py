@@ -0,0 +1,133 @@
+"""
+比特币节点JSON-RPC客户端
+
+用途：
+- 通过共享的HttpClient (连接池、超时) 调用本地节点的RPC
+- 节点返回的RPC错误转换为RPCError，带错误码
+- 批量调用: 多个请求合并为JSON-RPC数组，按batch_size分块，在小线程池中并发发送，
+  查询几千个交易只需要几次往返
+
+使用示例：
+from tools.node_rpc import NodeRPC
+
+rpc = NodeRPC("http://127.0.0.1:18332", "user", "password")
+print(rpc.call("getblockcount"))
+txs = rpc.batch([("gettransaction", [txid]) for txid in txids])
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from tools.http_session import get_client
+
+# 默认配置
+NODE_RPC_CONFIG = {
+    "batch_size": 500,     # 每个JSON-RPC数组最多包含的请求数
+    "batch_workers": 4     # 同时发送的数组数 (节点默认rpcthreads为4)
+}
+
+# 节点用HTTP 500返回RPC错误，不能当作临时错误重试
+RPC_RETRY_STATUS = {429, 502, 503, 504}
+
+class RPCError(Exception):
+    """节点返回的RPC错误"""
+
+    def __init__(self, method: str, code: int, message: str):
+        super().__init__(f"{method} 失败 ({code}): {message}")
+        self.method = method
+        self.code = code
+        self.message = message
+
+class NodeRPC:
+    """比特币节点JSON-RPC客户端 (线程安全)"""
+
+    def __init__(self, url: str, user: str = "", password: str = "", timeout: float = 30):
+        """
+        Args:
+            url: RPC地址，如 http://127.0.0.1:18332 (使用钱包RPC时加上 /wallet/<名称>)
+            user: RPC用户名，为空时不发送认证信息
+            password: RPC密码
+            timeout: 默认超时（秒）
+        """
+        self.url = url
+        self.auth = (user, password) if user else None
+        self.timeout = timeout
+
+    def call(self, method: str, *params, timeout: Optional[float] = None) -> Any:
+        """
+        调用一个RPC方法
+
+        Returns:
+            Any: RPC结果
+
+        Raises:
+            RPCError: 节点返回错误
+        """
+        payload = {"jsonrpc": "1.0", "id": method, "method": method, "params": list(params)}
+        response = get_client().post(
+            self.url, json=payload, auth=self.auth,
+            timeout=timeout or self.timeout, retry_status=RPC_RETRY_STATUS
+        )
+        try:
+            data = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise
+        if data.get("error"):
+            raise RPCError(method, data["error"].get("code", 0), data["error"].get("message", ""))
+        return data["result"]
+
+    def _post_batch(self, calls: List[Tuple[int, str, Sequence]], timeout: Optional[float]) -> List[Tuple[int, Any]]:
+        payload = [
+            {"jsonrpc": "1.0", "id": index, "method": method, "params": list(params)}
+            for index, method, params in calls
+        ]
+        response = get_client().post(
+            self.url, json=payload, auth=self.auth,
+            timeout=timeout or self.timeout, retry_status=RPC_RETRY_STATUS
+        )
+        response.raise_for_status()
+        methods = {index: method for index, method, _ in calls}
+        results = []
+        for item in response.json():
+            if item.get("error"):
+                error = item["error"]
+                results.append((item["id"], RPCError(methods[item["id"]], error.get("code", 0), error.get("message", ""))))
+            else:
+                results.append((item["id"], item["result"]))
+        return results
+
+    def batch(self, calls: Iterable[Tuple[str, Sequence]], raise_errors: bool = True,
+              batch_size: Optional[int] = None, workers: Optional[int] = None,
+              timeout: Optional[float] = None) -> List[Any]:
+        """
+        批量调用RPC
+
+        Args:
+            calls: (方法名, 参数列表) 序列
+            raise_errors: 为True时任意一个请求出错就抛出RPCError，为False时出错的位置返回RPCError对象
+            batch_size: 每个JSON-RPC数组的请求数，默认读取NODE_RPC_CONFIG
+            workers: 同时发送的数组数，默认读取NODE_RPC_CONFIG
+            timeout: 每个数组的超时（秒）
+
+        Returns:
+            List[Any]: 与calls顺序一致的结果
+        """
+        batch_size = batch_size or NODE_RPC_CONFIG["batch_size"]
+        workers = workers or NODE_RPC_CONFIG["batch_workers"]
+        indexed = [(index, method, params) for index, (method, params) in enumerate(calls)]
+        if not indexed:
+            return []
+        chunks = [indexed[i:i + batch_size] for i in range(0, len(indexed), batch_size)]
+
+        results = [None] * len(indexed)
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            for chunk_results in executor.map(lambda chunk: self._post_batch(chunk, timeout), chunks):
+                for index, result in chunk_results:
+                    results[index] = result
+
+        if raise_errors:
+            for result in results:
+                if isinstance(result, RPCError):
+                    raise result
+        return results
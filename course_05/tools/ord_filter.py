@@ -0,0 +1,229 @@
+"""
+铭文/符文UTXO过滤工具
+
+用途：
+- 构建commit等普通交易时，避免选中带有铭文或符文余额的UTXO，把它们当手续费烧掉
+- 用ord服务的 POST /outputs 批量查询 (每次最多batch_size个outpoint)，替代逐个 GET /output/<outpoint>
+- 查询结果按outpoint缓存到本地SQLite: 已被ord索引的输出内容不会再变化，之后不再重复查询
+
+每个UTXO会被标记为:
+    "inscribed"  带有铭文
+    "runes"      带有符文余额
+    "clean"      普通UTXO
+    "unknown"    ord还没有索引 (如未确认的交易)
+    "unavailable" ord查询失败 (服务不可达或报错)，无法确认是否带铭文/符文
+
+只有配置了 PROVIDER_CONFIG["ord_url"] 时get_provider()才启用过滤。ord不可用时默认保留unavailable的
+UTXO并打印警告；会把UTXO花进commit等交易的构建脚本传入 protect_unavailable=True，
+宁可选不到币，也不把可能带铭文的UTXO当手续费烧掉。缓存中已知带铭文/符文的UTXO始终被排除
+
+使用示例：
+from tools.ord_filter import get_output_filter
+
+clean_utxos = get_output_filter().filter(utxos)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from tools.http_session import get_client
+from tools.utxo_provider import PROVIDER_CONFIG
+
+# 默认配置
+ORD_FILTER_CONFIG = {
+    "ord_url": "",                  # 为空时使用PROVIDER_CONFIG["ord_url"]
+    "batch_size": 100,              # 每次POST /outputs的outpoint数
+    "workers": 4,                   # 同时进行的批量查询数
+    "cache_path": os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "persistence", "ord_outputs.sqlite"),
+    "protect": ["inscribed", "runes"],  # 默认排除的标记
+    "protect_unknown": False,       # 是否同时排除ord未索引的UTXO (如自己未确认的找零)
+    "protect_unavailable": False,   # ord查询失败时是否排除无法确认的UTXO (默认保留并警告)
+    "retry_after": 60               # ord查询失败后暂停查询的时间（秒），避免每次取UTXO都等待重试
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ord_outputs (
+    outpoint TEXT PRIMARY KEY,
+    tag TEXT NOT NULL,
+    inscriptions TEXT NOT NULL,
+    runes TEXT NOT NULL
+);
+"""
+
+def outpoint_of(utxo: Dict) -> str:
+    return f"{utxo['txid']}:{utxo['vout']}"
+
+def classify_output(output: Dict) -> str:
+    """根据ord的 /output 结果标记一个输出"""
+    if output.get("inscriptions"):
+        return "inscribed"
+    if output.get("runes"):
+        return "runes"
+    if output.get("indexed") is False:
+        return "unknown"
+    return "clean"
+
+class OrdOutputFilter:
+    """批量查询ord并按outpoint缓存的UTXO标记/过滤器"""
+
+    def __init__(self, base_url: Optional[str] = None, batch_size: int = ORD_FILTER_CONFIG["batch_size"],
+                 workers: int = ORD_FILTER_CONFIG["workers"], cache_path: Optional[str] = ORD_FILTER_CONFIG["cache_path"]):
+        """
+        Args:
+            base_url: ord服务地址，默认读取ORD_FILTER_CONFIG / PROVIDER_CONFIG
+            batch_size: 每次POST /outputs的outpoint数
+            workers: 同时进行的批量查询数
+            cache_path: SQLite缓存路径，为None时只在内存中缓存
+        """
+        self.base_url = (base_url or ORD_FILTER_CONFIG["ord_url"] or PROVIDER_CONFIG["ord_url"]).rstrip("/")
+        self.batch_size = batch_size
+        self.workers = workers
+        self.headers = {"Accept": "application/json"}
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._unavailable_until = 0
+        self.db = None
+        if cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self.db = sqlite3.connect(cache_path, check_same_thread=False)
+            self.db.executescript(SCHEMA)
+
+    def _cached(self, outpoints: List[str]) -> Dict[str, Dict]:
+        with self._lock:
+            found = {o: self._memory[o] for o in outpoints if o in self._memory}
+            missing = [o for o in outpoints if o not in found]
+            if self.db and missing:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self.db.execute(
+                        f"SELECT outpoint, tag, inscriptions, runes FROM ord_outputs WHERE outpoint IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    for outpoint, tag, inscriptions, runes in rows:
+                        record = {"tag": tag, "inscriptions": json.loads(inscriptions), "runes": json.loads(runes)}
+                        self._memory[outpoint] = record
+                        found[outpoint] = record
+        return found
+
+    def _store(self, records: Dict[str, Dict]):
+        """缓存查询结果 (unknown和unavailable不缓存，下次重新查询)"""
+        records = {o: r for o, r in records.items() if r["tag"] not in ("unknown", "unavailable")}
+        with self._lock:
+            self._memory.update(records)
+            if self.db and records:
+                with self.db:
+                    self.db.executemany(
+                        "INSERT OR REPLACE INTO ord_outputs (outpoint, tag, inscriptions, runes) VALUES (?, ?, ?, ?)",
+                        [(o, r["tag"], json.dumps(r["inscriptions"]), json.dumps(r["runes"])) for o, r in records.items()]
+                    )
+
+    def _fetch_batch(self, outpoints: List[str]) -> Dict[str, Dict]:
+        response = get_client().post(f"{self.base_url}/outputs", json=outpoints, headers=self.headers)
+        response.raise_for_status()
+        # 返回结果与请求的outpoint顺序一致
+        return {
+            outpoint: {
+                "tag": classify_output(output),
+                "inscriptions": output.get("inscriptions") or [],
+                "runes": output.get("runes") or {}
+            }
+            for outpoint, output in zip(outpoints, response.json())
+        }
+
+    def lookup(self, outpoints: Iterable[str]) -> Dict[str, Dict]:
+        """
+        查询一组outpoint的标记
+
+        Returns:
+            Dict[str, Dict]: outpoint -> {"tag", "inscriptions", "runes"}，查询失败的outpoint标记为unavailable
+        """
+        outpoints = list(dict.fromkeys(outpoints))
+        results = self._cached(outpoints)
+        missing = [o for o in outpoints if o not in results]
+        if not missing:
+            return results
+
+        unavailable = {"tag": "unavailable", "inscriptions": [], "runes": {}}
+        if time.time() < self._unavailable_until:
+            results.update({o: dict(unavailable) for o in missing})
+            return results
+
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        fetched = {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(batches))) as executor:
+            for batch, future in [(b, executor.submit(self._fetch_batch, b)) for b in batches]:
+                try:
+                    fetched.update(future.result())
+                except Exception as e:
+                    print(f"⚠️ ord查询失败 ({len(batch)} 个outpoint)，{ORD_FILTER_CONFIG['retry_after']}s内不再查询: {e}")
+                    self._unavailable_until = time.time() + ORD_FILTER_CONFIG["retry_after"]
+                    fetched.update({o: dict(unavailable) for o in batch})
+        self._store(fetched)
+        results.update(fetched)
+        return results
+
+    def tag(self, utxos: List[Dict]) -> List[Dict]:
+        """
+        为UTXO记录填写 "ord_tag"、"inscriptions"、"runes" 字段
+
+        ord后端返回的记录已带有铭文和符文信息，不再查询
+        """
+        pending = [u for u in utxos if u.get("source") != "ord"]
+        records = self.lookup(outpoint_of(u) for u in pending) if pending else {}
+        for utxo in utxos:
+            if utxo.get("source") == "ord":
+                utxo["ord_tag"] = classify_output(utxo)
+            else:
+                record = records[outpoint_of(utxo)]
+                utxo["ord_tag"] = record["tag"]
+                utxo["inscriptions"] = record["inscriptions"]
+                utxo["runes"] = record["runes"]
+        return utxos
+
+    def filter(self, utxos: List[Dict], protect: Optional[Iterable[str]] = None,
+               protect_unavailable: Optional[bool] = None) -> List[Dict]:
+        """
+        去掉受保护的UTXO
+
+        Args:
+            protect: 要排除的标记，默认读取ORD_FILTER_CONFIG (inscribed、runes，可选unknown)
+            protect_unavailable: protect不为空时，是否也排除ord查询失败 (unavailable) 的UTXO，
+                                 默认读取ORD_FILTER_CONFIG；不排除时保留并打印警告
+        """
+        if protect is None:
+            protect = list(ORD_FILTER_CONFIG["protect"])
+            if ORD_FILTER_CONFIG["protect_unknown"]:
+                protect.append("unknown")
+        if protect_unavailable is None:
+            protect_unavailable = ORD_FILTER_CONFIG["protect_unavailable"]
+        protect = set(protect)
+        if protect and protect_unavailable:
+            protect.add("unavailable")
+        tagged = self.tag(utxos)
+        kept = [u for u in tagged if u["ord_tag"] not in protect]
+        unavailable = sum(1 for u in tagged if u["ord_tag"] == "unavailable")
+        if unavailable and "unavailable" in protect:
+            print(f"❌ ord服务不可用 ({self.base_url})，排除 {unavailable} 个无法确认是否带铭文/符文的UTXO；"
+                  f"请检查 PROVIDER_CONFIG['ord_url']")
+        elif unavailable and protect:
+            print(f"⚠️ ord服务不可用 ({self.base_url})，{unavailable} 个UTXO无法确认是否带铭文/符文，照常返回")
+        excluded = len(tagged) - len(kept) - (unavailable if "unavailable" in protect else 0)
+        if excluded:
+            print(f"🛡️ 排除 {excluded} 个带铭文/符文的UTXO")
+        return kept
+
+_default_filter = None
+_default_filter_lock = threading.Lock()
+
+def get_output_filter() -> OrdOutputFilter:
+    """按ORD_FILTER_CONFIG创建的进程内共享实例"""
+    global _default_filter
+    with _default_filter_lock:
+        if _default_filter is None:
+            _default_filter = OrdOutputFilter()
+    return _default_filter
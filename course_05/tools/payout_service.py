@@ -0,0 +1,668 @@
+"""
+批量付款排队服务
+
+用途：
+- 常驻的本地服务，通过HTTP接收付款请求 (提现等) 并排队，攒够一批再用 utils/batch_payout.py
+  构建一笔批量交易，几千笔小额提现变成每小时几笔交易
+- 满足任一条件时出批: 排队的付款数达到max_outputs、估算的交易大小达到max_vbytes、
+  最早的付款等待超过max_wait秒；也可以POST /flush手动出批
+- 队列、批次和签名后的交易保存在SQLite (course_05/persistence/payout_queue.sqlite)，
+  重启后继续: 没签名的批次退回队列，已签名没广播完的交易重新广播 (重复广播同一交易是安全的)
+- 广播的临时错误 (网络、限流) 按retry_delay重试；被节点永久拒绝的交易 (输入不存在、手续费不足等)
+  整批作废，付款退回队列或暂停等待人工核对，不会阻塞之后的出批
+- 提供队列深度、出批耗时、付款等待时间和失败批次等指标
+
+协议 (JSON over HTTP，只使用标准库):
+    POST /payouts  {"address", "amount", "request_id": 可选}  或 {"payouts": [...]}
+                   -> {"ids": [...]}；同一个request_id重复提交返回原来的id
+    GET  /payouts/<id>  -> 付款状态 (queued / batching / signed / sent / held) 和txid
+    POST /payouts/<id>/requeue  -> 把暂停 (held) 的付款退回队列
+    POST /flush    -> 立即出批
+    GET  /metrics  -> 队列和出批指标
+
+命令行 (在course_05目录运行):
+python -m tools.payout_service --key <WIF私钥> --fee-rate 3
+curl -d '{"address": "tb1p...", "amount": 15000}' http://127.0.0.1:8770/payouts
+"""
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from bitcoinutils.setup import setup
+from bitcoinutils.transactions import Transaction
+
+from tools.tools_broadcast import broadcast_transaction
+from tools.utxo_reservation import get_reservations
+from utils.batch_payout import create_batch_payout, address_script, DUST_LIMITS
+from utils.coin_selection import OUTPUT_VBYTES, INPUT_VBYTES, TX_OVERHEAD_VBYTES
+
+# 默认配置
+PAYOUT_SERVICE_CONFIG = {
+    "db_path": os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "persistence", "payout_queue.sqlite"),
+    "host": "127.0.0.1",
+    "port": 8770,
+    "max_outputs": 200,      # 排队的付款数达到此值时出批 (也是每批最多的付款数)
+    "max_vbytes": 20000,     # 估算的交易大小达到此值时出批
+    "max_wait": 600,         # 最早的付款等待超过此秒数时出批
+    "retry_delay": 60,       # 出批或临时的广播失败后的重试间隔（秒）
+    "owner": "payout_service",  # UTXO预留者标识 (固定名称，重启后仍能延长自己的预留)
+    "reservation_ttl": 3600, # 批次输入的预留时间（秒），广播重试期间不断延长
+    "latency_window": 100    # 指标中的耗时统计保留最近多少次
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payouts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id TEXT UNIQUE,
+    address TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    script_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    batch_id INTEGER,
+    txid TEXT,
+    created_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS payouts_by_status ON payouts (status, id);
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    reason TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS batch_transactions (
+    batch_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    txid TEXT NOT NULL,
+    hex TEXT NOT NULL,
+    fee INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (batch_id, position)
+);
+"""
+
+# 每笔批量交易除付款输出外的估算大小: 交易头 + 找零输出 + 一个Taproot输入
+BASE_VBYTES = TX_OVERHEAD_VBYTES + OUTPUT_VBYTES["p2tr"] + INPUT_VBYTES["p2tr"]
+
+# 重试也不会成功的广播错误 (节点拒绝理由中的关键字) -> 付款的处理方式:
+#   requeue  交易肯定没有生效，付款退回队列重新出批
+#   hold     输入已不存在 (可能已被花费，也可能这笔交易已经确认)，或手续费不足 (按同样的费率重新出批还会被拒)，
+#            付款暂停，人工核对或调高费率后 POST /payouts/<id>/requeue
+PERMANENT_BROADCAST_ERRORS = [
+    ("missingorspent", "hold"),
+    ("missing-inputs", "hold"),
+    ("missing inputs", "hold"),
+    ("txn-mempool-conflict", "hold"),
+    ("too-long-mempool-chain", "requeue"),
+    ("min relay fee not met", "hold"),
+    ("mempool min fee not met", "hold"),
+    ("insufficient fee", "hold"),
+    ("dust", "requeue"),
+    ("script-verify", "requeue"),
+    ("bad-txns", "requeue"),
+    ("tx-size", "requeue")
+]
+
+def classify_broadcast_error(error) -> Optional[str]:
+    """
+    广播错误的处理方式
+
+    Returns:
+        Optional[str]: "requeue" / "hold"，临时错误 (网络、限流等，可以重试) 为None
+    """
+    error = str(error or "").lower()
+    return next((action for keyword, action in PERMANENT_BROADCAST_ERRORS if keyword in error), None)
+
+class PayoutQueue:
+    """
+    付款队列和出批逻辑
+
+    付款状态: queued (排队) -> batching (已取出，正在构建) -> signed (交易已签名保存) -> sent (已广播)；
+              交易被节点永久拒绝时退回queued，或在输入已不存在时改为held (等待人工核对)
+    批次状态: building -> signed -> sent，构建失败或交易被永久拒绝为failed
+    """
+
+    def __init__(self, sender_private_key: str, fee_rate: float,
+                 db_path: str = PAYOUT_SERVICE_CONFIG["db_path"],
+                 max_outputs: int = PAYOUT_SERVICE_CONFIG["max_outputs"],
+                 max_vbytes: int = PAYOUT_SERVICE_CONFIG["max_vbytes"],
+                 max_wait: float = PAYOUT_SERVICE_CONFIG["max_wait"],
+                 retry_delay: float = PAYOUT_SERVICE_CONFIG["retry_delay"],
+                 broadcast: Callable[[str], dict] = broadcast_transaction):
+        """
+        Args:
+            sender_private_key: 付款方私钥 (WIF)，从它的Taproot地址付款
+            fee_rate: 费率（sat/vB）
+            db_path: SQLite数据库路径
+            max_outputs: 出批的付款数阈值
+            max_vbytes: 出批的估算交易大小阈值
+            max_wait: 出批的等待时间阈值（秒）
+            retry_delay: 失败后的重试间隔（秒）
+            broadcast: 广播函数 (signed_tx_hex) -> {"success", "txid", "error"}
+        """
+        setup('testnet')
+        self.sender_private_key = sender_private_key
+        self.fee_rate = fee_rate
+        self.max_outputs = max_outputs
+        self.max_vbytes = max_vbytes
+        self.max_wait = max_wait
+        self.retry_delay = retry_delay
+        self.broadcast = broadcast
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # 新付款入队或手动出批时唤醒出批线程
+        self.wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._flush_requested = False
+        self._retry_at = 0
+
+        self.flush_count = 0
+        self.flush_latencies = deque(maxlen=PAYOUT_SERVICE_CONFIG["latency_window"])
+        self.payout_latencies = deque(maxlen=PAYOUT_SERVICE_CONFIG["latency_window"])
+        self.last_error = None
+        self._recover()
+
+    def close(self):
+        self.stop()
+        self.db.close()
+
+    def _recover(self):
+        """重启恢复: 没签名的批次退回队列，已签名的交易留给出批线程重新广播"""
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            building = [row[0] for row in self.db.execute("SELECT id FROM batches WHERE status = 'building'")]
+            for batch_id in building:
+                self.db.execute("UPDATE payouts SET status = 'queued', batch_id = NULL WHERE batch_id = ?", (batch_id,))
+                self.db.execute("UPDATE batches SET status = 'failed', error = 'interrupted', finished_at = ? WHERE id = ?",
+                                (time.time(), batch_id))
+            self.db.execute("COMMIT")
+            pending = self.db.execute("SELECT COUNT(*) FROM batches WHERE status = 'signed'").fetchone()[0]
+            queued = self.db.execute("SELECT COUNT(*) FROM payouts WHERE status = 'queued'").fetchone()[0]
+        if building or pending or queued:
+            print(f"📂 恢复付款队列: {queued} 笔排队, {len(building)} 个中断的批次退回队列, {pending} 个批次待广播")
+
+    def enqueue(self, payouts: List[Dict]) -> List[int]:
+        """
+        付款请求入队 (全部成功或全部失败)
+
+        Args:
+            payouts: [{"address", "amount", "request_id": 可选}]
+
+        Returns:
+            List[int]: 付款id；request_id已存在时返回原来的id
+
+        Raises:
+            ValueError: 请求格式错误、地址无效、金额低于粉尘限制或request_id重复
+        """
+        if not isinstance(payouts, list) or not all(isinstance(p, dict) for p in payouts):
+            raise ValueError("付款请求必须是对象或对象列表")
+        checked = []
+        seen = set()
+        for payout in payouts:
+            request_id = payout.get("request_id")
+            if request_id is not None:
+                request_id = str(request_id)
+                if request_id in seen:
+                    raise ValueError(f"同一个请求中request_id重复: {request_id}")
+                seen.add(request_id)
+            address = str(payout["address"])
+            amount = int(payout["amount"])
+            script_type, _ = address_script(address)
+            if amount < DUST_LIMITS[script_type]:
+                raise ValueError(f"付款金额 {amount} 聪低于 {script_type} 的粉尘限制 {DUST_LIMITS[script_type]}")
+            checked.append((request_id, address, amount, script_type))
+
+        ids = []
+        now = time.time()
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                for request_id, address, amount, script_type in checked:
+                    if request_id is not None:
+                        row = self.db.execute("SELECT id FROM payouts WHERE request_id = ?", (request_id,)).fetchone()
+                        if row:
+                            ids.append(row[0])
+                            continue
+                    cursor = self.db.execute(
+                        """INSERT INTO payouts (request_id, address, amount, script_type, status, created_at)
+                           VALUES (?, ?, ?, ?, 'queued', ?)""",
+                        (request_id, address, amount, script_type, now)
+                    )
+                    ids.append(cursor.lastrowid)
+                self.db.execute("COMMIT")
+            except sqlite3.IntegrityError as e:
+                self.db.execute("ROLLBACK")
+                raise ValueError(f"付款请求冲突: {e}")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        self.wakeup.set()
+        return ids
+
+    def get(self, payout_id: int) -> Optional[Dict]:
+        """查询一笔付款"""
+        with self._lock:
+            row = self.db.execute(
+                "SELECT id, request_id, address, amount, status, batch_id, txid, created_at, sent_at FROM payouts WHERE id = ?",
+                (payout_id,)
+            ).fetchone()
+        if not row:
+            return None
+        keys = ("id", "request_id", "address", "amount", "status", "batch_id", "txid", "created_at", "sent_at")
+        return dict(zip(keys, row))
+
+    def request_flush(self):
+        """下一轮立即出批 (不等阈值)"""
+        self._flush_requested = True
+        self._retry_at = 0
+        self.wakeup.set()
+
+    def _queue_stats(self) -> Dict:
+        with self._lock:
+            count, amount, oldest = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(amount), 0), MIN(created_at) FROM payouts WHERE status = 'queued'"
+            ).fetchone()
+            by_type = self.db.execute(
+                "SELECT script_type, COUNT(*) FROM payouts WHERE status = 'queued' GROUP BY script_type"
+            ).fetchall()
+        vbytes = BASE_VBYTES + sum(OUTPUT_VBYTES[script_type] * n for script_type, n in by_type) if count else 0
+        return {"count": count, "amount": amount, "vbytes": vbytes, "oldest_age": time.time() - oldest if oldest else 0}
+
+    def flush_reason(self) -> Optional[str]:
+        """
+        是否应该出批
+
+        Returns:
+            Optional[str]: 出批原因 (outputs / vbytes / timeout / manual)，不需要出批时为None
+        """
+        stats = self._queue_stats()
+        if not stats["count"]:
+            self._flush_requested = False
+            return None
+        if self._flush_requested:
+            return "manual"
+        if stats["count"] >= self.max_outputs:
+            return "outputs"
+        if stats["vbytes"] >= self.max_vbytes:
+            return "vbytes"
+        if stats["oldest_age"] >= self.max_wait:
+            return "timeout"
+        return None
+
+    def _take_batch(self, reason: str):
+        """按入队顺序取出不超过max_outputs笔、估算大小不超过max_vbytes的付款，记为一个批次"""
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            rows = self.db.execute(
+                "SELECT id, address, amount, script_type FROM payouts WHERE status = 'queued' ORDER BY id LIMIT ?",
+                (self.max_outputs,)
+            ).fetchall()
+            vbytes = BASE_VBYTES
+            for count, row in enumerate(rows):
+                vbytes += OUTPUT_VBYTES[row[3]]
+                if vbytes > self.max_vbytes and count:
+                    rows = rows[:count]
+                    break
+            batch_id = self.db.execute(
+                "INSERT INTO batches (reason, status, created_at) VALUES (?, 'building', ?)", (reason, time.time())
+            ).lastrowid
+            self.db.executemany("UPDATE payouts SET status = 'batching', batch_id = ? WHERE id = ?",
+                                [(batch_id, row[0]) for row in rows])
+            self.db.execute("COMMIT")
+        return batch_id, rows
+
+    def flush(self, reason: str = "manual") -> Optional[int]:
+        """
+        构建、签名并保存一批交易，然后广播
+
+        Returns:
+            Optional[int]: 批次id，队列为空时为None
+
+        Raises:
+            Exception: 构建失败 (如余额不足)，付款已退回队列
+        """
+        start = time.time()
+        batch_id, rows = self._take_batch(reason)
+        if not rows:
+            with self._lock:
+                self.db.execute("DELETE FROM batches WHERE id = ?", (batch_id,))
+            return None
+        self._flush_requested = False
+        print(f"\n📥 出批 #{batch_id} ({reason}): {len(rows)} 笔付款")
+
+        try:
+            transactions = create_batch_payout(
+                self.sender_private_key, [(row[1], row[2]) for row in rows], self.fee_rate,
+                max_outputs=self.max_outputs, owner=PAYOUT_SERVICE_CONFIG["owner"]
+            )
+        except Exception as e:
+            with self._lock:
+                self.db.execute("BEGIN IMMEDIATE")
+                self.db.execute("UPDATE payouts SET status = 'queued', batch_id = NULL WHERE batch_id = ?", (batch_id,))
+                self.db.execute("UPDATE batches SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                                (str(e), time.time(), batch_id))
+                self.db.execute("COMMIT")
+            raise
+
+        # 交易的付款顺序与rows相同，按顺序对应付款id
+        assignments = []
+        position = 0
+        for tx in transactions:
+            for _ in tx["payouts"]:
+                assignments.append((tx["txid"], rows[position][0]))
+                position += 1
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.executemany(
+                "INSERT INTO batch_transactions (batch_id, position, txid, hex, fee, status) VALUES (?, ?, ?, ?, ?, 'signed')",
+                [(batch_id, i, tx["txid"], tx["hex"], tx["fee"]) for i, tx in enumerate(transactions)]
+            )
+            self.db.executemany("UPDATE payouts SET status = 'signed', txid = ? WHERE id = ?", assignments)
+            self.db.execute("UPDATE batches SET status = 'signed' WHERE id = ?", (batch_id,))
+            self.db.execute("COMMIT")
+
+        self._broadcast_batch(batch_id)
+        self.flush_count += 1
+        self.flush_latencies.append(time.time() - start)
+        return batch_id
+
+    def _broadcast_batch(self, batch_id: int) -> bool:
+        """
+        按顺序广播一个批次中还没广播的交易 (后面的交易可能花费前面交易的找零)
+
+        临时错误时停下等待重试，重试期间延长输入的预留；被节点永久拒绝时调用_fail_batch，
+        不再重试这个批次
+
+        Returns:
+            bool: 批次是否已处理完 (全部广播，或因永久错误放弃)；False表示临时错误需要重试
+        """
+        with self._lock:
+            pending = self.db.execute(
+                "SELECT position, txid, hex FROM batch_transactions WHERE batch_id = ? AND status = 'signed' ORDER BY position",
+                (batch_id,)
+            ).fetchall()
+        for position, txid, tx_hex in pending:
+            result = self.broadcast(tx_hex)
+            error = result.get("error")
+            if not result["success"] and "already" not in str(error or "").lower():
+                self.last_error = error
+                action = classify_broadcast_error(error)
+                if action:
+                    self._fail_batch(batch_id, position, str(error), action)
+                    return True
+                print(f"❌ 批次 #{batch_id} 交易 {txid} 广播失败，{self.retry_delay}秒后重试: {error}")
+                self._extend_reservations(tx_hex for _, _, tx_hex in pending)
+                return False
+            now = time.time()
+            with self._lock:
+                self.db.execute("BEGIN IMMEDIATE")
+                self.db.execute("UPDATE batch_transactions SET status = 'sent' WHERE batch_id = ? AND position = ?",
+                                (batch_id, position))
+                sent = self.db.execute("SELECT created_at FROM payouts WHERE txid = ? AND status = 'signed'", (txid,)).fetchall()
+                self.db.execute("UPDATE payouts SET status = 'sent', sent_at = ? WHERE txid = ? AND status = 'signed'",
+                                (now, txid))
+                self.db.execute("COMMIT")
+            self.payout_latencies.extend(now - row[0] for row in sent)
+            print(f"✅ 批次 #{batch_id} 交易已广播: {txid} ({len(sent)} 笔付款)")
+
+        with self._lock:
+            self.db.execute("UPDATE batches SET status = 'sent', finished_at = ? WHERE id = ?", (time.time(), batch_id))
+        return True
+
+    def _extend_reservations(self, tx_hexes):
+        """延长待广播交易输入的预留，重试期间不会被其他构建者 (或下一批) 选中"""
+        outpoints = [f"{txin.txid}:{txin.txout_index}" for tx_hex in tx_hexes for txin in Transaction.from_raw(tx_hex).inputs]
+        get_reservations().reserve(outpoints, PAYOUT_SERVICE_CONFIG["owner"], PAYOUT_SERVICE_CONFIG["reservation_ttl"])
+
+    def _fail_batch(self, batch_id: int, position: int, error: str, action: str):
+        """
+        交易被节点永久拒绝: 这笔和之后还没广播的交易作废，付款按action退回队列或暂停，释放它们的输入预留
+        """
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            failed = self.db.execute(
+                "SELECT txid, hex FROM batch_transactions WHERE batch_id = ? AND status = 'signed' AND position >= ?",
+                (batch_id, position)
+            ).fetchall()
+            self.db.execute("UPDATE batch_transactions SET status = 'failed' WHERE batch_id = ? AND status = 'signed' AND position >= ?",
+                            (batch_id, position))
+            txids = [row[0] for row in failed]
+            placeholders = ",".join("?" * len(txids))
+            if action == "requeue":
+                self.db.execute(f"UPDATE payouts SET status = 'queued', batch_id = NULL, txid = NULL WHERE txid IN ({placeholders})",
+                                txids)
+            else:
+                self.db.execute(f"UPDATE payouts SET status = 'held' WHERE txid IN ({placeholders})", txids)
+            self.db.execute("UPDATE batches SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                            (error, time.time(), batch_id))
+            self.db.execute("COMMIT")
+        get_reservations().release(
+            [f"{txin.txid}:{txin.txout_index}" for _, tx_hex in failed for txin in Transaction.from_raw(tx_hex).inputs]
+        )
+        handling = "付款已退回队列" if action == "requeue" else "付款已暂停 (held)，请核对后 POST /payouts/<id>/requeue"
+        print(f"❌ 批次 #{batch_id} 的交易被节点拒绝，不再重试，{handling}: {error}")
+
+    def requeue(self, payout_id: int) -> bool:
+        """
+        把暂停 (held) 的付款退回队列 (人工确认原交易没有生效后调用)
+
+        Returns:
+            bool: 是否成功 (只有held状态的付款可以退回)
+        """
+        with self._lock:
+            updated = self.db.execute(
+                "UPDATE payouts SET status = 'queued', batch_id = NULL, txid = NULL WHERE id = ? AND status = 'held'",
+                (payout_id,)
+            ).rowcount
+        if updated:
+            self.wakeup.set()
+        return bool(updated)
+
+    def _rebroadcast_pending(self) -> bool:
+        """
+        广播已签名但没广播完的批次 (重启后或广播失败后)
+
+        Returns:
+            bool: 是否没有需要重试的临时失败
+        """
+        with self._lock:
+            batch_ids = [row[0] for row in self.db.execute("SELECT id FROM batches WHERE status = 'signed' ORDER BY id")]
+        return all([self._broadcast_batch(batch_id) for batch_id in batch_ids])
+
+    def run_once(self) -> Optional[int]:
+        """
+        出批线程的一轮: 先补广播，再按阈值出批 (补广播的临时失败不阻塞新的出批)
+
+        Returns:
+            Optional[int]: 本轮出批的批次id
+        """
+        if self._retry_at > time.time():
+            return None
+        self._retry_at = 0
+        rebroadcast_ok = self._rebroadcast_pending()
+        batch_id = None
+        reason = self.flush_reason()
+        if reason:
+            try:
+                batch_id = self.flush(reason)
+            except Exception as e:
+                self.last_error = str(e)
+                rebroadcast_ok = False
+                print(f"❌ 出批失败，{self.retry_delay}秒后重试: {e}")
+        if not rebroadcast_ok:
+            self._retry_at = time.time() + self.retry_delay
+        return batch_id
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.run_once() is not None:
+                continue  # 队列里可能还够下一批
+            if self._retry_at > time.time():
+                # 重试时间之前run_once什么也不做
+                timeout = self._retry_at - time.time()
+            else:
+                # 没有新付款时最晚在最早的付款到期时醒来
+                stats = self._queue_stats()
+                timeout = self.max_wait - stats["oldest_age"] if stats["count"] else self.max_wait
+            self.wakeup.wait(max(timeout, 0.05))
+            self.wakeup.clear()
+
+    def start(self):
+        """在后台线程运行出批循环"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="payout-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self.wakeup.set()
+            self._thread.join()
+            self._thread = None
+
+    def metrics(self) -> Dict:
+        """队列深度、出批耗时和付款等待时间"""
+        stats = self._queue_stats()
+        with self._lock:
+            by_status = dict(self.db.execute("SELECT status, COUNT(*) FROM payouts GROUP BY status").fetchall())
+            pending_batches = self.db.execute("SELECT COUNT(*) FROM batches WHERE status = 'signed'").fetchone()[0]
+            failed_batches = self.db.execute("SELECT COUNT(*) FROM batches WHERE status = 'failed'").fetchone()[0]
+            recent_failures = [
+                {"batch_id": row[0], "error": row[1], "finished_at": row[2]}
+                for row in self.db.execute(
+                    "SELECT id, error, finished_at FROM batches WHERE status = 'failed' ORDER BY id DESC LIMIT 5"
+                )
+            ]
+
+        def summary(values):
+            values = list(values)
+            if not values:
+                return {"count": 0, "avg": 0, "max": 0}
+            return {"count": len(values), "avg": sum(values) / len(values), "max": max(values)}
+
+        return {
+            "queue_depth": stats["count"],
+            "queued_amount": stats["amount"],
+            "queued_vbytes": stats["vbytes"],
+            "oldest_age": stats["oldest_age"],
+            "payouts": by_status,
+            "pending_batches": pending_batches,
+            "failed_batches": failed_batches,
+            "recent_failures": recent_failures,
+            "flushes": self.flush_count,
+            "flush_latency": summary(self.flush_latencies),
+            "payout_latency": summary(self.payout_latencies),
+            "thresholds": {"max_outputs": self.max_outputs, "max_vbytes": self.max_vbytes, "max_wait": self.max_wait},
+            "last_error": self.last_error
+        }
+
+class _PayoutHandler(BaseHTTPRequestHandler):
+    """把HTTP请求转给PayoutQueue"""
+
+    queue = None
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(self.queue.metrics())
+        elif self.path.startswith("/payouts/") and self.path[len("/payouts/"):].isdigit():
+            payout = self.queue.get(int(self.path[len("/payouts/"):]))
+            self._send_json(payout if payout else {"error": "not found"}, 200 if payout else 404)
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        try:
+            request = self._read_json()
+        except ValueError:
+            self._send_json({"error": "invalid json"}, 400)
+            return
+
+        if not isinstance(request, dict):
+            self._send_json({"error": "request body must be a json object"}, 400)
+            return
+
+        if self.path == "/payouts":
+            payouts = request.get("payouts", [request])
+            try:
+                ids = self.queue.enqueue(payouts)
+            except (KeyError, ValueError, TypeError) as e:
+                self._send_json({"error": str(e)}, 400)
+                return
+            self._send_json({"ids": ids})
+        elif self.path.startswith("/payouts/") and self.path.endswith("/requeue") \
+                and self.path[len("/payouts/"):-len("/requeue")].isdigit():
+            requeued = self.queue.requeue(int(self.path[len("/payouts/"):-len("/requeue")]))
+            self._send_json({"requeued": requeued}, 200 if requeued else 409)
+        elif self.path == "/flush":
+            self.queue.request_flush()
+            self._send_json({"flush": True, "queue_depth": self.queue.metrics()["queue_depth"]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def log_message(self, format, *args):
+        # 关闭默认的逐请求日志
+        pass
+
+def start_server(queue: PayoutQueue, host: str = PAYOUT_SERVICE_CONFIG["host"], port: int = PAYOUT_SERVICE_CONFIG["port"]):
+    """
+    在后台线程启动HTTP接口和出批循环
+
+    Returns:
+        ThreadingHTTPServer: 调用shutdown()停止
+    """
+    handler = type("PayoutHandler", (_PayoutHandler,), {"queue": queue})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    queue.start()
+    print(f"批量付款服务已启动: http://{host}:{server.server_address[1]}")
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量付款排队服务")
+    parser.add_argument("--key", required=True, help="付款方WIF私钥")
+    parser.add_argument("--fee-rate", type=float, required=True, help="费率 (sat/vB)")
+    parser.add_argument("--host", default=PAYOUT_SERVICE_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=PAYOUT_SERVICE_CONFIG["port"])
+    parser.add_argument("--max-outputs", type=int, default=PAYOUT_SERVICE_CONFIG["max_outputs"])
+    parser.add_argument("--max-vbytes", type=int, default=PAYOUT_SERVICE_CONFIG["max_vbytes"])
+    parser.add_argument("--max-wait", type=float, default=PAYOUT_SERVICE_CONFIG["max_wait"])
+    args = parser.parse_args()
+
+    payout_queue = PayoutQueue(args.key, args.fee_rate, max_outputs=args.max_outputs,
+                               max_vbytes=args.max_vbytes, max_wait=args.max_wait)
+    server = start_server(payout_queue, args.host, args.port)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\n正在停止...")
+    finally:
+        server.shutdown()
+        payout_queue.close()
@@ -5,6 +5,7 @@
 - 将签名后的交易广播到比特币网络
 - 支持测试网和主网
 - 使用 mempool.space API
+- 广播成功后把交易输入记录为已花费，其他构建脚本不会再选中它们 (tools/utxo_reservation.py)
 
 使用示例：
 from tools.tools_broadcast import broadcast_transaction
@@ -13,7 +14,10 @@ tx_hex = "020000000153b775..."
 result = broadcast_transaction(tx_hex, network="testnet")
 """
 
-import requests
+from bitcoinutils.transactions import Transaction
+
+from tools.http_session import get_client
+from tools.utxo_reservation import get_reservations
 
 def broadcast_transaction(signed_tx_hex: str, network: str = "testnet") -> dict:
     """
@@ -41,11 +45,12 @@ def broadcast_transaction(signed_tx_hex: str, network: str = "testnet") -> dict:
     explorer_url = f"{base_url}/tx"
     
     try:
-        # 广播交易
-        response = requests.post(api_url, data=signed_tx_hex)
+        # 广播交易 (共享连接池，429/5xx自动重试；同一交易重复广播是安全的)
+        response = get_client().post(api_url, data=signed_tx_hex)
         
         if response.status_code == 200:
             txid = response.text
+            mark_inputs_spent(signed_tx_hex, txid)
             return {
                 'success': True,
                 'txid': txid,
@@ -68,6 +73,14 @@ def broadcast_transaction(signed_tx_hex: str, network: str = "testnet") -> dict:
             'url': None
         }
 
+def mark_inputs_spent(signed_tx_hex: str, txid: str):
+    """把已广播交易的输入记录为已花费"""
+    try:
+        tx = Transaction.from_raw(signed_tx_hex)
+        get_reservations().mark_broadcast([f"{txin.txid}:{txin.txout_index}" for txin in tx.inputs], txid)
+    except Exception as e:
+        print(f"⚠️ 记录已花费的UTXO失败: {e}")
+
 def print_broadcast_result(result: dict):
     """打印广播结果"""
     if result['success']:
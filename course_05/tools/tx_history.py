@@ -0,0 +1,140 @@
+"""
+地址交易历史分页读取工具
+
+用途：
+- Esplora的 /address/<address>/txs 只返回第一页 (最多50笔未确认 + 25笔已确认)
+- 本工具按 /txs/chain/<上一页最后的txid> 游标逐页读取全部已确认交易，返回生成器:
+  只有消费到某一页时才请求该页，可选在后台预取下一页
+- 可以在读取每一页时把完整的交易JSON转换为需要的字段，不保留整页原始数据，
+  导出交易很多的地址时内存占用不随交易数增长
+
+使用示例：
+from tools.tx_history import iter_address_txs, export_history
+
+for tx in iter_address_txs("tb1p..."):
+    print(tx["txid"])
+
+export_history("tb1p...", "history.jsonl")
+
+命令行 (在course_05目录运行):
+python -m tools.tx_history tb1p... history.jsonl
+"""
+
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from tools.http_session import get_client
+from tools.utxo_provider import esplora_base_url
+
+# Esplora每页返回的已确认交易数
+CHAIN_PAGE_SIZE = 25
+
+def summarize_tx(tx: Dict) -> Dict:
+    """只保留常用字段的交易摘要"""
+    status = tx.get("status", {})
+    return {
+        "txid": tx["txid"],
+        "confirmed": status.get("confirmed", False),
+        "block_height": status.get("block_height"),
+        "block_time": status.get("block_time"),
+        "fee": tx.get("fee", 0),
+        "size": tx.get("size", 0),
+        "weight": tx.get("weight", 0)
+    }
+
+class AddressTxHistory:
+    """一个地址的交易历史 (可迭代，每次迭代从头读取)，未确认交易在前，已确认交易从新到旧"""
+
+    def __init__(self, address: str, base_url: Optional[str] = None, include_mempool: bool = True,
+                 prefetch: bool = True, transform: Optional[Callable[[Dict], Dict]] = None):
+        """
+        Args:
+            address: 比特币地址
+            base_url: Esplora API地址，默认mempool.space (按PROVIDER_CONFIG的网络)
+            include_mempool: 是否先返回未确认交易
+            prefetch: 消费当前页时是否在后台请求下一页
+            transform: 读取每页时对每笔交易做的转换，如summarize_tx，为None时返回完整JSON
+        """
+        self.address = address
+        self.base_url = (base_url or esplora_base_url()).rstrip("/")
+        self.include_mempool = include_mempool
+        self.prefetch = prefetch
+        self.transform = transform
+        self.client = get_client()
+        self.pages_fetched = 0
+
+    def _fetch_page(self, path: str) -> Tuple[int, Optional[str], List[Dict]]:
+        """
+        请求一页
+
+        Returns:
+            Tuple: (本页交易数, 本页最后一笔交易的txid, 转换后的交易列表)
+        """
+        response = self.client.get(f"{self.base_url}/address/{self.address}{path}")
+        response.raise_for_status()
+        txs = response.json()
+        self.pages_fetched += 1
+        last_txid = txs[-1]["txid"] if txs else None
+        if self.transform:
+            txs = [self.transform(tx) for tx in txs]
+        return len(txs), last_txid, txs
+
+    def iter_mempool(self) -> Iterator[Dict]:
+        """未确认交易 (Esplora最多返回50笔)"""
+        yield from self._fetch_page("/txs/mempool")[2]
+
+    def iter_chain(self) -> Iterator[Dict]:
+        """已确认交易，从新到旧逐页读取"""
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        try:
+            count, last_txid, txs = self._fetch_page("/txs/chain")
+            while True:
+                has_next = count >= CHAIN_PAGE_SIZE
+                next_page = None
+                if has_next and executor:
+                    next_page = executor.submit(self._fetch_page, f"/txs/chain/{last_txid}")
+                yield from txs
+                if not has_next:
+                    return
+                count, last_txid, txs = next_page.result() if next_page else self._fetch_page(f"/txs/chain/{last_txid}")
+        finally:
+            # 提前停止迭代时不等待预取中的请求
+            if executor:
+                executor.shutdown(wait=False)
+
+    def __iter__(self) -> Iterator[Dict]:
+        if self.include_mempool:
+            yield from self.iter_mempool()
+        yield from self.iter_chain()
+
+def iter_address_txs(address: str, base_url: Optional[str] = None, include_mempool: bool = True,
+                     prefetch: bool = True, transform: Optional[Callable[[Dict], Dict]] = None) -> Iterator[Dict]:
+    """地址交易历史的生成器，参数同AddressTxHistory"""
+    return iter(AddressTxHistory(address, base_url, include_mempool, prefetch, transform))
+
+def export_history(address: str, path: str, base_url: Optional[str] = None,
+                   transform: Optional[Callable[[Dict], Dict]] = summarize_tx) -> int:
+    """
+    把地址的全部交易逐条写入JSON Lines文件 (内存中最多保留两页)
+
+    Returns:
+        int: 写入的交易数
+    """
+    count = 0
+    with open(path, "w") as f:
+        for tx in iter_address_txs(address, base_url, transform=transform):
+            f.write(json.dumps(tx) + "\n")
+            count += 1
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出地址的全部交易历史")
+    parser.add_argument("address", help="比特币地址")
+    parser.add_argument("output", help="输出的JSON Lines文件")
+    parser.add_argument("--full", action="store_true", help="保存完整的交易JSON (默认只保存摘要)")
+    args = parser.parse_args()
+
+    count = export_history(args.address, args.output, transform=None if args.full else summarize_tx)
+    print(f"💾 {count} 笔交易已保存到 {args.output}")
@@ -0,0 +1,423 @@
+"""
+本地SQLite UTXO索引
+
+用途：
+- 替代每次查询都调用 scantxoutset (需要遍历整个UTXO集，几十秒)
+- 为关注的地址维护UTXO和交易历史，查询余额/UTXO/历史都是索引查找
+- 按区块增量更新: 用 getblockhash/getblock 读取新区块，只记录与关注地址有关的输出和花费
+- 区块重组时回滚到分叉点再重新同步
+
+数据来源：
+- 新关注的地址用一次 scantxoutset 得到当前UTXO (之后不再调用)
+- 之后每个新区块中与该地址有关的输出、花费和交易都会写入索引
+- 需要完整的历史时，watch(address, rescan_from=高度) 从指定高度逐块扫描
+
+使用示例：
+from tools.node_rpc import NodeRPC
+from tools.utxo_index import UTXOIndex
+
+index = UTXOIndex(NodeRPC("http://127.0.0.1:18332", "user", "password"))
+index.watch("tb1p...")
+index.sync()
+print(index.get_balance("tb1p..."))
+
+命令行 (在course_05目录运行):
+python -m tools.utxo_index watch tb1p...
+python -m tools.utxo_index follow
+"""
+
+import os
+import time
+import sqlite3
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tools.node_rpc import NodeRPC
+from tools.utxo_provider import PROVIDER_CONFIG, make_utxo
+
+# 默认配置
+INDEX_CONFIG = {
+    "db_path": os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "persistence", "utxo_index.sqlite"),
+    "start_height": None,    # 新建索引时从哪个高度开始同步，None表示从节点当前高度开始
+    "poll_interval": 10,     # follow模式下检查新区块的间隔（秒）
+    "block_batch": 8         # 同步时一次批量读取的区块数
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    height INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    time INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scripts (
+    script TEXT PRIMARY KEY,
+    address TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    txid TEXT NOT NULL,
+    vout INTEGER NOT NULL,
+    script TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    spent_txid TEXT,
+    spent_height INTEGER,
+    PRIMARY KEY (txid, vout)
+);
+CREATE INDEX IF NOT EXISTS outputs_by_script ON outputs (script, spent_height);
+CREATE INDEX IF NOT EXISTS outputs_by_height ON outputs (height);
+CREATE INDEX IF NOT EXISTS outputs_by_spent_height ON outputs (spent_height);
+CREATE TABLE IF NOT EXISTS history (
+    script TEXT NOT NULL,
+    txid TEXT NOT NULL,
+    height INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    time INTEGER,
+    received INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (script, txid)
+);
+CREATE INDEX IF NOT EXISTS history_by_script ON history (script, height, position);
+CREATE INDEX IF NOT EXISTS history_by_height ON history (height);
+"""
+
+def btc_to_sats(value: float) -> int:
+    """RPC返回的BTC金额转换为聪"""
+    return round(value * 100_000_000)
+
+class UTXOIndex:
+    """关注地址的UTXO和交易历史索引 (线程安全)"""
+
+    def __init__(self, rpc: NodeRPC, db_path: str = INDEX_CONFIG["db_path"],
+                 start_height: Optional[int] = INDEX_CONFIG["start_height"]):
+        """
+        Args:
+            rpc: 节点RPC客户端
+            db_path: SQLite数据库路径
+            start_height: 新建索引时的起始高度，None表示从节点当前高度开始
+        """
+        self.rpc = rpc
+        self.start_height = start_height
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self._lock = threading.RLock()
+
+    def close(self):
+        self.db.close()
+
+    # ===== 关注的地址 =====
+
+    def script_for(self, address: str) -> str:
+        """地址对应的scriptPubKey (十六进制)"""
+        with self._lock:
+            row = self.db.execute("SELECT script FROM scripts WHERE address = ?", (address,)).fetchone()
+        if row:
+            return row[0]
+        result = self.rpc.call("validateaddress", address)
+        if not result.get("isvalid"):
+            raise ValueError(f"无效的地址: {address}")
+        return result["scriptPubKey"]
+
+    def is_watched(self, address: str) -> bool:
+        with self._lock:
+            return self.db.execute("SELECT 1 FROM scripts WHERE address = ?", (address,)).fetchone() is not None
+
+    def watch(self, address: str, rescan_from: Optional[int] = None):
+        """
+        开始关注一个地址
+
+        Args:
+            address: 比特币地址
+            rescan_from: 为None时用一次scantxoutset导入当前UTXO (之前的交易历史只包含这些UTXO的来源交易)；
+                         指定高度时从该高度逐块扫描到索引的最新高度，得到完整的UTXO和交易历史
+        """
+        if self.is_watched(address):
+            return
+        script = self.script_for(address)
+        self.sync()
+        with self._lock, self.db:
+            self.db.execute("INSERT INTO scripts (script, address) VALUES (?, ?)", (script, address))
+
+        if rescan_from is not None:
+            tip = self.tip()
+            if tip:
+                print(f"🔍 从高度 {rescan_from} 扫描到 {tip[0]}，为 {address} 建立索引...")
+                self._rescan(script, rescan_from, tip[0])
+        else:
+            self._import_unspent(address, script)
+        # 导入期间可能出现了新区块
+        self.sync()
+        print(f"✅ 开始关注 {address}")
+
+    def _import_unspent(self, address: str, script: str):
+        """用scantxoutset导入当前UTXO"""
+        result = self.rpc.call("scantxoutset", "start", [f"addr({address})"], timeout=600)
+        # 比索引更新的区块中的UTXO留给之后的sync处理，避免重复记录
+        tip = self.tip()
+        unspents = [u for u in result.get("unspents", []) if tip and u["height"] <= tip[0]]
+        heights = sorted({u["height"] for u in unspents})
+        hashes = self.rpc.batch([("getblockhash", [height]) for height in heights])
+        headers = self.rpc.batch([("getblockheader", [block_hash]) for block_hash in hashes])
+        block_times = {height: header["time"] for height, header in zip(heights, headers)}
+
+        with self._lock, self.db:
+            for u in unspents:
+                amount = btc_to_sats(u["amount"])
+                self.db.execute(
+                    "INSERT OR IGNORE INTO outputs (txid, vout, script, amount, height) VALUES (?, ?, ?, ?, ?)",
+                    (u["txid"], u["vout"], script, amount, u["height"])
+                )
+                self._add_history(script, u["txid"], u["height"], 0, block_times[u["height"]], received=amount)
+        print(f"📥 从UTXO集导入 {len(unspents)} 个UTXO")
+
+    def _rescan(self, script: str, start: int, end: int):
+        """只为一个脚本重新扫描 [start, end] 的区块"""
+        for height, block in self._iter_blocks(start, end):
+            with self._lock, self.db:
+                self._apply_block(block, height, {script})
+
+    def _iter_blocks(self, start: int, end: int) -> Iterable[Tuple[int, Dict]]:
+        """
+        按高度顺序读取 [start, end] 的区块
+
+        每次批量读取block_batch个区块: 一个JSON-RPC数组取全部hash，再并发取区块 (每个区块单独一个请求)
+        """
+        window = INDEX_CONFIG["block_batch"]
+        for window_start in range(start, end + 1, window):
+            heights = range(window_start, min(window_start + window, end + 1))
+            hashes = self.rpc.batch([("getblockhash", [height]) for height in heights])
+            blocks = self.rpc.batch([("getblock", [block_hash, 2]) for block_hash in hashes], batch_size=1)
+            yield from zip(heights, blocks)
+
+    # ===== 区块同步 =====
+
+    def tip(self) -> Optional[Tuple[int, str]]:
+        """索引的最新区块 (高度, hash)，空索引返回None"""
+        with self._lock:
+            return self.db.execute("SELECT height, hash FROM blocks ORDER BY height DESC LIMIT 1").fetchone()
+
+    def block_hash(self, height: int) -> str:
+        """区块hash，索引范围内的直接读取，更早的区块向节点查询"""
+        with self._lock:
+            stored = self._stored_hash(height)
+        return stored or self.rpc.call("getblockhash", height)
+
+    def _stored_hash(self, height: int) -> Optional[str]:
+        row = self.db.execute("SELECT hash FROM blocks WHERE height = ?", (height,)).fetchone()
+        return row[0] if row else None
+
+    def _find_fork_height(self, node_height: int) -> Optional[int]:
+        """从索引最新高度往回找与节点主链一致的最高区块"""
+        tip = self.tip()
+        if not tip:
+            return None
+        height = min(tip[0], node_height)
+        while height >= 0:
+            stored = self._stored_hash(height)
+            if stored is None:
+                # 更早的区块没有记录，无法继续比较
+                return height
+            if self.rpc.call("getblockhash", height) == stored:
+                return height
+            height -= 1
+        return None
+
+    def rollback(self, height: int):
+        """撤销高度 >= height 的全部区块"""
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM outputs WHERE height >= ?", (height,))
+            self.db.execute("UPDATE outputs SET spent_txid = NULL, spent_height = NULL WHERE spent_height >= ?", (height,))
+            self.db.execute("DELETE FROM history WHERE height >= ?", (height,))
+            self.db.execute("DELETE FROM blocks WHERE height >= ?", (height,))
+
+    def sync(self) -> int:
+        """
+        同步到节点的最新区块，发现重组时先回滚
+
+        Returns:
+            int: 新处理的区块数
+        """
+        with self._lock:
+            processed = 0
+            while True:
+                node_height = self.rpc.call("getblockcount")
+                tip = self.tip()
+                if tip:
+                    fork_height = self._find_fork_height(node_height)
+                    if fork_height is None or fork_height < tip[0]:
+                        rollback_to = 0 if fork_height is None else fork_height + 1
+                        print(f"⚠️ 检测到区块重组，回滚到高度 {rollback_to}")
+                        self.rollback(rollback_to)
+                    start = (fork_height + 1) if fork_height is not None else (self.start_height or node_height)
+                else:
+                    start = node_height if self.start_height is None else self.start_height
+
+                reorged = False
+                scripts = self._watched_scripts()
+                for height, block in self._iter_blocks(start, node_height):
+                    previous = self._stored_hash(height - 1)
+                    if previous and block.get("previousblockhash") != previous:
+                        # 同步过程中发生了重组，重新检查分叉点
+                        reorged = True
+                        break
+                    with self.db:
+                        self._apply_block(block, height, scripts)
+                        self.db.execute("INSERT OR REPLACE INTO blocks (height, hash, time) VALUES (?, ?, ?)",
+                                        (height, block["hash"], block["time"]))
+                    processed += 1
+                if not reorged:
+                    return processed
+
+    def _watched_scripts(self) -> set:
+        return {row[0] for row in self.db.execute("SELECT script FROM scripts")}
+
+    def _apply_block(self, block: Dict, height: int, scripts: set):
+        """把区块中与scripts有关的输出、花费和交易写入索引 (调用方负责事务)"""
+        for position, tx in enumerate(block["tx"]):
+            txid = tx["txid"]
+            for vin in tx["vin"]:
+                if "coinbase" in vin:
+                    continue
+                row = self.db.execute(
+                    "SELECT script, amount FROM outputs WHERE txid = ? AND vout = ? AND spent_txid IS NULL",
+                    (vin["txid"], vin["vout"])
+                ).fetchone()
+                if row and row[0] in scripts:
+                    self.db.execute(
+                        "UPDATE outputs SET spent_txid = ?, spent_height = ? WHERE txid = ? AND vout = ?",
+                        (txid, height, vin["txid"], vin["vout"])
+                    )
+                    self._add_history(row[0], txid, height, position, block["time"], sent=row[1])
+            for vout in tx["vout"]:
+                script = vout["scriptPubKey"]["hex"]
+                if script in scripts:
+                    amount = btc_to_sats(vout["value"])
+                    self.db.execute(
+                        "INSERT OR IGNORE INTO outputs (txid, vout, script, amount, height) VALUES (?, ?, ?, ?, ?)",
+                        (txid, vout["n"], script, amount, height)
+                    )
+                    self._add_history(script, txid, height, position, block["time"], received=amount)
+
+    def _add_history(self, script: str, txid: str, height: int, position: int, block_time: Optional[int],
+                     received: int = 0, sent: int = 0):
+        self.db.execute(
+            """INSERT INTO history (script, txid, height, position, time, received, sent) VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (script, txid) DO UPDATE SET received = received + excluded.received, sent = sent + excluded.sent""",
+            (script, txid, height, position, block_time, received, sent)
+        )
+
+    def follow(self, poll_interval: float = INDEX_CONFIG["poll_interval"]):
+        """持续跟随新区块 (Ctrl+C退出)"""
+        print(f"👀 跟随新区块，每 {poll_interval}s 检查一次")
+        try:
+            while True:
+                tip = self.tip()
+                if not tip or self.rpc.call("getbestblockhash") != tip[1]:
+                    processed = self.sync()
+                    if processed:
+                        print(f"✅ 同步 {processed} 个区块，当前高度 {self.tip()[0]}")
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            print("\n已停止")
+
+    # ===== 查询 =====
+
+    def get_utxos(self, address: str, min_value: int = 0) -> List[Dict]:
+        """
+        地址的UTXO (只包含已确认的)
+
+        Returns:
+            List[Dict]: 统一格式的UTXO记录 (与utxo_provider相同)
+        """
+        with self._lock:
+            rows = self.db.execute(
+                """SELECT o.txid, o.vout, o.amount, o.height FROM outputs o JOIN scripts s ON s.script = o.script
+                   WHERE s.address = ? AND o.spent_txid IS NULL AND o.amount >= ? ORDER BY o.height, o.txid, o.vout""",
+                (address, min_value)
+            ).fetchall()
+        return [make_utxo(txid, vout, amount, address, "index", block_height=height) for txid, vout, amount, height in rows]
+
+    def get_balance(self, address: str) -> Dict:
+        """
+        Returns:
+            Dict: {"confirmed": 聪, "utxo_count", "tx_count", "height": 索引高度}
+        """
+        with self._lock:
+            script = self.script_for(address)
+            amount, count = self.db.execute(
+                "SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM outputs WHERE script = ? AND spent_txid IS NULL",
+                (script,)
+            ).fetchone()
+            tx_count = self.db.execute("SELECT COUNT(*) FROM history WHERE script = ?", (script,)).fetchone()[0]
+            tip = self.tip()
+        return {"confirmed": amount, "utxo_count": count, "tx_count": tx_count, "height": tip[0] if tip else None}
+
+    def get_history(self, address: str, limit: Optional[int] = None) -> List[Dict]:
+        """
+        地址的交易历史，最新的在前
+
+        Returns:
+            List[Dict]: {"txid", "height", "blockhash", "time", "confirmations", "received", "sent", "amount"}，
+                        amount为该地址的净变化（聪）
+        """
+        with self._lock:
+            script = self.script_for(address)
+            tip = self.tip()
+            rows = self.db.execute(
+                """SELECT h.txid, h.height, b.hash, h.time, h.received, h.sent FROM history h
+                   LEFT JOIN blocks b ON b.height = h.height
+                   WHERE h.script = ? ORDER BY h.height DESC, h.position DESC LIMIT ?""",
+                (script, -1 if limit is None else limit)
+            ).fetchall()
+        return [
+            {
+                "txid": txid,
+                "height": height,
+                "blockhash": blockhash,
+                "time": block_time,
+                "confirmations": tip[0] - height + 1 if tip else 0,
+                "received": received,
+                "sent": sent,
+                "amount": received - sent
+            }
+            for txid, height, blockhash, block_time, received, sent in rows
+        ]
+
+    def watched_addresses(self) -> Iterable[str]:
+        with self._lock:
+            return [row[0] for row in self.db.execute("SELECT address FROM scripts ORDER BY address")]
+
+def create_index(config: Dict = PROVIDER_CONFIG) -> UTXOIndex:
+    """按PROVIDER_CONFIG的节点RPC和INDEX_CONFIG创建索引"""
+    rpc = config["node_rpc"]
+    return UTXOIndex(NodeRPC(rpc["url"], rpc["user"], rpc["password"]))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地SQLite UTXO索引")
+    parser.add_argument("command", choices=["watch", "sync", "follow", "balance", "utxos", "history"])
+    parser.add_argument("addresses", nargs="*", help="比特币地址")
+    parser.add_argument("--rescan-from", type=int, default=None, help="watch时从该高度逐块扫描完整历史")
+    args = parser.parse_args()
+
+    index = create_index()
+    if args.command == "watch":
+        for address in args.addresses:
+            index.watch(address, args.rescan_from)
+    elif args.command == "sync":
+        print(f"✅ 同步 {index.sync()} 个区块，当前高度 {index.tip()[0]}")
+    elif args.command == "follow":
+        index.follow()
+    else:
+        index.sync()
+        for address in args.addresses or index.watched_addresses():
+            if args.command == "balance":
+                balance = index.get_balance(address)
+                print(f"{address}: {balance['confirmed']} 聪, {balance['utxo_count']} 个UTXO, {balance['tx_count']} 笔交易")
+            elif args.command == "utxos":
+                for utxo in index.get_utxos(address):
+                    print(f"{address} {utxo['txid']}:{utxo['vout']} {utxo['amount']} 聪 (高度 {utxo['block_height']})")
+            else:
+                for tx in index.get_history(address):
+                    print(f"{address} {tx['txid']} 高度 {tx['height']} {tx['amount']:+} 聪")
+    index.close()
@@ -0,0 +1,284 @@
+"""
+统一的UTXO查询工具
+
+用途：
+- 所有课程脚本共用的UTXO来源，替代各目录下各自请求不同API的utxo_scanner
+- 可插拔的后端：mempool.space、blockstream、本地节点 scantxoutset、本地SQLite索引、ord
+- 后端返回统一格式的UTXO记录，按地址做TTL缓存，同一次运行内重复查询只请求一次
+- 默认不返回已被其他构建者预留或已广播花费的UTXO (tools/utxo_reservation.py)
+- 配置了ord服务地址时默认不返回带铭文或符文的UTXO，用ord批量查询并缓存 (tools/ord_filter.py)
+- 可选订阅websocket地址推送，在内存中维护UTXO集，查询不再请求API (tools/utxo_stream.py)
+
+统一的UTXO记录：
+{
+    "txid": str,
+    "vout": int,
+    "amount": int,          # 聪
+    "address": str,
+    "confirmed": bool,
+    "block_height": int | None,
+    "source": str,          # 后端名称
+    "inscriptions": list,   # 只有ord后端会填写
+    "runes": dict           # 只有ord后端会填写
+}
+
+使用示例：
+from tools.utxo_provider import get_provider
+
+utxos = get_provider().get_utxos("tb1p...")
+"""
+
+import time
+import threading
+from typing import Dict, List, Optional
+
+from tools.http_session import get_client
+from tools.node_rpc import NodeRPC
+from tools.utxo_reservation import get_reservations
+
+# 默认配置
+PROVIDER_CONFIG = {
+    "network": "testnet",
+    "backends": ["mempool", "blockstream"],  # 按顺序尝试，前一个失败时使用下一个
+    "ttl": 30,                               # 缓存有效期（秒）
+    "timeout": 10,                           # 单次请求超时（秒）
+    "node_rpc": {
+        "url": "http://127.0.0.1:18332",
+        "user": "",
+        "password": ""
+    },
+    "ord_url": "",                           # ord服务地址，如 http://127.0.0.1:80 (ord后端和ord_filter使用)
+    "ord_filter": True,                      # 配置了ord_url时用ord排除带铭文/符文的UTXO
+    "stream": False                          # 订阅地址推送，从内存返回UTXO (长时间运行的构建脚本建议开启)
+}
+
+def make_utxo(txid: str, vout: int, amount: int, address: str, source: str,
+              confirmed: bool = True, block_height: Optional[int] = None,
+              inscriptions: Optional[List] = None, runes: Optional[Dict] = None) -> Dict:
+    """生成统一格式的UTXO记录"""
+    return {
+        "txid": txid,
+        "vout": vout,
+        "amount": amount,
+        "address": address,
+        "confirmed": confirmed,
+        "block_height": block_height,
+        "source": source,
+        "inscriptions": inscriptions or [],
+        "runes": runes or {}
+    }
+
+class EsploraBackend:
+    """Esplora接口的后端 (mempool.space 和 blockstream 使用同一套API)"""
+
+    def __init__(self, name: str, base_url: str, timeout: int = 10):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def fetch(self, address: str) -> List[Dict]:
+        response = get_client().get(f"{self.base_url}/address/{address}/utxo", timeout=self.timeout)
+        response.raise_for_status()
+        return [
+            make_utxo(
+                u["txid"], u["vout"], u["value"], address, self.name,
+                confirmed=u.get("status", {}).get("confirmed", False),
+                block_height=u.get("status", {}).get("block_height")
+            )
+            for u in response.json()
+        ]
+
+class NodeBackend:
+    """本地比特币节点后端，使用 scantxoutset 扫描UTXO集 (只包含已确认的UTXO)"""
+
+    name = "node"
+
+    def __init__(self, url: str, user: str = "", password: str = "", timeout: int = 120):
+        # scantxoutset需要遍历整个UTXO集，超时时间要比HTTP API长得多
+        self.rpc = NodeRPC(url, user, password, timeout)
+
+    def fetch(self, address: str) -> List[Dict]:
+        result = self.rpc.call("scantxoutset", "start", [f"addr({address})"])
+        return [
+            make_utxo(
+                u["txid"], u["vout"], round(u["amount"] * 100_000_000), address, self.name,
+                confirmed=True, block_height=u.get("height")
+            )
+            for u in result["unspents"]
+        ]
+
+class IndexBackend:
+    """本地SQLite UTXO索引后端 (tools/utxo_index.py)，按区块增量更新，查询不再扫描UTXO集"""
+
+    name = "index"
+
+    def __init__(self, index):
+        self.index = index
+
+    def fetch(self, address: str) -> List[Dict]:
+        if not self.index.is_watched(address):
+            self.index.watch(address)
+        self.index.sync()
+        return self.index.get_utxos(address)
+
+class OrdBackend:
+    """ord服务后端，UTXO记录中带有inscription和rune信息"""
+
+    name = "ord"
+
+    def __init__(self, base_url: str, timeout: int = 10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.headers = {"Accept": "application/json"}
+
+    def fetch(self, address: str) -> List[Dict]:
+        response = get_client().get(
+            f"{self.base_url}/outputs/{address}",
+            params={"type": "any"},
+            headers=self.headers,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        utxos = []
+        for output in response.json():
+            if output.get("spent"):
+                continue
+            txid, vout = output["outpoint"].split(":")
+            utxos.append(make_utxo(
+                txid, int(vout), output["value"], address, self.name,
+                inscriptions=output.get("inscriptions"),
+                runes=output.get("runes")
+            ))
+        return utxos
+
+ESPLORA_HOSTS = {
+    "mempool": "https://mempool.space",
+    "blockstream": "https://blockstream.info"
+}
+
+def esplora_base_url(name: str = "mempool", network: str = PROVIDER_CONFIG["network"]) -> str:
+    """Esplora接口的API地址，如 https://mempool.space/testnet/api"""
+    network_path = "" if network == "mainnet" else f"/{network}"
+    return f"{ESPLORA_HOSTS[name]}{network_path}/api"
+
+def create_backend(name: str, config: Dict = PROVIDER_CONFIG):
+    """按名称创建后端: mempool / blockstream / node / index / ord"""
+    if name in ESPLORA_HOSTS:
+        return EsploraBackend(name, esplora_base_url(name, config["network"]), config["timeout"])
+    if name == "node":
+        rpc = config["node_rpc"]
+        return NodeBackend(rpc["url"], rpc["user"], rpc["password"])
+    if name == "index":
+        from tools.utxo_index import create_index
+        return IndexBackend(create_index(config))
+    if name == "ord":
+        if not config["ord_url"]:
+            raise ValueError("ord后端需要配置 PROVIDER_CONFIG['ord_url']")
+        return OrdBackend(config["ord_url"], config["timeout"])
+    raise ValueError(f"不支持的UTXO后端: {name}")
+
+class UTXOProvider:
+    """按地址缓存的UTXO查询，后端按顺序尝试"""
+
+    def __init__(self, backends: List, ttl: float = 30, reservations=None, output_filter=None, stream=None):
+        """
+        Args:
+            backends: 后端对象列表 (需要有 name 属性和 fetch(address) 方法)
+            ttl: 缓存有效期（秒），0表示不缓存
+            reservations: UTXOReservations，为None时不过滤预留的UTXO
+            output_filter: OrdOutputFilter，为None时不过滤带铭文/符文的UTXO
+            stream: UTXOStream，推送可用时从内存返回UTXO，为None时按ttl缓存和查询
+        """
+        self.backends = backends
+        self.ttl = ttl
+        self.reservations = reservations
+        self.output_filter = output_filter
+        self.stream = stream
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get_utxos(self, address: str, min_value: int = 0, refresh: bool = False,
+                  include_reserved: bool = False, include_protected: bool = False,
+                  owner: Optional[str] = None, protect_unavailable: Optional[bool] = None) -> List[Dict]:
+        """
+        获取地址的UTXO列表
+
+        Args:
+            address: 比特币地址
+            min_value: 最小金额（聪）
+            refresh: 为True时忽略缓存和推送维护的UTXO集，重新查询
+            include_reserved: 为True时也返回已被预留或已广播花费的UTXO
+            include_protected: 为True时也返回带铭文/符文的UTXO
+            owner: 预留者标识，该预留者自己预留的UTXO照常返回
+            protect_unavailable: ord不可用时是否排除无法确认是否带铭文/符文的UTXO，默认读取ORD_FILTER_CONFIG
+
+        Returns:
+            List[Dict]: 统一格式的UTXO记录 (缓存中记录的副本)
+        """
+        utxos = self._from_stream(address) if self.stream and not refresh else None
+        if utxos is None:
+            with self._lock:
+                cached = self._cache.get(address)
+            if refresh or not cached or time.time() - cached[0] > self.ttl:
+                utxos = self._fetch(address)
+                with self._lock:
+                    self._cache[address] = (time.time(), utxos)
+            else:
+                utxos = cached[1]
+        utxos = [dict(u) for u in utxos if u["amount"] >= min_value]
+        if self.reservations and not include_reserved:
+            utxos = self.reservations.filter_available(utxos, owner)
+        if self.output_filter and not include_protected and utxos:
+            utxos = self.output_filter.filter(utxos, protect_unavailable=protect_unavailable)
+        return utxos
+
+    def _from_stream(self, address: str) -> Optional[List[Dict]]:
+        """推送维护的UTXO集，第一次查询时开始监听该地址；推送不可用时返回None"""
+        utxos = self.stream.get_utxos(address)
+        if utxos is None and address not in self.stream.tracked() and self.stream.track(address):
+            utxos = self.stream.get_utxos(address)
+        return utxos
+
+    def _fetch(self, address: str) -> List[Dict]:
+        errors = []
+        for backend in self.backends:
+            try:
+                return backend.fetch(address)
+            except Exception as e:
+                errors.append(f"{backend.name}: {e}")
+        raise Exception(f"所有UTXO后端查询失败: {'; '.join(errors)}")
+
+    def prime(self, address: str, utxos: List[Dict]):
+        """写入从其他途径 (如批量查询) 得到的UTXO记录，之后的get_utxos直接使用缓存"""
+        with self._lock:
+            self._cache[address] = (time.time(), [dict(u) for u in utxos])
+
+    def invalidate(self, address: Optional[str] = None):
+        """清除缓存 (广播交易后调用，避免再次选中已花费的UTXO)"""
+        with self._lock:
+            if address is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(address, None)
+
+_default_provider = None
+
+def get_provider() -> UTXOProvider:
+    """按PROVIDER_CONFIG创建的进程内共享实例"""
+    global _default_provider
+    if _default_provider is None:
+        output_filter = None
+        if PROVIDER_CONFIG["ord_filter"] and PROVIDER_CONFIG["ord_url"]:
+            from tools.ord_filter import get_output_filter
+            output_filter = get_output_filter()
+        _default_provider = UTXOProvider(
+            [create_backend(name) for name in PROVIDER_CONFIG["backends"]],
+            ttl=PROVIDER_CONFIG["ttl"],
+            reservations=get_reservations(),
+            output_filter=output_filter
+        )
+        if PROVIDER_CONFIG["stream"]:
+            from tools.utxo_stream import UTXOStream
+            # 快照使用同一组后端
+            _default_provider.stream = UTXOStream(_default_provider._fetch)
+    return _default_provider
@@ -0,0 +1,231 @@
+"""
+UTXO预留 (锁定) 工具
+
+用途：
+- 多个交易构建脚本同时运行时 (如 course_06/1_commit_deploy.py 和 3_commit_mint.py)，
+  避免两个脚本选中同一个UTXO导致其中一笔交易广播失败
+- 选中的UTXO写入本地SQLite，在广播或过期之前其他进程看不到它
+- 广播成功后记录改为"已花费"，保留一段时间，直到各处的UTXO缓存和API都不再返回它
+
+预留记录保存在 course_05/persistence/utxo_reservations.sqlite，所有课程目录的脚本共用；
+SQLite的写事务保证多个进程同时预留时只有一个成功
+
+使用示例：
+from tools.utxo_reservation import get_reservations
+
+reservations = get_reservations()
+if reservations.reserve([utxo], owner="commit_deploy"):
+    ...构建并广播交易...
+    reservations.mark_broadcast([utxo], txid)
+
+命令行 (在course_05目录运行):
+python -m tools.utxo_reservation list
+python -m tools.utxo_reservation release <txid:vout> ...
+"""
+
+import os
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+# 默认配置
+RESERVATION_CONFIG = {
+    "db_path": os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "persistence", "utxo_reservations.sqlite"),
+    "ttl": 600,           # 预留有效期（秒），构建后一直没有广播的UTXO到期自动释放
+    "spent_ttl": 3600     # 广播后继续隐藏的时间（秒），等API和缓存不再返回已花费的UTXO
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reservations (
+    outpoint TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    status TEXT NOT NULL,
+    spent_txid TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reservations_by_expiry ON reservations (expires_at);
+"""
+
+def outpoint_of(utxo) -> str:
+    """UTXO记录或 "txid:vout" 字符串转换为 "txid:vout" """
+    if isinstance(utxo, str):
+        return utxo
+    return f"{utxo['txid']}:{utxo['vout']}"
+
+def default_owner() -> str:
+    """默认的预留者标识: 主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class UTXOReservations:
+    """基于SQLite的UTXO预留表 (多进程、多线程安全)"""
+
+    def __init__(self, db_path: str = RESERVATION_CONFIG["db_path"], ttl: float = RESERVATION_CONFIG["ttl"],
+                 spent_ttl: float = RESERVATION_CONFIG["spent_ttl"]):
+        """
+        Args:
+            db_path: SQLite数据库路径 (需要共享预留的进程使用同一个文件)
+            ttl: 默认预留有效期（秒）
+            spent_ttl: 广播后继续隐藏的时间（秒）
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.spent_ttl = spent_ttl
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # 自己控制事务；其他进程持有写锁时最多等待30秒
+        self.db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.db.close()
+
+    def reserve(self, utxos: Iterable, owner: Optional[str] = None, ttl: Optional[float] = None) -> bool:
+        """
+        预留一组UTXO，全部成功或全部失败
+
+        Args:
+            utxos: UTXO记录或 "txid:vout"
+            owner: 预留者标识，默认 主机名:进程号；同一预留者重复预留会延长有效期
+            ttl: 有效期（秒），默认使用构造时的ttl
+
+        Returns:
+            bool: 是否成功 (任意一个已被其他预留者占用时返回False)
+        """
+        outpoints = [outpoint_of(u) for u in utxos]
+        owner = owner or default_owner()
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+
+        with self._lock:
+            # BEGIN IMMEDIATE 立即取得写锁，检查和写入之间不会被其他进程插入
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.execute("DELETE FROM reservations WHERE expires_at <= ?", (now,))
+                for outpoint in outpoints:
+                    row = self.db.execute("SELECT owner, status FROM reservations WHERE outpoint = ?", (outpoint,)).fetchone()
+                    if row and (row[0] != owner or row[1] != "reserved"):
+                        self.db.execute("ROLLBACK")
+                        return False
+                self.db.executemany(
+                    """INSERT INTO reservations (outpoint, owner, status, created_at, expires_at) VALUES (?, ?, 'reserved', ?, ?)
+                       ON CONFLICT (outpoint) DO UPDATE SET expires_at = excluded.expires_at""",
+                    [(outpoint, owner, now, expires_at) for outpoint in outpoints]
+                )
+                self.db.execute("COMMIT")
+                return True
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def release(self, utxos: Optional[Iterable] = None, owner: Optional[str] = None) -> int:
+        """
+        释放预留 (交易构建失败或放弃广播时调用)，已广播的记录不受影响
+
+        Args:
+            utxos: 要释放的UTXO，为None时释放owner的全部预留
+            owner: 只释放该预留者的记录，为None时不限
+
+        Returns:
+            int: 释放的数量
+        """
+        conditions = ["status = 'reserved'"]
+        params = []
+        if utxos is not None:
+            outpoints = [outpoint_of(u) for u in utxos]
+            conditions.append(f"outpoint IN ({','.join('?' * len(outpoints))})")
+            params.extend(outpoints)
+        if owner is not None:
+            conditions.append("owner = ?")
+            params.append(owner)
+        if utxos is None and owner is None:
+            raise ValueError("release需要指定utxos或owner")
+        with self._lock:
+            return self.db.execute(f"DELETE FROM reservations WHERE {' AND '.join(conditions)}", params).rowcount
+
+    def mark_broadcast(self, utxos: Iterable, txid: str, owner: Optional[str] = None):
+        """
+        交易广播成功后调用: 输入的UTXO改为已花费，spent_ttl内继续对其他构建者隐藏
+
+        没有预留过的UTXO (如手工构建的交易) 也会被记录
+        """
+        now = time.time()
+        owner = owner or default_owner()
+        with self._lock:
+            self.db.executemany(
+                """INSERT INTO reservations (outpoint, owner, status, spent_txid, created_at, expires_at)
+                   VALUES (?, ?, 'spent', ?, ?, ?)
+                   ON CONFLICT (outpoint) DO UPDATE SET status = 'spent', spent_txid = excluded.spent_txid,
+                   expires_at = excluded.expires_at""",
+                [(outpoint_of(u), owner, txid, now, now + self.spent_ttl) for u in utxos]
+            )
+
+    def reserved(self) -> Set[str]:
+        """当前有效的预留和已花费记录 ("txid:vout" 集合)"""
+        with self._lock:
+            return {row[0] for row in self.db.execute(
+                "SELECT outpoint FROM reservations WHERE expires_at > ?", (time.time(),)
+            )}
+
+    def owned(self, owner: str) -> Set[str]:
+        """owner自己当前有效的预留 ("txid:vout" 集合，不含已花费记录)"""
+        with self._lock:
+            return {row[0] for row in self.db.execute(
+                "SELECT outpoint FROM reservations WHERE owner = ? AND status = 'reserved' AND expires_at > ?",
+                (owner, time.time())
+            )}
+
+    def filter_available(self, utxos: Iterable[Dict], owner: Optional[str] = None) -> List[Dict]:
+        """
+        去掉已被预留或已花费的UTXO
+
+        Args:
+            utxos: UTXO记录
+            owner: 保留该预留者自己预留的UTXO (重启后的同名任务能看到自己预留的UTXO)
+        """
+        reserved = self.reserved()
+        if owner is not None:
+            reserved -= self.owned(owner)
+        return [u for u in utxos if outpoint_of(u) not in reserved]
+
+    def list(self) -> List[Dict]:
+        """全部有效记录，便于检查"""
+        with self._lock:
+            rows = self.db.execute(
+                """SELECT outpoint, owner, status, spent_txid, created_at, expires_at FROM reservations
+                   WHERE expires_at > ? ORDER BY created_at""",
+                (time.time(),)
+            ).fetchall()
+        keys = ("outpoint", "owner", "status", "spent_txid", "created_at", "expires_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+_default_reservations = None
+_default_reservations_lock = threading.Lock()
+
+def get_reservations() -> UTXOReservations:
+    """按RESERVATION_CONFIG创建的进程内共享实例"""
+    global _default_reservations
+    with _default_reservations_lock:
+        if _default_reservations is None:
+            _default_reservations = UTXOReservations()
+    return _default_reservations
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UTXO预留管理")
+    parser.add_argument("command", choices=["list", "release"])
+    parser.add_argument("outpoints", nargs="*", help="txid:vout")
+    parser.add_argument("--owner", default=None, help="只释放该预留者的记录")
+    args = parser.parse_args()
+
+    reservations = get_reservations()
+    if args.command == "list":
+        for record in reservations.list():
+            remaining = record["expires_at"] - time.time()
+            print(f"{record['outpoint']}  {record['status']:<8} {record['owner']:<24} 剩余 {remaining:.0f}s"
+                  + (f"  花费交易 {record['spent_txid']}" if record["spent_txid"] else ""))
+    else:
+        count = reservations.release(args.outpoints or None, args.owner)
+        print(f"✅ 释放 {count} 个预留")
@@ -1,7 +1,8 @@
-import requests
 from typing import List, Dict
 import logging
 
+from tools.utxo_provider import get_provider
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,17 +18,11 @@ def get_utxos(address: str, min_value: int = 600) -> List[Dict]:
     Returns:
         List[Dict]: UTXO列表
     """
-    url = f"https://mempool.space/testnet/api/address/{address}/utxo"
-    
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        utxos = response.json()
-        
-        # 过滤出大于最小值的UTXO
+        # 通过共享的UTXO provider查询（带缓存），保留mempool API的value字段供原有调用方使用
         filtered_utxos = [
-            utxo for utxo in utxos
-            if utxo.get('value', 0) >= min_value
+            {**utxo, 'value': utxo['amount']}
+            for utxo in get_provider().get_utxos(address, min_value)
         ]
         
         if not filtered_utxos:
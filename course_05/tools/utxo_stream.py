@@ -0,0 +1,547 @@
+"""
+推送式UTXO更新工具
+
+用途：
+- 订阅mempool.space的websocket地址推送 (track-addresses)，在内存中维护被监听地址的UTXO集
+- 每个地址只在开始监听 (以及断线重连) 时用REST接口取一次完整快照，之后按推送的交易增量更新:
+  交易的输入花费了被监听地址的UTXO就删除，输出付给被监听地址就加入
+- UTXOProvider 设置了stream时，get_utxos / select_best_utxo 直接从内存返回，构建交易前不再请求API
+- 推送中断时get_utxos返回None，调用方回退到原来的REST查询；后台线程自动重连并重新取快照
+
+websocket客户端只使用标准库 (socket/ssl，RFC 6455 的文本帧、ping/pong、分片和关闭帧)；
+LocalTrackServer 是本地的推送服务替身，测试时代替mempool.space向客户端推送交易
+
+推送消息格式 (Esplora交易JSON):
+    {"multi-address-transactions": {address: {"mempool": [tx], "confirmed": [tx], "removed": [tx]}}}
+    {"address-transactions": [tx]} / {"block-transactions": [tx]} / {"address-removed-transactions": [tx]}
+
+使用示例：
+from tools.utxo_provider import PROVIDER_CONFIG, get_provider
+
+PROVIDER_CONFIG["stream"] = True        # 在第一次调用get_provider之前设置
+utxos = get_provider().get_utxos("tb1p...")   # 第一次取快照并订阅，之后从内存返回
+"""
+
+import os
+import ssl
+import json
+import base64
+import select
+import socket
+import struct
+import hashlib
+import threading
+import socketserver
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from tools.utxo_provider import PROVIDER_CONFIG, make_utxo
+
+# 默认配置
+STREAM_CONFIG = {
+    "url": None,              # websocket地址，为None时按PROVIDER_CONFIG的网络使用mempool.space
+    "ping_interval": 30,      # 没有收到消息时发送ping的间隔（秒）
+    "reconnect_delay": 5,     # 断线后重连的等待时间（秒）
+    "connect_timeout": 10,    # 连接和握手超时（秒）
+    "track_timeout": 10       # track()等待连接建立的时间（秒）
+}
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+def mempool_ws_url(network: str = PROVIDER_CONFIG["network"]) -> str:
+    """mempool.space的websocket地址，如 wss://mempool.space/testnet/api/v1/ws"""
+    network_path = "" if network == "mainnet" else f"/{network}"
+    return f"wss://mempool.space{network_path}/api/v1/ws"
+
+def _accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+def _encode_frame(opcode: int, payload: bytes, mask: bool) -> bytes:
+    """编码一个完整的帧 (FIN=1)，客户端发送的帧必须加掩码"""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack("!H", length)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack("!Q", length)
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + _apply_mask(payload, key)
+
+def _apply_mask(payload: bytes, key: bytes) -> bytes:
+    # 按整数一次异或全部字节，比逐字节循环快得多
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(len(payload), "big")
+
+class WebSocketClosed(Exception):
+    """连接已关闭"""
+
+class FrameSocket:
+    """在已建立的socket上收发websocket帧 (客户端和本地替身服务共用)"""
+
+    def __init__(self, sock: socket.socket, mask: bool, buffer: bytes = b""):
+        self.sock = sock
+        self.mask = mask
+        self._buffer = buffer
+        self._send_lock = threading.Lock()
+        self.closed = False
+
+    def _read_exact(self, count: int) -> bytes:
+        while len(self._buffer) < count:
+            chunk = self.sock.recv(max(65536, count - len(self._buffer)))
+            if not chunk:
+                self.closed = True
+                raise WebSocketClosed("连接被对方关闭")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:count], self._buffer[count:]
+        return data
+
+    def readable(self, timeout: float) -> bool:
+        """在timeout内是否有数据可读 (已缓冲的数据和SSL内部缓冲也算)"""
+        if self._buffer or (isinstance(self.sock, ssl.SSLSocket) and self.sock.pending()):
+            return True
+        return bool(select.select([self.sock], [], [], timeout)[0])
+
+    def _read_frame(self):
+        first, second = self._read_exact(2)
+        fin, opcode = first & 0x80, first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self._read_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self._read_exact(8))[0]
+        key = self._read_exact(4) if second & 0x80 else None
+        payload = self._read_exact(length)
+        if key:
+            payload = _apply_mask(payload, key)
+        return fin, opcode, payload
+
+    def send(self, opcode: int, payload: bytes):
+        with self._send_lock:
+            self.sock.sendall(_encode_frame(opcode, payload, self.mask))
+
+    def send_text(self, text: str):
+        self.send(OP_TEXT, text.encode())
+
+    def recv(self) -> str:
+        """
+        读取下一条完整的数据消息 (自动回复ping，拼接分片)
+
+        Raises:
+            WebSocketClosed: 收到关闭帧或连接断开
+        """
+        fragments = []
+        while True:
+            fin, opcode, payload = self._read_frame()
+            if opcode == OP_PING:
+                self.send(OP_PONG, payload)
+            elif opcode == OP_PONG:
+                continue
+            elif opcode == OP_CLOSE:
+                if not self.closed:
+                    self.closed = True
+                    try:
+                        self.send(OP_CLOSE, payload[:2])
+                    except OSError:
+                        pass
+                raise WebSocketClosed("收到关闭帧")
+            else:
+                fragments.append(payload)
+                if fin:
+                    return b"".join(fragments).decode()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.send(OP_CLOSE, struct.pack("!H", 1000))
+            except OSError:
+                pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+def connect_websocket(url: str, timeout: float = STREAM_CONFIG["connect_timeout"]) -> FrameSocket:
+    """
+    建立websocket连接 (ws:// 或 wss://)
+
+    Returns:
+        FrameSocket: 已完成握手的连接
+    """
+    parsed = urlparse(url)
+    secure = parsed.scheme == "wss"
+    host = parsed.hostname
+    port = parsed.port or (443 if secure else 80)
+    path = parsed.path or "/"
+    if parsed.query:
+        path += f"?{parsed.query}"
+
+    sock = socket.create_connection((host, port), timeout=timeout)
+    if secure:
+        sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+    key = base64.b64encode(os.urandom(16)).decode()
+    request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {parsed.netloc}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\n"
+        "Sec-WebSocket-Version: 13\r\n\r\n"
+    )
+    sock.sendall(request.encode())
+
+    response = b""
+    while b"\r\n\r\n" not in response:
+        chunk = sock.recv(4096)
+        if not chunk:
+            sock.close()
+            raise WebSocketClosed("握手时连接被关闭")
+        response += chunk
+    head, rest = response.split(b"\r\n\r\n", 1)
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {k.strip().lower(): v.strip() for k, v in (line.split(":", 1) for line in lines[1:] if ":" in line)}
+    if lines[0].split()[1:2] != ["101"] or headers.get("sec-websocket-accept") != _accept_key(key):
+        sock.close()
+        raise WebSocketClosed(f"websocket握手失败: {lines[0]}")
+    # 握手之后由select和帧读取控制等待时间
+    sock.settimeout(None)
+    return FrameSocket(sock, mask=True, buffer=rest)
+
+class _AddressState:
+    def __init__(self):
+        self.utxos: Dict[str, Dict] = {}
+        self.ready = False
+        self.pending: List[tuple] = []   # 取快照期间收到的交易，快照完成后重放
+
+class UTXOStream:
+    """
+    订阅地址推送，在内存中维护UTXO集
+
+    后台线程负责连接、订阅和处理推送；线程安全
+    """
+
+    def __init__(self, fetch: Callable[[str], List[Dict]], url: Optional[str] = None,
+                 ping_interval: float = STREAM_CONFIG["ping_interval"],
+                 reconnect_delay: float = STREAM_CONFIG["reconnect_delay"]):
+        """
+        Args:
+            fetch: 取地址完整UTXO快照的函数，如UTXOProvider._fetch
+            url: websocket地址，默认读取STREAM_CONFIG，再默认使用mempool.space
+            ping_interval: 没有收到消息时发送ping的间隔（秒）
+            reconnect_delay: 断线后重连的等待时间（秒）
+        """
+        self.fetch = fetch
+        self.url = url or STREAM_CONFIG["url"] or mempool_ws_url()
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self._addresses: Dict[str, _AddressState] = {}
+        self._spent = set()   # 本次连接中见过被花费的outpoint，乱序到达的交易不会让它们复活
+        self._lock = threading.Lock()
+        self._ws: Optional[FrameSocket] = None
+        self._connected = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.messages = 0
+
+    def start(self):
+        """启动后台线程 (track时自动调用)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="utxo-stream", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        ws = self._ws
+        if ws:
+            ws.close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    @property
+    def live(self) -> bool:
+        return self._connected.is_set()
+
+    def track(self, address: str, timeout: float = STREAM_CONFIG["track_timeout"]) -> bool:
+        """
+        开始监听一个地址: 订阅推送，并取一次快照
+
+        Returns:
+            bool: 推送是否可用 (连接失败时返回False，调用方应回退到REST查询)
+        """
+        with self._lock:
+            state = self._addresses.setdefault(address, _AddressState())
+        self.start()
+        if not self._connected.wait(timeout):
+            print(f"⚠️ UTXO推送连接失败，回退到REST查询: {self.url}")
+            return False
+        if not state.ready:
+            # 先订阅再取快照: 取快照期间的推送暂存，快照之后重放，两者之间不会漏掉交易
+            self._subscribe()
+            self._seed(address)
+        return self.live
+
+    def untrack(self, address: str):
+        with self._lock:
+            self._addresses.pop(address, None)
+        if self.live:
+            self._subscribe()
+
+    def tracked(self) -> List[str]:
+        with self._lock:
+            return list(self._addresses)
+
+    def get_utxos(self, address: str) -> Optional[List[Dict]]:
+        """
+        内存中的UTXO (记录的副本)
+
+        Returns:
+            Optional[List[Dict]]: 地址没有被监听、快照未完成或推送已断开时返回None
+        """
+        if not self.live:
+            return None
+        with self._lock:
+            state = self._addresses.get(address)
+            if not state or not state.ready:
+                return None
+            return [dict(u) for u in state.utxos.values()]
+
+    def _subscribe(self):
+        ws = self._ws
+        if ws:
+            ws.send_text(json.dumps({"track-addresses": self.tracked()}))
+
+    def _seed(self, address: str):
+        """用REST快照重置一个地址的UTXO集，然后重放快照期间收到的交易"""
+        try:
+            snapshot = self.fetch(address)
+        except Exception as e:
+            print(f"⚠️ 获取 {address} 的UTXO快照失败: {e}")
+            return
+        with self._lock:
+            state = self._addresses.get(address)
+            if state is None:
+                return
+            state.utxos = {f"{u['txid']}:{u['vout']}": dict(u) for u in snapshot
+                           if f"{u['txid']}:{u['vout']}" not in self._spent}
+            pending, state.pending = state.pending, []
+            state.ready = True
+            for tx, confirmed in pending:
+                self._apply_tx(tx, confirmed, only=address)
+
+    def _apply_tx(self, tx: Dict, confirmed: bool, only: Optional[str] = None):
+        """按一笔交易更新UTXO集 (调用时持有锁)，重复应用同一笔交易结果不变"""
+        status = tx.get("status", {})
+        confirmed = confirmed or status.get("confirmed", False)
+        for vin in tx.get("vin", []):
+            prevout = vin.get("prevout") or {}
+            address = prevout.get("scriptpubkey_address")
+            outpoint = f"{vin.get('txid')}:{vin.get('vout')}"
+            self._spent.add(outpoint)
+            state = self._addresses.get(address)
+            if state and (only is None or address == only):
+                if state.ready:
+                    state.utxos.pop(outpoint, None)
+                elif only is None:
+                    state.pending.append((tx, confirmed))
+        for vout, output in enumerate(tx.get("vout", [])):
+            address = output.get("scriptpubkey_address")
+            state = self._addresses.get(address)
+            if not state or (only is not None and address != only):
+                continue
+            if not state.ready:
+                if only is None:
+                    state.pending.append((tx, confirmed))
+                continue
+            outpoint = f"{tx['txid']}:{vout}"
+            if outpoint in self._spent:
+                continue
+            state.utxos[outpoint] = make_utxo(
+                tx["txid"], vout, output["value"], address, "stream",
+                confirmed=confirmed, block_height=status.get("block_height")
+            )
+
+    def _unspend(self, tx: Dict):
+        """被移出内存池的交易不再花费它的输入"""
+        for vin in tx.get("vin", []):
+            self._spent.discard(f"{vin.get('txid')}:{vin.get('vout')}")
+
+    def _addresses_of(self, tx: Dict) -> set:
+        addresses = {(vin.get("prevout") or {}).get("scriptpubkey_address") for vin in tx.get("vin", [])}
+        addresses |= {output.get("scriptpubkey_address") for output in tx.get("vout", [])}
+        return addresses & set(self._addresses)
+
+    def handle_message(self, message: Dict):
+        """处理一条推送消息，返回需要重新取快照的地址 (有交易被替换或移出内存池)"""
+        removed = []
+        with self._lock:
+            if "multi-address-transactions" in message:
+                for address, changes in message["multi-address-transactions"].items():
+                    for tx in changes.get("mempool", []):
+                        self._apply_tx(tx, False)
+                    for tx in changes.get("confirmed", []):
+                        self._apply_tx(tx, True)
+                    for tx in changes.get("removed", []):
+                        self._unspend(tx)
+                        removed.append(address)
+            for tx in message.get("address-transactions", []):
+                self._apply_tx(tx, False)
+            for tx in message.get("block-transactions", []):
+                self._apply_tx(tx, True)
+            for tx in message.get("address-removed-transactions", []):
+                self._unspend(tx)
+                removed.extend(self._addresses_of(tx))
+            self.messages += 1
+        # 被替换的交易要恢复它花费的UTXO、删除它的输出，直接重新取快照最可靠
+        for address in dict.fromkeys(removed):
+            self._seed(address)
+        return removed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._ws = connect_websocket(self.url)
+            except Exception as e:
+                print(f"⚠️ UTXO推送连接失败 ({e})，{self.reconnect_delay}s后重试")
+                self._stop.wait(self.reconnect_delay)
+                continue
+            try:
+                with self._lock:
+                    self._spent.clear()
+                    addresses = list(self._addresses)
+                    for state in self._addresses.values():
+                        state.ready = False
+                        state.pending = []
+                self._subscribe()
+                # 断线期间可能漏掉推送，全部地址重新取快照
+                for address in addresses:
+                    self._seed(address)
+                self._connected.set()
+                print(f"📥 UTXO推送已连接: {self.url} ({len(addresses)} 个地址)")
+                while not self._stop.is_set():
+                    if not self._ws.readable(self.ping_interval):
+                        self._ws.send_text(json.dumps({"action": "ping"}))
+                        continue
+                    message = json.loads(self._ws.recv())
+                    if isinstance(message, dict):
+                        self.handle_message(message)
+            except (WebSocketClosed, OSError, ValueError) as e:
+                if not self._stop.is_set():
+                    print(f"⚠️ UTXO推送断开 ({e})，{self.reconnect_delay}s后重连")
+            finally:
+                self._connected.clear()
+                self._ws.close()
+                self._ws = None
+            self._stop.wait(self.reconnect_delay)
+
+class LocalTrackServer:
+    """
+    本地的地址推送服务替身 (只用于测试和演示)
+
+    接受websocket连接，记录每个客户端订阅的地址，publish时按mempool.space的
+    multi-address-transactions格式推送给订阅了相关地址的客户端
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        owner = self
+        self.clients: List[tuple] = []   # (FrameSocket, 订阅的地址集合)
+        self._lock = threading.Lock()
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                owner._serve(self.request)
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"ws://{host}:{self.server.server_address[1]}/api/v1/ws"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _serve(self, sock: socket.socket):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return
+            request += chunk
+        head, rest = request.split(b"\r\n\r\n", 1)
+        headers = {k.strip().lower(): v.strip() for k, v in
+                   (line.split(":", 1) for line in head.decode("latin-1").split("\r\n")[1:] if ":" in line)}
+        sock.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {_accept_key(headers.get('sec-websocket-key', ''))}\r\n\r\n"
+        ).encode())
+        ws = FrameSocket(sock, mask=False, buffer=rest)
+        client = (ws, set())
+        with self._lock:
+            self.clients.append(client)
+        try:
+            while True:
+                message = json.loads(ws.recv())
+                if "track-addresses" in message:
+                    client[1].clear()
+                    client[1].update(message["track-addresses"])
+                elif "track-address" in message:
+                    client[1].clear()
+                    client[1].add(message["track-address"])
+                elif message.get("action") == "ping":
+                    ws.send_text(json.dumps({"pong": True}))
+        except (WebSocketClosed, OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self.clients.remove(client)
+            ws.close()
+
+    def subscribers(self) -> int:
+        """已订阅地址的客户端数"""
+        with self._lock:
+            return sum(1 for _, addresses in self.clients if addresses)
+
+    def publish(self, tx: Dict, kind: str = "mempool"):
+        """
+        推送一笔交易
+
+        Args:
+            tx: Esplora格式的交易 (vin带prevout)
+            kind: mempool / confirmed / removed
+        """
+        involved = {(vin.get("prevout") or {}).get("scriptpubkey_address") for vin in tx.get("vin", [])}
+        involved |= {output.get("scriptpubkey_address") for output in tx.get("vout", [])}
+        with self._lock:
+            clients = list(self.clients)
+        for ws, addresses in clients:
+            matched = involved & addresses
+            if matched:
+                message = {"multi-address-transactions": {a: {kind: [tx]} for a in matched}}
+                try:
+                    ws.send_text(json.dumps(message))
+                except OSError:
+                    pass
+
+    def drop_clients(self):
+        """断开全部客户端 (测试重连)"""
+        with self._lock:
+            clients = list(self.clients)
+        for ws, _ in clients:
+            ws.close()
+
+    def shutdown(self):
+        self.drop_clients()
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,324 @@
+"""
+批量付款交易工具
+
+用途：
+- 一次给几百个用户付款: 每笔交易包含很多个付款输出 + 一个找零输出，
+  代替"每个用户一笔交易"，交易头、找零和输入的手续费只付一次
+- 接收地址可以是任意支持的类型: P2PKH、P2SH、P2WPKH、P2WSH、P2TR
+- 对全部付款只做一次选币，再按每笔交易的输出数和虚拟大小上限拆分成多笔交易
+- 每笔交易的手续费按签名前算出的准确大小 (utils/tx_size.py) 计算，找零 = 输入 - 付款 - 手续费，
+  有找零时实际费率与目标费率一致 (手续费向上取整到聪)
+- 前面交易的输入用完时，后面的交易花费前面交易的找零 (未确认的交易链，需要按顺序广播)
+
+付款列表CSV (金额单位为聪，第一行可以是表头):
+    address,amount
+    tb1p...,15000
+    mipcBbFg9gMiCh81Kj8tqqdgoZub1ZJRfn,20000
+
+使用示例：
+from utils.batch_payout import load_payouts, create_batch_payout
+
+transactions = create_batch_payout(sender_private_key, load_payouts("payouts.csv"), fee_rate=3)
+for tx in transactions:
+    print(tx["txid"], tx["hex"])
+
+命令行 (在course_05目录运行):
+python -m utils.batch_payout payouts.csv --key <WIF私钥> --fee-rate 3
+"""
+
+import csv
+import math
+import argparse
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+from bitcoinutils.setup import setup
+from bitcoinutils.keys import PrivateKey, P2pkhAddress, P2shAddress, P2wpkhAddress, P2wshAddress, P2trAddress
+from bitcoinutils.script import Script
+from bitcoinutils.transactions import Transaction, TxInput, TxOutput, TxWitnessInput
+
+from tools.utxo_scanner import get_utxos
+from tools.utxo_reservation import get_reservations
+from utils.coin_selection import (
+    select_coins, fee_for, utxo_amount, SELECTION_CONFIG, INPUT_VBYTES, OUTPUT_VBYTES, TX_OVERHEAD_VBYTES,
+    MAX_STANDARD_TX_VSIZE
+)
+from utils.tx_size import estimate_vsize
+from utils.parallel_signing import sign_taproot_inputs
+
+# 默认配置
+PAYOUT_CONFIG = {
+    "max_outputs": 250,                  # 每笔交易最多的付款输出数 (不含找零)
+    "max_vsize": MAX_STANDARD_TX_VSIZE,  # 每笔交易的最大虚拟大小
+    "min_change": SELECTION_CONFIG["min_change"]  # 低于此值的找零并入手续费
+}
+
+# 各类型输出的粉尘限制 (聪)，低于此金额的输出不会被节点转发
+DUST_LIMITS = {
+    "p2pkh": 546,
+    "p2sh": 540,
+    "p2wpkh": 294,
+    "p2wsh": 330,
+    "p2tr": 330
+}
+
+ADDRESS_CLASSES = [
+    ("p2tr", P2trAddress),
+    ("p2wpkh", P2wpkhAddress),
+    ("p2wsh", P2wshAddress),
+    ("p2pkh", P2pkhAddress),
+    ("p2sh", P2shAddress)
+]
+
+def address_script(address: str) -> Tuple[str, Script]:
+    """
+    识别地址类型 (按当前setup的网络)
+
+    Returns:
+        Tuple[str, Script]: (类型名, 输出脚本)
+
+    Raises:
+        ValueError: 不支持或无效的地址
+    """
+    for name, cls in ADDRESS_CLASSES:
+        try:
+            return name, cls(address).to_script_pub_key()
+        except (ValueError, TypeError):
+            continue
+    raise ValueError(f"不支持或无效的地址: {address}")
+
+def load_payouts(path: str) -> List[Tuple[str, int]]:
+    """
+    读取付款列表CSV (address,amount；金额单位为聪)
+
+    Returns:
+        List[Tuple[str, int]]: (地址, 金额)
+    """
+    payouts = []
+    with open(path, newline="") as f:
+        for line_number, row in enumerate(csv.reader(f), 1):
+            if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                continue
+            if len(row) < 2:
+                raise ValueError(f"{path}:{line_number} 需要两列 address,amount")
+            address, amount = row[0].strip(), row[1].strip()
+            if not amount.isdigit():
+                if line_number == 1:
+                    continue  # 表头
+                raise ValueError(f"{path}:{line_number} 金额必须是整数 (聪): {amount}")
+            payouts.append((address, int(amount)))
+    return payouts
+
+def _prepare_payouts(payouts: Iterable[Tuple[str, int]]) -> List[Dict]:
+    """检查付款列表，识别每个地址的类型和输出脚本"""
+    prepared = []
+    for address, amount in payouts:
+        script_type, script = address_script(address)
+        amount = int(amount)
+        if amount < DUST_LIMITS[script_type]:
+            raise ValueError(f"付款金额 {amount} 聪低于 {script_type} 的粉尘限制 {DUST_LIMITS[script_type]}: {address}")
+        prepared.append({"address": address, "amount": amount, "type": script_type, "script": script})
+    if not prepared:
+        raise ValueError("付款列表为空")
+    return prepared
+
+class _TxBuilder:
+    """一笔批量付款交易的输入和输出，按准确的交易大小计算所需金额"""
+
+    def __init__(self, change_script: Script, fee_rate: float):
+        self.change_script = change_script
+        self.fee_rate = fee_rate
+        self.inputs: List[Dict] = []
+        self.payouts: List[Dict] = []
+
+    def vsize(self, with_change: bool = True) -> int:
+        outputs = [p["script"] for p in self.payouts] + ([self.change_script] if with_change else [])
+        return estimate_vsize(["p2tr"] * len(self.inputs), outputs)
+
+    def input_total(self) -> int:
+        return sum(utxo_amount(u) for u in self.inputs)
+
+    def payout_total(self) -> int:
+        return sum(p["amount"] for p in self.payouts)
+
+    def shortfall(self, with_change: bool = True) -> int:
+        """在有 (或没有) 找零输出的情况下还差的金额"""
+        return self.payout_total() + fee_for(self.vsize(with_change), self.fee_rate) - self.input_total()
+
+def create_batch_payout(
+    sender_private_key: str,
+    payouts: Iterable[Tuple[str, int]],
+    fee_rate: float,
+    max_outputs: int = None,
+    max_vsize: int = None,
+    workers: int = None,
+    owner: str = None
+) -> List[Dict]:
+    """
+    创建批量付款交易 (不广播)
+
+    Args:
+        sender_private_key: 发送方私钥 (WIF)，从它的Taproot地址付款
+        payouts: (地址, 金额聪) 序列，如load_payouts的结果
+        fee_rate: 费率（sat/vB）
+        max_outputs: 每笔交易最多的付款输出数，默认读取PAYOUT_CONFIG
+        max_vsize: 每笔交易的最大虚拟大小，默认读取PAYOUT_CONFIG
+        workers: 签名进程数，默认读取PARALLEL_SIGNING_CONFIG
+        owner: UTXO预留者标识，默认 主机名:进程号
+
+    Returns:
+        List[Dict]: 按广播顺序的交易 {"txid", "hex", "vsize", "fee", "fee_rate", "change",
+                    "payouts", "inputs", "depends_on"}
+
+    Raises:
+        Exception: 余额不足，或选中的UTXO已被其他脚本预留
+    """
+    setup('testnet')
+    max_outputs = max_outputs or PAYOUT_CONFIG["max_outputs"]
+    max_vsize = max_vsize or PAYOUT_CONFIG["max_vsize"]
+    min_change = PAYOUT_CONFIG["min_change"]
+
+    sender_key = PrivateKey(sender_private_key)
+    sender_address = sender_key.get_public_key().get_taproot_address()
+    change_script = sender_address.to_script_pub_key()
+    prepared = _prepare_payouts(payouts)
+    payout_total = sum(p["amount"] for p in prepared)
+
+    # 估算要拆成几笔交易；每多一笔交易多一份交易头、一个找零输出和 (可能) 一个花费上一笔找零的输入
+    output_vbytes = sum(OUTPUT_VBYTES[p["type"]] for p in prepared)
+    tx_count = max(math.ceil(len(prepared) / max_outputs), math.ceil(output_vbytes / (max_vsize * 0.9)))
+    extra_vbytes = (tx_count - 1) * (TX_OVERHEAD_VBYTES + OUTPUT_VBYTES["p2tr"] + INPUT_VBYTES["p2tr"]) + tx_count
+
+    # 对全部付款只选一次币，选中的UTXO全部预留
+    for _ in range(3):
+        utxos = get_utxos(sender_address.to_string())
+        selection = select_coins(
+            utxos, payout_total + fee_for(extra_vbytes, fee_rate), fee_rate,
+            output_types=[p["type"] for p in prepared],
+            max_vsize=max_vsize * tx_count
+        )
+        if not selection:
+            raise Exception("Insufficient funds for batch payout and fee")
+        if get_reservations().reserve(selection['inputs'], owner):
+            break
+    else:
+        raise Exception("Selected UTXOs are reserved by other transaction builders")
+
+    print(f"\n=== 批量付款: {len(prepared)} 笔付款, 合计 {payout_total} 聪 ===")
+    print(f"选币算法: {selection['algorithm']} ({len(selection['inputs'])} 个UTXO, 合计 {selection['input_total']} 聪)")
+
+    coins = deque(sorted(selection['inputs'], key=utxo_amount, reverse=True))
+    # 前面交易的找零，选中的UTXO用完后再花费 (从大到小)
+    pending_changes = deque()
+    built = []
+
+    def take_input(builder: _TxBuilder) -> Tuple[deque, Dict]:
+        source = coins if coins else pending_changes
+        if not source:
+            raise Exception("Insufficient funds for batch payout and fee")
+        utxo = source.popleft()
+        builder.inputs.append(utxo)
+        return source, utxo
+
+    index = 0
+    try:
+        while index < len(prepared):
+            builder = _TxBuilder(change_script, fee_rate)
+            while index < len(prepared) and len(builder.payouts) < max_outputs:
+                builder.payouts.append(prepared[index])
+                taken = []
+                while builder.shortfall() > 0:
+                    if not coins and not pending_changes and builder.shortfall(with_change=False) <= 0:
+                        # 选币没有留出找零 (如分支定界的无找零组合)，这笔交易不要找零
+                        break
+                    taken.append(take_input(builder))
+                if builder.vsize() > max_vsize:
+                    if len(builder.payouts) == 1:
+                        raise Exception(f"单笔付款需要的输入超过交易大小上限 {max_vsize} vB")
+                    # 放不下这笔付款: 撤销，留给下一笔交易
+                    builder.payouts.pop()
+                    for source, utxo in reversed(taken):
+                        builder.inputs.pop()
+                        source.appendleft(utxo)
+                    break
+                index += 1
+            built.append(_finalize(builder, sender_key, pending_changes, min_change, workers))
+    except Exception:
+        get_reservations().release(selection['inputs'])
+        raise
+
+    # 选币多选的UTXO没有用到，释放预留
+    if coins:
+        get_reservations().release(list(coins))
+
+    _print_summary(built, fee_rate)
+    return built
+
+def _finalize(builder: _TxBuilder, sender_key: PrivateKey, pending_changes: deque, min_change: int, workers) -> Dict:
+    """确定找零和手续费，签名一笔交易；找零加入pending_changes供后面的交易使用"""
+    input_total = builder.input_total()
+    payout_total = builder.payout_total()
+    fee = fee_for(builder.vsize(), builder.fee_rate)
+    change = input_total - payout_total - fee
+    if change < min_change:
+        # 找零太少不值得创建，并入手续费 (找零为负时输入只够无找零的交易，已由shortfall(with_change=False)检查)
+        change = 0
+        fee = input_total - payout_total
+
+    tx_inputs = [TxInput(u['txid'], u['vout']) for u in builder.inputs]
+    tx_outputs = [TxOutput(p["amount"], p["script"]) for p in builder.payouts]
+    if change:
+        tx_outputs.append(TxOutput(change, builder.change_script))
+    tx = Transaction(tx_inputs, tx_outputs, has_segwit=True)
+
+    input_scripts = [builder.change_script] * len(tx_inputs)
+    input_amounts = [utxo_amount(u) for u in builder.inputs]
+    for sig in sign_taproot_inputs(tx, sender_key, input_scripts, input_amounts, workers=workers):
+        tx.witnesses.append(TxWitnessInput([sig]))
+
+    txid = tx.get_txid()
+    if change:
+        change_utxo = {"txid": txid, "vout": len(tx_outputs) - 1, "amount": change, "chained": True}
+        # 保持从大到小的顺序
+        position = next((i for i, u in enumerate(pending_changes) if utxo_amount(u) < change), len(pending_changes))
+        pending_changes.insert(position, change_utxo)
+
+    vsize = tx.get_vsize()
+    return {
+        "txid": txid,
+        "hex": tx.serialize(),
+        "vsize": vsize,
+        "fee": fee,
+        "fee_rate": fee / vsize,
+        "change": change,
+        "payouts": [(p["address"], p["amount"]) for p in builder.payouts],
+        "inputs": [{"txid": u['txid'], "vout": u['vout'], "amount": utxo_amount(u)} for u in builder.inputs],
+        "depends_on": sorted({u['txid'] for u in builder.inputs if u.get("chained")})
+    }
+
+def _print_summary(built: List[Dict], fee_rate: float):
+    print("\n交易列表 (按顺序广播):")
+    print("=" * 50)
+    for i, tx in enumerate(built, 1):
+        chained = f", 花费前面交易的找零" if tx["depends_on"] else ""
+        print(f"{i}. {tx['txid']}")
+        print(f"   {len(tx['payouts'])} 笔付款, {len(tx['inputs'])} 个输入{chained}")
+        print(f"   大小 {tx['vsize']} vB, 手续费 {tx['fee']} 聪 ({tx['fee_rate']:.2f} sat/vB, 目标 {fee_rate}), 找零 {tx['change']} 聪")
+    total_fee = sum(tx["fee"] for tx in built)
+    total_payouts = sum(len(tx["payouts"]) for tx in built)
+    print(f"\n✅ {len(built)} 笔交易, {total_payouts} 笔付款, 总手续费 {total_fee} 聪")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量付款交易")
+    parser.add_argument("payouts", help="付款列表CSV (address,amount)")
+    parser.add_argument("--key", required=True, help="发送方WIF私钥")
+    parser.add_argument("--fee-rate", type=float, required=True, help="费率 (sat/vB)")
+    parser.add_argument("--max-outputs", type=int, default=None, help="每笔交易最多的付款输出数")
+    parser.add_argument("--max-vsize", type=int, default=None, help="每笔交易的最大虚拟大小")
+    args = parser.parse_args()
+
+    transactions = create_batch_payout(args.key, load_payouts(args.payouts), args.fee_rate,
+                                       args.max_outputs, args.max_vsize)
+    print("\n签名后的交易:")
+    for tx in transactions:
+        print(tx["hex"])
@@ -0,0 +1,438 @@
+"""
+UTXO选币工具
+
+用途：
+- 从钱包的UTXO中选出支付所需的输入，替代"花掉全部UTXO"或"总是用最大的UTXO"
+- 三种算法 (与Bitcoin Core相同的思路)，每种算法的结果按当前费率下的浪费 (waste) 打分，取浪费最小的一个:
+  - 分支定界 (BnB): 寻找不需要找零的输入组合，多出的金额不超过创建并花费找零的成本
+  - 背包 (knapsack): 随机逼近目标金额+最小找零，找不到时用大于目标的最小UTXO
+  - 单随机抽取 (SRD): 打乱顺序逐个加入，直到够支付目标金额+找零
+- 每个输入按其脚本类型计算大小，选币时使用扣除输入手续费后的有效金额
+
+浪费 (waste) 的定义：
+    waste = Σ(输入在当前费率下的手续费 - 输入在长期费率下的手续费) + (找零成本 或 无找零时多付的金额)
+当前费率高于长期费率时少用输入更好，低于长期费率时顺便合并小额UTXO更好
+
+使用示例：
+from utils.coin_selection import select_coins
+
+selection = select_coins(utxos, 50000, fee_rate=5)
+if selection:
+    print(selection["algorithm"], selection["inputs"], selection["change"], selection["fee"])
+
+合成钱包上的基准测试 (在course_05目录运行):
+python -m utils.coin_selection
+"""
+
+import math
+import time
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.tx_size import INPUT_TYPES, OUTPUT_SCRIPT_SIZES, input_vbytes, output_size
+
+# 每个输入签名后的虚拟大小上限 (vB，按整字节向上取整)，由utils/tx_size.py计算:
+# p2tr 58, p2wpkh 68, p2sh-p2wpkh 91, p2pkh 148
+INPUT_VBYTES = {name: math.ceil(input_vbytes(name)) for name in INPUT_TYPES}
+
+# 每个输出的大小 (字节): 金额8 + 脚本长度1 + 脚本
+OUTPUT_VBYTES = {name: output_size(name) for name in OUTPUT_SCRIPT_SIZES}
+
+# 版本4 + 锁定时间4 + 输入/输出数量各1 + segwit标记0.5，向上取整
+TX_OVERHEAD_VBYTES = 11
+
+# 标准交易的最大虚拟大小
+MAX_STANDARD_TX_VSIZE = 100000
+
+# 默认配置
+SELECTION_CONFIG = {
+    "input_type": "p2tr",          # UTXO记录中没有script_type时使用的类型
+    "change_type": "p2tr",         # 找零输出类型
+    "long_term_fee_rate": 10,      # 长期费率 (sat/vB)，用于计算waste和找零的花费成本
+    "min_change": 1000,            # 背包和SRD留出的最小找零 (聪)，低于此值的找零不值得创建
+    "bnb_max_tries": 100000,       # 分支定界最多搜索的节点数
+    "knapsack_iterations": 1000,   # 背包随机逼近的次数
+    "knapsack_max_work": 2000000   # 背包总工作量上限 (次数 x 候选UTXO数)，UTXO很多时自动减少次数
+}
+
+def fee_for(vbytes: float, fee_rate: float) -> int:
+    """指定大小在指定费率下的手续费 (聪，向上取整)"""
+    return math.ceil(vbytes * fee_rate)
+
+def utxo_amount(utxo: Dict) -> int:
+    """UTXO金额，兼容统一格式的amount和mempool API的value字段"""
+    return utxo["amount"] if "amount" in utxo else utxo["value"]
+
+class Coin:
+    """选币时使用的UTXO: 有效金额 = 金额 - 当前费率下花费它的手续费"""
+
+    __slots__ = ("utxo", "amount", "vbytes", "fee", "long_term_fee", "effective_value")
+
+    def __init__(self, utxo: Dict, vbytes: int, fee_rate: float, long_term_fee_rate: float):
+        self.utxo = utxo
+        self.amount = utxo_amount(utxo)
+        self.vbytes = vbytes
+        self.fee = fee_for(vbytes, fee_rate)
+        self.long_term_fee = fee_for(vbytes, long_term_fee_rate)
+        self.effective_value = self.amount - self.fee
+
+def make_coins(utxos: Sequence[Dict], fee_rate: float, long_term_fee_rate: float,
+               input_type: str = SELECTION_CONFIG["input_type"]) -> List[Coin]:
+    """
+    把UTXO记录转换为Coin，去掉有效金额不为正 (花费它的手续费比金额还高) 的UTXO
+
+    UTXO记录中的script_type字段 (如 "p2wpkh") 决定输入大小，没有时使用input_type
+    """
+    coins = []
+    for utxo in utxos:
+        vbytes = INPUT_VBYTES[utxo.get("script_type", input_type)]
+        coin = Coin(utxo, vbytes, fee_rate, long_term_fee_rate)
+        if coin.effective_value > 0:
+            coins.append(coin)
+    return coins
+
+def calculate_waste(coins: Sequence[Coin], change_cost: int, excess: int = 0) -> int:
+    """
+    计算一个选择结果的浪费
+
+    Args:
+        coins: 选中的输入
+        change_cost: 有找零时为创建+将来花费找零的成本，无找零时为0
+        excess: 无找零时多付给矿工的金额
+    """
+    return sum(c.fee - c.long_term_fee for c in coins) + (change_cost if change_cost else excess)
+
+def select_coins_bnb(coins: Sequence[Coin], target: int, cost_of_change: int,
+                     max_tries: int = SELECTION_CONFIG["bnb_max_tries"]) -> Optional[List[Coin]]:
+    """
+    分支定界: 寻找有效金额之和落在 [target, target + cost_of_change] 内的组合
+
+    按有效金额从大到小深度优先搜索，每个UTXO先尝试选入再尝试跳过。
+    剩余金额不够、超出上限、或当前浪费已经大于最优解时剪枝
+
+    Args:
+        target: 不含找零输出时需要的有效金额 (支付金额 + 交易头和输出的手续费)
+        cost_of_change: 找零成本，多付不超过它时不找零比找零更划算
+
+    Returns:
+        List[Coin]: 浪费最小的无找零组合，没找到返回None
+    """
+    pool = sorted(coins, key=lambda c: c.effective_value, reverse=True)
+    values = [c.effective_value for c in pool]
+    waste_deltas = [c.fee - c.long_term_fee for c in pool]
+    curr_available = sum(values)
+    if curr_available < target or not pool:
+        return None
+
+    # 当前费率高于长期费率时，输入越多浪费越大，可以按浪费剪枝
+    is_fee_rate_high = waste_deltas[0] > 0
+    upper = target + cost_of_change
+    curr_value = 0
+    curr_waste = 0
+    curr_selection = []
+    best_selection = None
+    best_waste = math.inf
+
+    index = 0
+    for _ in range(max_tries):
+        backtrack = False
+        if (curr_value + curr_available < target or curr_value > upper
+                or (is_fee_rate_high and curr_waste > best_waste)):
+            backtrack = True
+        elif curr_value >= target:
+            waste = curr_waste + curr_value - target
+            if waste <= best_waste:
+                best_selection = list(curr_selection)
+                best_waste = waste
+            backtrack = True
+
+        if backtrack:
+            if not curr_selection:
+                break
+            # 把最后选入的UTXO之后跳过的UTXO加回剩余金额，然后改为跳过最后选入的UTXO
+            index -= 1
+            while index > curr_selection[-1]:
+                curr_available += values[index]
+                index -= 1
+            curr_value -= values[index]
+            curr_waste -= waste_deltas[index]
+            curr_selection.pop()
+        else:
+            curr_available -= values[index]
+            # 与上一个被跳过的UTXO金额和手续费都相同时直接跳过，避免重复搜索等价的组合
+            if (not curr_selection or index - 1 == curr_selection[-1]
+                    or values[index] != values[index - 1] or waste_deltas[index] != waste_deltas[index - 1]):
+                curr_selection.append(index)
+                curr_value += values[index]
+                curr_waste += waste_deltas[index]
+        index += 1
+
+    if best_selection is None:
+        return None
+    return [pool[i] for i in best_selection]
+
+def _approximate_best_subset(values: List[int], total_lower: int, target: int, iterations: int,
+                             rng: random.Random) -> Tuple[List[bool], int]:
+    """随机逼近: 寻找有效金额之和不小于target且尽量接近的子集"""
+    count = len(values)
+    best_included = [True] * count
+    best_value = total_lower
+
+    for _ in range(iterations):
+        if best_value == target:
+            break
+        included = [False] * count
+        total = 0
+        reached_target = False
+        # 第一轮随机选入，第二轮补上没选入的
+        for pass_index in range(2):
+            if reached_target:
+                break
+            if pass_index == 0:
+                coin_flips = format(rng.getrandbits(count), f"0{count}b")
+            for i in range(count):
+                if coin_flips[i] == "1" if pass_index == 0 else not included[i]:
+                    total += values[i]
+                    included[i] = True
+                    if total >= target:
+                        reached_target = True
+                        if total < best_value:
+                            best_value = total
+                            best_included = list(included)
+                        total -= values[i]
+                        included[i] = False
+    return best_included, best_value
+
+def select_coins_knapsack(coins: Sequence[Coin], target: int, min_change: int,
+                          rng: Optional[random.Random] = None,
+                          iterations: int = SELECTION_CONFIG["knapsack_iterations"],
+                          max_work: int = SELECTION_CONFIG["knapsack_max_work"]) -> Optional[List[Coin]]:
+    """
+    背包: 先找金额正好等于目标的UTXO，再用小于 目标+最小找零 的UTXO随机逼近，
+    逼近结果不理想时改用大于目标的最小UTXO
+
+    Args:
+        target: 含找零输出时需要的有效金额
+        min_change: 尽量留出的最小找零
+
+    Returns:
+        List[Coin]: 选中的输入，金额不足返回None
+    """
+    rng = rng or random.Random()
+    pool = list(coins)
+    rng.shuffle(pool)
+
+    applicable = []
+    total_lower = 0
+    lowest_larger = None
+    for coin in pool:
+        if coin.effective_value == target:
+            return [coin]
+        if coin.effective_value < target + min_change:
+            applicable.append(coin)
+            total_lower += coin.effective_value
+        elif lowest_larger is None or coin.effective_value < lowest_larger.effective_value:
+            lowest_larger = coin
+
+    if total_lower == target:
+        return applicable
+    if total_lower < target:
+        return [lowest_larger] if lowest_larger else None
+
+    applicable.sort(key=lambda c: c.effective_value, reverse=True)
+    values = [c.effective_value for c in applicable]
+    # UTXO很多时减少逼近次数，保证耗时有上限
+    iterations = max(1, min(iterations, max_work // len(values)))
+    best_included, best_value = _approximate_best_subset(values, total_lower, target, iterations, rng)
+    if best_value != target and total_lower >= target + min_change:
+        best_included, best_value = _approximate_best_subset(values, total_lower, target + min_change, iterations, rng)
+
+    # 逼近的结果找零太少，或者单个较大的UTXO更接近目标时，用单个UTXO
+    if lowest_larger and ((best_value != target and best_value < target + min_change)
+                          or lowest_larger.effective_value <= best_value):
+        return [lowest_larger]
+    return [coin for coin, included in zip(applicable, best_included) if included]
+
+def select_coins_srd(coins: Sequence[Coin], target: int, rng: Optional[random.Random] = None) -> Optional[List[Coin]]:
+    """
+    单随机抽取: 打乱顺序逐个选入，直到有效金额之和不小于target
+
+    Args:
+        target: 含找零输出和最小找零时需要的有效金额
+
+    Returns:
+        List[Coin]: 选中的输入，金额不足返回None
+    """
+    rng = rng or random.Random()
+    pool = list(coins)
+    rng.shuffle(pool)
+
+    selected = []
+    total = 0
+    for coin in pool:
+        selected.append(coin)
+        total += coin.effective_value
+        if total >= target:
+            return selected
+    return None
+
+def select_coins(
+    utxos: Sequence[Dict],
+    amount: int,
+    fee_rate: float,
+    output_types: Sequence[str] = ("p2tr",),
+    long_term_fee_rate: Optional[float] = None,
+    change_type: Optional[str] = None,
+    min_change: Optional[int] = None,
+    algorithms: Sequence[str] = ("bnb", "knapsack", "srd"),
+    rng: Optional[random.Random] = None,
+    max_vsize: int = MAX_STANDARD_TX_VSIZE
+) -> Optional[Dict]:
+    """
+    选择支付amount所需的输入
+
+    Args:
+        utxos: UTXO记录 (需要txid、vout、amount或value，可选script_type)
+        amount: 支付给全部接收方的金额合计（聪）
+        fee_rate: 费率（sat/vB）
+        output_types: 接收方输出的类型列表，用于计算交易大小
+        long_term_fee_rate: 长期费率，默认读取SELECTION_CONFIG
+        change_type: 找零输出类型，默认读取SELECTION_CONFIG
+        min_change: 最小找零，默认读取SELECTION_CONFIG
+        algorithms: 参与比较的算法
+        rng: 随机数生成器 (固定种子可以得到可复现的结果)
+        max_vsize: 结果的最大虚拟大小，默认为标准交易上限 (选出的输入要拆分到多笔交易时可以放宽)
+
+    Returns:
+        Dict: {
+            "algorithm": 选中的算法,
+            "inputs": 选中的UTXO记录,
+            "input_total": 输入金额合计,
+            "fee": 手续费,
+            "change": 找零金额 (0表示不需要找零输出),
+            "vsize": 估算的虚拟大小,
+            "waste": 浪费
+        }
+        余额不足时返回None
+    """
+    if long_term_fee_rate is None:
+        long_term_fee_rate = SELECTION_CONFIG["long_term_fee_rate"]
+    change_type = change_type or SELECTION_CONFIG["change_type"]
+    if min_change is None:
+        min_change = SELECTION_CONFIG["min_change"]
+    rng = rng or random.Random()
+
+    base_vbytes = TX_OVERHEAD_VBYTES + sum(OUTPUT_VBYTES[t] for t in output_types)
+    change_vbytes = OUTPUT_VBYTES[change_type]
+    change_fee = fee_for(change_vbytes, fee_rate)
+    # 找零成本: 现在创建找零输出 + 将来按长期费率花费它
+    cost_of_change = change_fee + fee_for(INPUT_VBYTES[change_type], long_term_fee_rate)
+    # 不含找零时需要的有效金额
+    selection_target = amount + fee_for(base_vbytes, fee_rate)
+
+    coins = make_coins(utxos, fee_rate, long_term_fee_rate)
+
+    candidates = []
+    if "bnb" in algorithms:
+        selected = select_coins_bnb(coins, selection_target, cost_of_change)
+        if selected:
+            candidates.append(("bnb", selected, False))
+    if "knapsack" in algorithms:
+        selected = select_coins_knapsack(coins, selection_target + change_fee, min_change, rng)
+        if selected:
+            candidates.append(("knapsack", selected, True))
+    if "srd" in algorithms:
+        selected = select_coins_srd(coins, selection_target + change_fee + min_change, rng)
+        if selected:
+            candidates.append(("srd", selected, True))
+
+    best = None
+    for algorithm, selected, with_change in candidates:
+        input_total = sum(c.amount for c in selected)
+        input_fee = sum(c.fee for c in selected)
+        vsize = base_vbytes + sum(c.vbytes for c in selected)
+        fee = fee_for(base_vbytes, fee_rate) + input_fee
+        excess = sum(c.effective_value for c in selected) - selection_target
+
+        if with_change:
+            change = input_total - amount - fee - change_fee
+            # 找零低于最小找零时不创建找零输出，并入手续费 (背包的单个UTXO结果可能出现)
+            if change < min_change:
+                with_change = False
+            else:
+                vsize += change_vbytes
+                fee += change_fee
+        if not with_change:
+            change = 0
+            fee = input_total - amount
+
+        if excess < 0 or vsize > max_vsize:
+            continue
+        waste = calculate_waste(selected, cost_of_change if change else 0, excess)
+        if best is None or waste < best["waste"] or (waste == best["waste"] and len(selected) < len(best["inputs"])):
+            best = {
+                "algorithm": algorithm,
+                "inputs": [c.utxo for c in selected],
+                "input_total": input_total,
+                "fee": fee,
+                "change": change,
+                "vsize": vsize,
+                "waste": waste
+            }
+    return best
+
+def _synthetic_wallet(size: int, rng: random.Random) -> List[Dict]:
+    """合成钱包: 金额按对数正态分布 (大量小额、少量大额)，混合输入类型"""
+    script_types = ["p2tr"] * 6 + ["p2wpkh"] * 3 + ["p2pkh"]
+    return [
+        {
+            "txid": f"{i:064x}",
+            "vout": 0,
+            "amount": max(600, int(rng.lognormvariate(10, 1.8))),
+            "script_type": rng.choice(script_types)
+        }
+        for i in range(size)
+    ]
+
+def _run_benchmark(wallet_size: int = 10000, rounds: int = 20, fee_rates: Sequence[float] = (2, 25), seed: int = 1):
+    """在合成钱包上对比各算法的耗时、输入数和浪费"""
+    rng = random.Random(seed)
+    wallet = _synthetic_wallet(wallet_size, rng)
+    balance = sum(u["amount"] for u in wallet)
+    amounts = [int(rng.lognormvariate(11, 1.5)) for _ in range(rounds)]
+    print(f"=== 选币基准测试: {wallet_size} 个UTXO, 余额 {balance} 聪, {rounds} 笔支付 ===")
+
+    strategies = {
+        "bnb": ("bnb",),
+        "knapsack": ("knapsack",),
+        "srd": ("srd",),
+        "最小浪费": ("bnb", "knapsack", "srd")
+    }
+    for fee_rate in fee_rates:
+        print(f"\n费率 {fee_rate} sat/vB:")
+        print(f"  {'算法':<10} {'成功':>4} {'平均耗时':>10} {'平均输入':>8} {'无找零':>6} {'平均手续费':>10} {'平均浪费':>10}")
+        for name, algorithms in strategies.items():
+            elapsed = 0.0
+            results = []
+            for amount in amounts:
+                start = time.perf_counter()
+                selection = select_coins(wallet, amount, fee_rate, algorithms=algorithms, rng=random.Random(seed))
+                elapsed += time.perf_counter() - start
+                if selection:
+                    results.append(selection)
+            if not results:
+                print(f"  {name:<10} {0:>4}")
+                continue
+            print(f"  {name:<10} {len(results):>4} {elapsed / rounds * 1000:>8.1f}ms "
+                  f"{sum(len(r['inputs']) for r in results) / len(results):>8.1f} "
+                  f"{sum(1 for r in results if not r['change']):>6} "
+                  f"{sum(r['fee'] for r in results) / len(results):>10.0f} "
+                  f"{sum(r['waste'] for r in results) / len(results):>10.0f}")
+
+        # 对比原来的做法: 花掉全部UTXO
+        all_vbytes = TX_OVERHEAD_VBYTES + OUTPUT_VBYTES["p2tr"] * 2 + sum(INPUT_VBYTES[u["script_type"]] for u in wallet)
+        print(f"  花掉全部UTXO: {wallet_size} 个输入, {all_vbytes} vB (超过标准交易上限 {MAX_STANDARD_TX_VSIZE} vB), "
+              f"手续费 {fee_for(all_vbytes, fee_rate)} 聪")
+
+if __name__ == "__main__":
+    _run_benchmark()
@@ -0,0 +1,222 @@
+"""
+多进程输入签名工具
+
+用途：
+- 合并几千个小额UTXO的交易要做几千次Schnorr/ECDSA签名，纯Python的签名每次要几百毫秒，
+  逐个签名要几分钟；这里把输入分块交给进程池并行签名
+- 交易、私钥和每个输入的签名方式只在worker进程启动时传一次，任务只包含输入序号
+- Taproot输入在每个worker里使用同一个TaprootSigningContext，交易级摘要每个进程只计算一次
+- 结果按输入顺序组装；签名都是确定的 (ECDSA为RFC6979，Schnorr的辅助随机数由aux_seed和
+  输入序号导出)，并行签名与串行签名的结果逐字节相同
+
+每个输入的签名方式 (dict):
+    {"key": 私钥名称, "type": "p2tr" | "p2wpkh" | "p2pkh",
+     "sighash": 可选, "script_path": 可选, "tapleaf_script": 可选, "tapleaf_scripts": 可选, "tweak": 可选}
+
+使用示例：
+from utils.parallel_signing import sign_taproot_inputs
+
+signatures = sign_taproot_inputs(tx, sender_key, input_scripts, input_amounts)
+tx.witnesses = [TxWitnessInput([sig]) for sig in signatures]
+
+基准测试 (在course_05目录运行):
+python -m utils.parallel_signing
+"""
+
+import os
+import time
+import hashlib
+import multiprocessing
+from typing import Dict, List, Optional, Sequence
+
+from bitcoinutils.constants import TAPROOT_SIGHASH_ALL, SIGHASH_ALL
+from bitcoinutils.keys import PrivateKey
+from bitcoinutils.script import Script
+from bitcoinutils.setup import setup, get_network
+from bitcoinutils.transactions import Transaction, TxWitnessInput
+
+from utils.taproot_signing import TaprootSigningContext
+
+# 默认配置
+PARALLEL_SIGNING_CONFIG = {
+    "workers": 0,          # 进程数，0表示全部CPU核心
+    "min_inputs": 32,      # 输入少于此数时直接在当前进程签名 (启动进程池的开销比签名更大)
+    "chunks_per_worker": 4 # 每个进程分到的任务数，任务越多负载越均衡
+}
+
+# 每个worker进程的签名状态，由_init_worker在进程启动时设置一次
+_worker_state = None
+
+def derive_aux_rand(aux_seed: Optional[bytes], index: int) -> bytes:
+    """
+    第index个输入的BIP340辅助随机数
+
+    aux_seed为None时与bitcoinutils相同使用32个0字节；否则为 sha256(aux_seed || index)，
+    同一个种子得到的签名在串行和并行时完全相同
+    """
+    if aux_seed is None:
+        return bytes(32)
+    return hashlib.sha256(aux_seed + index.to_bytes(4, "little")).digest()
+
+def resolve_worker_count(workers: Optional[int]) -> int:
+    """0或None表示使用全部CPU核心"""
+    if not workers:
+        return os.cpu_count() or 1
+    return workers
+
+class _SigningState:
+    """一笔交易的签名状态 (在worker进程中或当前进程中创建)"""
+
+    def __init__(self, tx: Transaction, specs: Sequence[Dict], script_pubkeys: Sequence[Script],
+                 amounts: Sequence[int], secrets: Dict[str, bytes], aux_seed: Optional[bytes]):
+        self.tx = tx
+        self.specs = specs
+        self.script_pubkeys = script_pubkeys
+        self.amounts = amounts
+        self.keys = {name: PrivateKey(secret_exponent=int.from_bytes(secret, "big")) for name, secret in secrets.items()}
+        self.aux_seed = aux_seed
+        self.context = None
+        if any(spec["type"] == "p2tr" for spec in specs):
+            self.context = TaprootSigningContext(tx, script_pubkeys, amounts)
+        # P2WPKH签名使用的P2PKH脚本，每个私钥只计算一次
+        self._p2pkh_scripts = {}
+
+    def _p2pkh_script(self, name: str) -> Script:
+        if name not in self._p2pkh_scripts:
+            self._p2pkh_scripts[name] = self.keys[name].get_public_key().get_address().to_script_pub_key()
+        return self._p2pkh_scripts[name]
+
+    def sign(self, index: int) -> List[str]:
+        """
+        签名一个输入
+
+        Returns:
+            List[str]: p2tr/p2wpkh为见证栈，p2pkh为scriptSig的数据项
+        """
+        spec = self.specs[index]
+        key = self.keys[spec["key"]]
+        if spec["type"] == "p2tr":
+            return [self.context.sign(
+                key, index,
+                sighash=spec.get("sighash", TAPROOT_SIGHASH_ALL),
+                script_path=spec.get("script_path", False),
+                tapleaf_script=spec.get("tapleaf_script"),
+                tapleaf_scripts=spec.get("tapleaf_scripts"),
+                tweak=spec.get("tweak", True),
+                aux_rand=derive_aux_rand(self.aux_seed, index)
+            )]
+        sighash = spec.get("sighash", SIGHASH_ALL)
+        if spec["type"] == "p2wpkh":
+            sig = key.sign_segwit_input(self.tx, index, self._p2pkh_script(spec["key"]), self.amounts[index], sighash)
+        elif spec["type"] == "p2pkh":
+            sig = key.sign_input(self.tx, index, self.script_pubkeys[index], sighash)
+        else:
+            raise ValueError(f"不支持的输入类型: {spec['type']}")
+        return [sig, key.get_public_key().to_hex()]
+
+def _init_worker(network, tx, specs, script_pubkeys, amounts, secrets, aux_seed):
+    """进程池初始化: 每个worker只接收一次交易和私钥，避免每个任务重复传参"""
+    global _worker_state
+    setup(network)
+    _worker_state = _SigningState(tx, specs, script_pubkeys, amounts, secrets, aux_seed)
+
+def _sign_chunk(indices: List[int]) -> List[tuple]:
+    return [(index, _worker_state.sign(index)) for index in indices]
+
+def sign_inputs(tx: Transaction, specs: Sequence[Dict], script_pubkeys: Sequence[Script], amounts: Sequence[int],
+                keys: Dict[str, PrivateKey], workers: Optional[int] = None, aux_seed: Optional[bytes] = None,
+                min_inputs: int = PARALLEL_SIGNING_CONFIG["min_inputs"]) -> List[List[str]]:
+    """
+    签名交易的全部输入
+
+    Args:
+        tx: 输入和输出都已确定的交易
+        specs: 每个输入的签名方式
+        script_pubkeys: 每个输入花费的输出脚本
+        amounts: 每个输入花费的金额（聪）
+        keys: 私钥名称 -> PrivateKey
+        workers: 进程数，默认读取PARALLEL_SIGNING_CONFIG (0表示全部CPU核心)，1表示在当前进程签名
+        aux_seed: Schnorr签名辅助随机数的种子，None表示32个0字节
+        min_inputs: 输入少于此数时在当前进程签名
+
+    Returns:
+        List[List[str]]: 按输入顺序的签名结果 (见_SigningState.sign)
+    """
+    if not (len(specs) == len(script_pubkeys) == len(amounts) == len(tx.inputs)):
+        raise ValueError("specs、script_pubkeys和amounts的数量必须与交易输入数量相同")
+    workers = resolve_worker_count(workers if workers is not None else PARALLEL_SIGNING_CONFIG["workers"])
+    secrets = {name: key.key.to_string() for name, key in keys.items()}
+    count = len(tx.inputs)
+
+    if workers == 1 or count < min_inputs:
+        state = _SigningState(tx, specs, script_pubkeys, amounts, secrets, aux_seed)
+        return [state.sign(index) for index in range(count)]
+
+    # 连续的输入分到同一个任务，减少进程间通信次数
+    chunk_size = max(1, -(-count // (workers * PARALLEL_SIGNING_CONFIG["chunks_per_worker"])))
+    chunks = [list(range(start, min(start + chunk_size, count))) for start in range(0, count, chunk_size)]
+    results = [None] * count
+    pool = multiprocessing.Pool(
+        processes=workers,
+        initializer=_init_worker,
+        initargs=(get_network(), tx, list(specs), list(script_pubkeys), list(amounts), secrets, aux_seed)
+    )
+    try:
+        for chunk_results in pool.imap_unordered(_sign_chunk, chunks):
+            for index, items in chunk_results:
+                results[index] = items
+    finally:
+        pool.terminate()
+        pool.join()
+    return results
+
+def sign_taproot_inputs(tx: Transaction, key: PrivateKey, script_pubkeys: Sequence[Script], amounts: Sequence[int],
+                        workers: Optional[int] = None, aux_seed: Optional[bytes] = None,
+                        min_inputs: int = PARALLEL_SIGNING_CONFIG["min_inputs"]) -> List[str]:
+    """
+    用同一个私钥按key path签名全部Taproot输入 (合并交易、普通转账)
+
+    Returns:
+        List[str]: 按输入顺序的签名
+    """
+    specs = [{"key": "sender", "type": "p2tr"}] * len(tx.inputs)
+    results = sign_inputs(tx, specs, script_pubkeys, amounts, {"sender": key}, workers, aux_seed, min_inputs)
+    return [items[0] for items in results]
+
+def apply_signatures(tx: Transaction, specs: Sequence[Dict], results: Sequence[List[str]]):
+    """把sign_inputs的结果写入交易: p2pkh写入scriptSig，其他写入见证"""
+    tx.witnesses = []
+    for txin, spec, items in zip(tx.inputs, specs, results):
+        if spec["type"] == "p2pkh":
+            txin.script_sig = Script(items)
+            tx.witnesses.append(TxWitnessInput([]))
+        else:
+            tx.witnesses.append(TxWitnessInput(items))
+
+def _run_benchmark(input_count: int = 200, workers: Optional[int] = None):
+    """串行和并行签名一笔N输入的Taproot合并交易，检查结果逐字节相同"""
+    from bitcoinutils.transactions import TxInput, TxOutput
+
+    setup("testnet")
+    key = PrivateKey(secret_exponent=0x5EED)
+    script = key.get_public_key().get_taproot_address().to_script_pub_key()
+    inputs = [TxInput(f"{i + 1:064x}", i % 4) for i in range(input_count)]
+    amounts = [1000 + i for i in range(input_count)]
+    scripts = [script] * input_count
+    tx = Transaction(inputs, [TxOutput(sum(amounts) - 100 * input_count, script)], has_segwit=True)
+    workers = resolve_worker_count(workers or PARALLEL_SIGNING_CONFIG["workers"])
+    aux_seed = b"benchmark"
+
+    print(f"=== {input_count} 个Taproot输入, {workers} 个进程 ===")
+    start = time.perf_counter()
+    serial = sign_taproot_inputs(tx, key, scripts, amounts, workers=1, aux_seed=aux_seed)
+    serial_time = time.perf_counter() - start
+    start = time.perf_counter()
+    parallel = sign_taproot_inputs(tx, key, scripts, amounts, workers=workers, aux_seed=aux_seed, min_inputs=0)
+    parallel_time = time.perf_counter() - start
+    assert serial == parallel
+    print(f"串行: {serial_time:.1f}s   并行: {parallel_time:.1f}s   ({serial_time / parallel_time:.1f}x)")
+    print("✅ 串行和并行签名结果逐字节相同")
+
+if __name__ == "__main__":
+    _run_benchmark()
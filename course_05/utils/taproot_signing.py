@@ -0,0 +1,186 @@
+"""
+Taproot多输入签名上下文
+
+用途：
+- bitcoinutils的 sign_taproot_input 每签一个输入都重新计算BIP341签名消息里的
+  sha_prevouts、sha_amounts、sha_scriptpubkeys、sha_sequences、sha_outputs，
+  这几项对整笔交易都相同，N个输入的交易签名时哈希的数据量是O(N²)
+- TaprootSigningContext 对一笔交易只计算一次这些摘要，之后每个输入的sighash只需要拼接固定长度的数据
+- 同一个私钥 (和脚本树) 的tweak后私钥也只计算一次
+- 签名结果与 PrivateKey.sign_taproot_input 逐字节相同
+
+注意：创建上下文之后不能再修改交易的输入、输出、金额或sequence，否则要重新创建
+
+使用示例：
+from utils.taproot_signing import TaprootSigningContext
+
+context = TaprootSigningContext(tx, input_scripts, input_amounts)
+for i in range(len(tx.inputs)):
+    tx.witnesses.append(TxWitnessInput([context.sign(sender_key, i)]))
+
+500个输入的合并交易基准测试 (在course_05目录运行):
+python -m utils.taproot_signing
+"""
+
+import time
+import struct
+import hashlib
+from typing import Dict, Optional, Sequence
+
+from bitcoinutils.constants import (
+    TAPROOT_SIGHASH_ALL, SIGHASH_NONE, SIGHASH_SINGLE, SIGHASH_ANYONECANPAY, LEAF_VERSION_TAPSCRIPT
+)
+from bitcoinutils.keys import PrivateKey
+from bitcoinutils.schnorr import schnorr_sign
+from bitcoinutils.script import Script
+from bitcoinutils.transactions import Transaction
+from bitcoinutils.utils import calculate_tweak, tweak_taproot_privkey, prepend_compact_size, tagged_hash, b_to_h
+
+def _outpoint(txin) -> bytes:
+    return bytes.fromhex(txin.txid)[::-1] + struct.pack("<I", txin.txout_index)
+
+class TaprootSigningContext:
+    """一笔交易的BIP341签名上下文，交易级的摘要只计算一次"""
+
+    def __init__(self, tx: Transaction, script_pubkeys: Sequence[Script], amounts: Sequence[int]):
+        """
+        Args:
+            tx: 输入和输出都已确定的交易
+            script_pubkeys: 每个输入花费的输出脚本
+            amounts: 每个输入花费的金额（聪）
+        """
+        if len(script_pubkeys) != len(tx.inputs) or len(amounts) != len(tx.inputs):
+            raise ValueError("script_pubkeys和amounts的数量必须与交易输入数量相同")
+        self.tx = tx
+        self.amounts = list(amounts)
+        self._script_pubkeys = [prepend_compact_size(script.to_bytes()) for script in script_pubkeys]
+        self._outputs = [txout.to_bytes() for txout in tx.outputs]
+
+        self.sha_prevouts = hashlib.sha256(b"".join(_outpoint(txin) for txin in tx.inputs)).digest()
+        self.sha_amounts = hashlib.sha256(b"".join(a.to_bytes(8, "little") for a in self.amounts)).digest()
+        self.sha_scriptpubkeys = hashlib.sha256(b"".join(self._script_pubkeys)).digest()
+        self.sha_sequences = hashlib.sha256(b"".join(txin.sequence for txin in tx.inputs)).digest()
+        self.sha_outputs = hashlib.sha256(b"".join(self._outputs)).digest()
+
+        self._leaf_hashes: Dict[bytes, bytes] = {}
+        self._signing_keys: Dict[tuple, bytes] = {}
+
+    def _leaf_hash(self, script: Script) -> bytes:
+        script_bytes = script.to_bytes()
+        if script_bytes not in self._leaf_hashes:
+            self._leaf_hashes[script_bytes] = tagged_hash(
+                bytes([LEAF_VERSION_TAPSCRIPT]) + prepend_compact_size(script_bytes), "TapLeaf"
+            )
+        return self._leaf_hashes[script_bytes]
+
+    def sighash(self, index: int, sighash: int = TAPROOT_SIGHASH_ALL, tapleaf_script: Optional[Script] = None) -> bytes:
+        """
+        一个输入的BIP341签名消息哈希
+
+        Args:
+            index: 输入序号
+            sighash: sighash类型
+            tapleaf_script: script path花费的叶子脚本，为None时为key path
+
+        Returns:
+            bytes: 32字节的TapSighash
+        """
+        anyone_can_pay = sighash & 0x80 == SIGHASH_ANYONECANPAY
+        output_type = sighash & 0x03
+        ext_flag = 0 if tapleaf_script is None else 1
+
+        parts = [bytes([0, sighash]), self.tx.version, self.tx.locktime]
+        if not anyone_can_pay:
+            parts += [self.sha_prevouts, self.sha_amounts, self.sha_scriptpubkeys, self.sha_sequences]
+        if output_type not in (SIGHASH_NONE, SIGHASH_SINGLE):
+            parts.append(self.sha_outputs)
+        parts.append(bytes([ext_flag * 2]))
+        if anyone_can_pay:
+            txin = self.tx.inputs[index]
+            parts += [_outpoint(txin), self.amounts[index].to_bytes(8, "little"),
+                      self._script_pubkeys[index], txin.sequence]
+        else:
+            parts.append(index.to_bytes(4, "little"))
+        if output_type == SIGHASH_SINGLE:
+            parts.append(hashlib.sha256(self._outputs[index]).digest())
+        if ext_flag:
+            # BIP342: 叶子哈希、密钥版本、OP_CODESEPARATOR位置 (不支持，固定0xffffffff)
+            parts += [self._leaf_hash(tapleaf_script), bytes([0]), b"\xff\xff\xff\xff"]
+        return tagged_hash(b"".join(parts), "TapSighash")
+
+    def _signing_key(self, key: PrivateKey, tapleaf_scripts, tweak: bool) -> bytes:
+        secret = key.key.to_string()
+        if not tweak:
+            return secret
+        tweak_int = calculate_tweak(key.get_public_key(), tapleaf_scripts)
+        cache_key = (secret, tweak_int)
+        if cache_key not in self._signing_keys:
+            self._signing_keys[cache_key] = tweak_taproot_privkey(secret, tweak_int)
+        return self._signing_keys[cache_key]
+
+    def sign(self, key: PrivateKey, index: int, sighash: int = TAPROOT_SIGHASH_ALL, script_path: bool = False,
+             tapleaf_script: Optional[Script] = None, tapleaf_scripts=None, tweak: bool = True,
+             aux_rand: bytes = bytes(32)) -> str:
+        """
+        签名一个输入，参数含义与 PrivateKey.sign_taproot_input 相同
+
+        Args:
+            key: 私钥
+            index: 输入序号
+            sighash: sighash类型
+            script_path: 是否为script path花费
+            tapleaf_script: script path花费的叶子脚本
+            tapleaf_scripts: key path花费时地址的脚本树 (用于计算tweak)
+            tweak: 是否使用tweak后的私钥 (script path签名通常为False)
+            aux_rand: BIP340的32字节辅助随机数，默认与bitcoinutils相同为32个0字节 (签名是确定的)
+
+        Returns:
+            str: 十六进制签名 (非默认sighash时65字节)
+        """
+        digest = self.sighash(index, sighash, (tapleaf_script or Script([])) if script_path else None)
+        signature = schnorr_sign(digest, self._signing_key(key, tapleaf_scripts, tweak), aux_rand)
+        if sighash != TAPROOT_SIGHASH_ALL:
+            signature += sighash.to_bytes(1, "big")
+        return b_to_h(signature)
+
+def _run_benchmark(input_count: int = 500, sign_count: int = 20):
+    """
+    对比逐个调用sign_taproot_input和使用签名上下文: N输入合并交易的全部sighash，
+    以及前sign_count个输入的完整签名 (纯Python的Schnorr签名很慢，全部签完要几分钟)
+    """
+    from bitcoinutils.setup import setup
+    from bitcoinutils.transactions import TxInput, TxOutput
+
+    setup("testnet")
+    key = PrivateKey(secret_exponent=0x5EED)
+    script = key.get_public_key().get_taproot_address().to_script_pub_key()
+    inputs = [TxInput(f"{i + 1:064x}", i % 4) for i in range(input_count)]
+    amounts = [1000 + i for i in range(input_count)]
+    scripts = [script] * input_count
+    tx = Transaction(inputs, [TxOutput(sum(amounts) - 100 * input_count, script)], has_segwit=True)
+
+    print(f"=== {input_count} 个输入的合并交易 ===")
+    start = time.perf_counter()
+    naive_digests = [tx.get_transaction_taproot_digest(i, scripts, amounts) for i in range(input_count)]
+    naive_digest_time = time.perf_counter() - start
+    start = time.perf_counter()
+    context = TaprootSigningContext(tx, scripts, amounts)
+    digests = [context.sighash(i) for i in range(input_count)]
+    digest_time = time.perf_counter() - start
+    assert digests == naive_digests
+    print(f"全部sighash  逐个计算: {naive_digest_time:.3f}s   签名上下文: {digest_time:.3f}s   ({naive_digest_time / digest_time:.0f}x)")
+
+    start = time.perf_counter()
+    naive_sigs = [key.sign_taproot_input(tx, i, scripts, amounts) for i in range(sign_count)]
+    naive_sign_time = (time.perf_counter() - start) / sign_count
+    context = TaprootSigningContext(tx, scripts, amounts)
+    start = time.perf_counter()
+    sigs = [context.sign(key, i) for i in range(sign_count)]
+    sign_time = (time.perf_counter() - start) / sign_count
+    assert sigs == naive_sigs
+    print(f"每个输入签名 逐个签名: {naive_sign_time * 1000:.0f}ms   签名上下文: {sign_time * 1000:.0f}ms   "
+          f"(按{input_count}个输入估算: {naive_sign_time * input_count:.0f}s -> {sign_time * input_count:.0f}s)")
+    print("✅ 签名结果逐字节相同")
+
+if __name__ == "__main__":
+    _run_benchmark()
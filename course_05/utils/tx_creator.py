@@ -4,6 +4,10 @@ from bitcoinutils.transactions import Transaction, TxInput, TxOutput, TxWitnessI
 from bitcoinutils.keys import PrivateKey, P2trAddress
 from typing import Tuple, List, Dict
 from tools.utxo_scanner import get_utxos
+from tools.utxo_reservation import get_reservations
+from utils.coin_selection import select_coins, fee_for
+from utils.tx_size import estimate_vsize
+from utils.parallel_signing import sign_taproot_inputs
 import logging
 
 # 配置日志
@@ -45,103 +49,87 @@ def create_taproot_tx(
     # 接收方地址
     recipient_address = P2trAddress(recipient_addr)
     
-    # 获取UTXO
-    utxos = get_utxos(sender_address.to_string())
-    
-    # 计算总输入金额
-    total_input = sum(utxo['value'] for utxo in utxos)
     amount_to_send_sats = to_satoshis(amount_to_send)
     
-    print("\n金额信息（输入）:")
-    print("=" * 50)
-    print(f"总输入金额: {total_input} 聪 ({total_input/100000000:.8f} BTC)")
-    print(f"计划发送: {amount_to_send_sats} 聪 ({amount_to_send:.8f} BTC)")
-    print()
-    
-    # 创建输入
-    tx_inputs = []
-    input_amounts = []
-    input_scripts = []
-    
-    for utxo in utxos:
-        tx_inputs.append(TxInput(utxo['txid'], utxo['vout']))
-        input_amounts.append(utxo['value'])
-        input_scripts.append(sender_address.to_script_pub_key())
-    
-    # 第一次估算手续费（基于未签名交易）
-    initial_tx = Transaction(
-        tx_inputs,
-        [
-            TxOutput(amount_to_send_sats, recipient_address.to_script_pub_key()),
-            TxOutput(0, sender_address.to_script_pub_key())
-        ],
-        has_segwit=True
-    )
-    initial_fee = int(initial_tx.get_vsize() * fee_rate)
-    
-    # 计算初始找零金额
-    change_amount = total_input - amount_to_send_sats - initial_fee
-    if change_amount <= 0:
-        raise Exception("Insufficient funds for transaction and fee")
-    
-    # 创建完整交易
-    tx_outputs = [
-        TxOutput(amount_to_send_sats, recipient_address.to_script_pub_key()),
-        TxOutput(change_amount, sender_address.to_script_pub_key())
-    ]
-    tx = Transaction(tx_inputs, tx_outputs, has_segwit=True)
-    
-    # 签名每个输入
-    for i in range(len(tx_inputs)):
-        sig = sender_key.sign_taproot_input(
-            tx,
-            i,
-            input_scripts,
-            input_amounts
-        )
-        tx.witnesses.append(TxWitnessInput([sig]))
-    
-    # 获取最终的虚拟大小和手续费
-    final_vsize = tx.get_vsize()
-    final_fee = int(final_vsize * fee_rate)
-    
-    # 如果最终手续费大于初始手续费，需要调整找零金额
-    if final_fee > initial_fee:
-        fee_difference = final_fee - initial_fee
-        change_amount -= fee_difference
-        if change_amount <= 0:
-            raise Exception("Insufficient funds after fee adjustment")
-        
-        # 使用调整后的找零金额重新创建交易
-        tx_outputs[1].amount = change_amount
+    # 获取UTXO并选币：只使用支付所需的UTXO，能凑出无找零组合时不创建找零输出
+    # 选中的UTXO需要预留成功，其他脚本同时预留了其中的UTXO时重新查询再选
+    for _ in range(3):
+        utxos = get_utxos(sender_address.to_string())
+        selection = select_coins(utxos, amount_to_send_sats, fee_rate)
+        if not selection:
+            raise Exception("Insufficient funds for transaction and fee")
+        if get_reservations().reserve(selection['inputs']):
+            break
+    else:
+        raise Exception("Selected UTXOs are reserved by other transaction builders")
+    
+    # 预留之后的任何一步失败都释放预留，这些UTXO不会被挂起到过期
+    try:
+        utxos = selection['inputs']
+        has_change = selection['change'] > 0
+    
+        # 计算总输入金额
+        total_input = selection['input_total']
+    
+        print("\n金额信息（输入）:")
+        print("=" * 50)
+        print(f"选币算法: {selection['algorithm']} ({len(utxos)} 个UTXO, {'有' if has_change else '无'}找零)")
+        print(f"总输入金额: {total_input} 聪 ({total_input/100000000:.8f} BTC)")
+        print(f"计划发送: {amount_to_send_sats} 聪 ({amount_to_send:.8f} BTC)")
+        print()
+    
+        # 创建输入
+        tx_inputs = []
+        input_amounts = []
+        input_scripts = []
+    
+        for utxo in utxos:
+            tx_inputs.append(TxInput(utxo['txid'], utxo['vout']))
+            input_amounts.append(utxo['value'])
+            input_scripts.append(sender_address.to_script_pub_key())
+    
+        # 签名前按输入/输出类型算出签名后的虚拟大小 (Taproot key path签名固定64字节，估算与实际一致)，
+        # 手续费和找零一次确定，每个输入只签名一次
+        tx_outputs = [TxOutput(amount_to_send_sats, recipient_address.to_script_pub_key())]
+        if has_change:
+            tx_outputs.append(TxOutput(0, sender_address.to_script_pub_key()))
+        estimated_vsize = estimate_vsize(["p2tr"] * len(tx_inputs), [out.script_pubkey for out in tx_outputs])
+    
+        # 计算找零金额（无找零时多出的金额全部作为手续费）
+        if has_change:
+            final_fee = fee_for(estimated_vsize, fee_rate)
+            change_amount = total_input - amount_to_send_sats - final_fee
+            if change_amount <= 0:
+                raise Exception("Insufficient funds for transaction and fee")
+            tx_outputs[1].amount = change_amount
+        else:
+            change_amount = 0
+            final_fee = total_input - amount_to_send_sats
         tx = Transaction(tx_inputs, tx_outputs, has_segwit=True)
-        
-        # 重新签名
-        tx.witnesses = []
-        for i in range(len(tx_inputs)):
-            sig = sender_key.sign_taproot_input(
-                tx,
-                i,
-                input_scripts,
-                input_amounts
-            )
-            tx.witnesses.append(TxWitnessInput([sig]))
     
-    print("\n费用计算详情:")
-    print("=" * 50)
-    print(f"初始虚拟大小: {initial_tx.get_vsize()} vbytes")
-    print(f"最终虚拟大小: {final_vsize} vbytes")
-    print(f"费率: {fee_rate} sat/vB")
-    print(f"最终手续费: {final_fee} 聪 ({final_fee/100000000:.8f} BTC)")
-    print()
-    
-    print("\n金额信息（输出）:")
-    print("=" * 50)
-    print(f"发送金额: {amount_to_send_sats} 聪 ({amount_to_send:.8f} BTC)")
-    print(f"找零金额: {change_amount} 聪 ({change_amount/100000000:.8f} BTC)")
-    print(f"手续费: {final_fee} 聪 ({final_fee/100000000:.8f} BTC)")
-    print(f"总支出: {amount_to_send_sats + change_amount + final_fee} 聪")
-    print()
+        # 签名每个输入 (交易级的sighash摘要只计算一次；输入很多时用多进程并行签名)
+        for sig in sign_taproot_inputs(tx, sender_key, input_scripts, input_amounts):
+            tx.witnesses.append(TxWitnessInput([sig]))
+        final_vsize = tx.get_vsize()
+    
+        print("\n费用计算详情:")
+        print("=" * 50)
+        print(f"估算虚拟大小: {estimated_vsize} vbytes")
+        print(f"最终虚拟大小: {final_vsize} vbytes")
+        print(f"费率: {fee_rate} sat/vB")
+        print(f"最终手续费: {final_fee} 聪 ({final_fee/100000000:.8f} BTC)")
+        print()
+    
+        print("\n金额信息（输出）:")
+        print("=" * 50)
+        print(f"发送金额: {amount_to_send_sats} 聪 ({amount_to_send:.8f} BTC)")
+        print(f"找零金额: {change_amount} 聪 ({change_amount/100000000:.8f} BTC)")
+        print(f"手续费: {final_fee} 聪 ({final_fee/100000000:.8f} BTC)")
+        print(f"总支出: {amount_to_send_sats + change_amount + final_fee} 聪")
+        print()
+    except Exception:
+        get_reservations().release(selection['inputs'])
+        raise
     
     # 获取签名后的交易
     signed_tx = tx.serialize()
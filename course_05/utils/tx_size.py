@@ -0,0 +1,202 @@
+"""
+交易大小 (weight / vsize) 估算工具
+
+用途：
+- 签名之前按输入类型和输出脚本直接算出交易签名后的虚拟大小，手续费在签名前就能确定，
+  不再需要"先签名一次量大小、调整找零、再全部重新签名"
+- 结果是上限 (worst case)，也是实际大小:
+  - Schnorr签名固定64字节 (默认SIGHASH) 或65字节，Taproot输入的估算与签名后完全一致
+  - ECDSA签名按最长72字节计算 (low-R签名71字节 + sighash 1字节)，实际签名不会更长
+
+支持的输入类型：
+    "p2pkh"           scriptSig: 签名 + 压缩公钥
+    "p2sh-p2wpkh"     scriptSig: 22字节赎回脚本；见证: 签名 + 公钥
+    "p2wpkh"          见证: 签名 + 公钥
+    "p2tr"            key path，见证: 一个Schnorr签名
+    p2sh_input(...)   任意P2SH赎回脚本 (给出scriptSig中各数据项的大小)
+    p2wsh_input(...)  任意P2WSH见证脚本
+    p2tr_script_input(...)  script path，给出叶子脚本和控制块大小
+
+输出可以是: 类型名 ("p2tr" 等)、脚本 (bitcoinutils的Script、bytes、十六进制字符串) 或脚本长度
+
+使用示例：
+from utils.tx_size import estimate_vsize, p2tr_script_input
+
+vsize = estimate_vsize(["p2tr"] * 3, [recipient.to_script_pub_key(), "p2tr"])
+vsize = estimate_vsize([p2tr_script_input(leaf_script_size=34, control_block_size=65)], ["p2tr"])
+
+打印各类型输入/输出的大小 (在course_05目录运行):
+python -m utils.tx_size
+"""
+
+import math
+from typing import Dict, Sequence, Tuple, Union
+
+# 每个witness单位 (WU) 对应1/4 vB，非见证数据每字节4 WU
+WITNESS_SCALE_FACTOR = 4
+
+ECDSA_SIGNATURE_SIZE = 72      # low-R DER签名71字节 + sighash 1字节
+SCHNORR_SIGNATURE_SIZE = 64    # SIGHASH_DEFAULT，其他sighash类型多1字节
+COMPRESSED_PUBKEY_SIZE = 33
+
+# 常见输出脚本的长度 (字节)
+OUTPUT_SCRIPT_SIZES = {
+    "p2tr": 34,      # OP_1 <32字节x-only公钥>
+    "p2wsh": 34,     # OP_0 <32字节脚本哈希>
+    "p2wpkh": 22,    # OP_0 <20字节公钥哈希>
+    "p2sh": 23,      # OP_HASH160 <20字节> OP_EQUAL
+    "p2pkh": 25      # OP_DUP OP_HASH160 <20字节> OP_EQUALVERIFY OP_CHECKSIG
+}
+
+# 输入的描述: (scriptSig长度, 见证栈中各项的长度；None表示没有见证)
+InputSpec = Tuple[int, Union[Sequence[int], None]]
+
+def varint_size(n: int) -> int:
+    """CompactSize编码的长度"""
+    if n < 0xfd:
+        return 1
+    if n <= 0xffff:
+        return 3
+    if n <= 0xffffffff:
+        return 5
+    return 9
+
+def push_size(data_size: int) -> int:
+    """脚本中压入一个数据项需要的字节数 (操作码 + 数据)"""
+    if data_size == 0:
+        return 1                  # OP_0
+    if data_size < 0x4c:
+        return 1 + data_size
+    if data_size <= 0xff:
+        return 2 + data_size      # OP_PUSHDATA1
+    if data_size <= 0xffff:
+        return 3 + data_size      # OP_PUSHDATA2
+    return 5 + data_size
+
+def p2sh_input(script_sig_items: Sequence[int], redeem_script_size: int) -> InputSpec:
+    """
+    任意P2SH输入
+
+    Args:
+        script_sig_items: 赎回脚本之前压入的各数据项大小，如2-of-3多签为 [0, 72, 72] (OP_0 + 两个签名)
+        redeem_script_size: 赎回脚本长度
+    """
+    return sum(push_size(size) for size in script_sig_items) + push_size(redeem_script_size), None
+
+def p2wsh_input(stack_items: Sequence[int], witness_script_size: int) -> InputSpec:
+    """
+    任意P2WSH输入
+
+    Args:
+        stack_items: 见证脚本之前的各见证项大小
+        witness_script_size: 见证脚本长度
+    """
+    return 0, list(stack_items) + [witness_script_size]
+
+def p2tr_script_input(leaf_script_size: int, control_block_size: int = 33,
+                      stack_items: Sequence[int] = (SCHNORR_SIGNATURE_SIZE,)) -> InputSpec:
+    """
+    Taproot script path输入
+
+    Args:
+        leaf_script_size: 花费的叶子脚本长度
+        control_block_size: 控制块长度 = 33 + 32 x Merkle路径深度
+        stack_items: 脚本执行需要的见证项大小，默认一个签名；如hashlock为 [原像长度]
+    """
+    return 0, list(stack_items) + [leaf_script_size, control_block_size]
+
+# 标准输入类型
+INPUT_TYPES: Dict[str, InputSpec] = {
+    "p2pkh": (push_size(ECDSA_SIGNATURE_SIZE) + push_size(COMPRESSED_PUBKEY_SIZE), None),
+    "p2sh-p2wpkh": (push_size(22), [ECDSA_SIGNATURE_SIZE, COMPRESSED_PUBKEY_SIZE]),
+    "p2wpkh": (0, [ECDSA_SIGNATURE_SIZE, COMPRESSED_PUBKEY_SIZE]),
+    "p2tr": (0, [SCHNORR_SIGNATURE_SIZE])
+}
+
+def _input_spec(spec: Union[str, InputSpec]) -> InputSpec:
+    if isinstance(spec, str):
+        if spec not in INPUT_TYPES:
+            raise ValueError(f"不支持的输入类型: {spec}")
+        return INPUT_TYPES[spec]
+    return spec
+
+def input_sizes(spec: Union[str, InputSpec]) -> Tuple[int, int]:
+    """
+    一个输入的大小
+
+    Returns:
+        Tuple[int, int]: (非见证部分字节数, 见证部分字节数；没有见证时为0)
+    """
+    script_sig_size, stack = _input_spec(spec)
+    # 前序输出32 + 输出索引4 + scriptSig + sequence 4
+    base = 32 + 4 + varint_size(script_sig_size) + script_sig_size + 4
+    if stack is None:
+        return base, 0
+    witness = varint_size(len(stack)) + sum(varint_size(size) + size for size in stack)
+    return base, witness
+
+def input_weight(spec: Union[str, InputSpec]) -> int:
+    """一个输入的weight (WU)"""
+    base, witness = input_sizes(spec)
+    return base * WITNESS_SCALE_FACTOR + witness
+
+def input_vbytes(spec: Union[str, InputSpec]) -> float:
+    """一个输入的虚拟大小 (vB，可能带小数，如Taproot key path为57.5)"""
+    return input_weight(spec) / WITNESS_SCALE_FACTOR
+
+def script_size(script) -> int:
+    """输出脚本长度: 类型名、bitcoinutils的Script、bytes、十六进制字符串或长度"""
+    if isinstance(script, int):
+        return script
+    if isinstance(script, str):
+        if script in OUTPUT_SCRIPT_SIZES:
+            return OUTPUT_SCRIPT_SIZES[script]
+        return len(script) // 2
+    if isinstance(script, (bytes, bytearray)):
+        return len(script)
+    return len(script.to_bytes())
+
+def output_size(script) -> int:
+    """一个输出的字节数: 金额8 + 脚本长度 + 脚本"""
+    size = script_size(script)
+    return 8 + varint_size(size) + size
+
+def estimate_weight(inputs: Sequence[Union[str, InputSpec]], outputs: Sequence) -> int:
+    """
+    签名后交易的weight (WU)
+
+    Args:
+        inputs: 每个输入的类型名或p2sh_input/p2wsh_input/p2tr_script_input的结果
+        outputs: 每个输出的类型名或脚本
+    """
+    sizes = [input_sizes(spec) for spec in inputs]
+    has_witness = any(_input_spec(spec)[1] is not None for spec in inputs)
+    # 版本4 + 输入数量 + 输入 + 输出数量 + 输出 + 锁定时间4
+    base = (4 + varint_size(len(inputs)) + sum(b for b, _ in sizes)
+            + varint_size(len(outputs)) + sum(output_size(s) for s in outputs) + 4)
+    witness = 0
+    if has_witness:
+        # segwit标记和标志各1字节；没有见证的输入也要写一个空的见证栈 (1字节)
+        witness = 2 + sum(w if w else 1 for _, w in sizes)
+    return base * WITNESS_SCALE_FACTOR + witness
+
+def estimate_vsize(inputs: Sequence[Union[str, InputSpec]], outputs: Sequence) -> int:
+    """签名后交易的虚拟大小 (vB，向上取整)，参数同estimate_weight"""
+    return math.ceil(estimate_weight(inputs, outputs) / WITNESS_SCALE_FACTOR)
+
+def _print_table():
+    print("=== 输入大小 ===")
+    for name in INPUT_TYPES:
+        print(f"  {name:<12} {input_weight(name):>4} WU  {input_vbytes(name):>6} vB")
+    for depth in (0, 1, 2):
+        spec = p2tr_script_input(leaf_script_size=34, control_block_size=33 + 32 * depth)
+        print(f"  p2tr script (34字节叶子, 深度{depth}) {input_weight(spec):>4} WU  {input_vbytes(spec):>6} vB")
+    print("=== 输出大小 ===")
+    for name in OUTPUT_SCRIPT_SIZES:
+        print(f"  {name:<12} {output_size(name):>4} B")
+    print("=== 交易 ===")
+    for count in (1, 2, 10, 100):
+        print(f"  {count:>3} 个p2tr输入 -> 2个p2tr输出: {estimate_vsize(['p2tr'] * count, ['p2tr', 'p2tr'])} vB")
+
+if __name__ == "__main__":
+    _print_table()
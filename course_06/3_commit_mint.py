@@ -51,7 +51,8 @@ def create_mint_commit_transaction():
     inscription_amount = calculate_inscription_amount()
     min_utxo_amount = inscription_amount + FEE_CONFIG["commit_fee"] + 546  # 预留找零
     
-    selected_utxo = select_best_utxo(min_utxo_amount)
+    # 以脚本名预留: 重新运行时选回上次预留的UTXO，不会因为旧的预留未过期而换币或选不到币
+    selected_utxo = select_best_utxo(min_utxo_amount, owner="commit_mint", protect_unavailable=True)
     if not selected_utxo:
         print(f"❌ 没有足够的UTXO支付 {min_utxo_amount} sats")
         return None, None, None
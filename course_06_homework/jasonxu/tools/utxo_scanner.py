@@ -1,38 +1,35 @@
 #!/usr/bin/env python3
 """
 UTXO扫描和选择工具
+(UTXO查询由 course_05/tools/utxo_provider.py 统一提供，同一次运行内按地址缓存)
 """
 
-import requests
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "course_05"))
+
+from tools.utxo_provider import get_provider
 
 def get_available_utxos(addr):
     """
-    实时获取当前可用的UTXO列表（从Blockstream API）
+    实时获取当前可用的UTXO列表
     """
-    url = "https://blockstream.info/testnet/api/address/" + addr + "/utxo"
-    print(url)
     try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        utxo_list = resp.json()
-        utxos = []
-        for u in utxo_list:
-            utxos.append({
-                "txid": u["txid"],
-                "vout": u["vout"],
-                "amount": u["value"],
-                "note": "API获取"
-            })
-        return utxos
+        utxos = get_provider().get_utxos(addr)
     except Exception as e:
         print(f"[错误] 获取UTXO失败: {e}")
         return []
+    for utxo in utxos:
+        utxo["note"] = f"API获取 ({utxo['source']})"
+    return utxos
 
 def select_best_utxo(addr, min_amount=1500):
     """
     选择最适合的UTXO
     
     Args:
+        addr: 查询的地址
         min_amount: 最小金额要求
     
     Returns:
@@ -75,4 +72,4 @@ if __name__ == "__main__":
     print()
     selected = select_best_utxo("tb1pa3gu4mqkgxcv8yjhh8mfcp93jha3exxck8her2u6j5dgn6gmmuwsd7gg9s", 1500)
     if selected:
-        print(f"\n推荐使用: {selected['txid']}:{selected['vout']}")
\ No newline at end of file
+        print(f"\n推荐使用: {selected['txid']}:{selected['vout']}")
@@ -5,8 +5,6 @@ ARC-20/Atomicals MINT COMMIT交易创建
 """
 
 import time
-import cbor2
-import binascii
 from bitcoinutils.setup import setup
 from bitcoinutils.script import Script
 from bitcoinutils.transactions import Transaction, TxInput, TxOutput, TxWitnessInput
@@ -16,22 +14,64 @@ import struct
 # 导入工具模块
 import sys
 import os
+import json
 sys.path.append(os.path.join(os.path.dirname(__file__), 'tools'))
 
 from utxo_scanner import select_best_utxo
+from tools.utxo_reservation import get_reservations  # course_05/tools，路径由utxo_scanner加入
+from bitwork import compile_bitwork
+from mining_engine import TxidTemplate, mine_sequence
+from parallel_miner import mine_sequence_parallel
+from inscription_address import InscriptionAddressDeriver, next_payload_params
+from mining_checkpoint import MiningCheckpoint, checkpoint_path
+from mining_server import MiningCoordinator, start_server, wait_for_solution
+from mining_telemetry import create_telemetry
 from arc20_config import (
-    PRIVATE_KEY_WIF, NETWORK, FEE_CONFIG, PROTOCOL_CONFIG,
-    get_atomicals_payload_hex, calculate_inscription_amount,
-    INSCRIPTION_CONFIG, get_protocol_hex, get_op_type_hex
+    PRIVATE_KEY_WIF, NETWORK, FEE_CONFIG, PROTOCOL_CONFIG, MINING_CONFIG,
+    calculate_inscription_amount
 )
 
-def mine_commit_address(private_key, bitworkc_prefix):
+def sign_commit_transaction(private_key, commit_tx, selected_utxo):
+    """用主地址key path签名commit交易的唯一输入"""
+    public_key = private_key.get_public_key()
+    signature = private_key.sign_taproot_input(
+        commit_tx,
+        0,
+        [public_key.get_taproot_address().to_script_pub_key()],
+        [selected_utxo["amount"]]
+    )
+    commit_tx.witnesses.append(TxWitnessInput([signature]))
+    return commit_tx
+
+def build_commit_template(deriver, selected_utxo, inscription_amount, time_val, nonce):
+    """
+    推导time/nonce对应的临时地址并创建未签名commit交易的挖矿模板
+
+    Returns:
+        tuple: (derived, tx_output, template)
+    """
+    # 只重新推导payload变化带来的部分: 脚本、叶子hash、tweak、输出键
+    derived = deriver.derive(time_val, nonce)
+    
+    # 创建基础commit交易（不签名），非witness部分只序列化一次作为挖矿模板
+    tx_input = TxInput(selected_utxo["txid"], selected_utxo["vout"])
+    tx_output = TxOutput(inscription_amount, Script(["OP_1", derived["output_key"].hex()]))
+    template = TxidTemplate.from_transaction(Transaction([tx_input], [tx_output], has_segwit=True))
+    return derived, tx_output, template
+
+def mine_commit_address(private_key, bitworkc_prefix, workers=None, selected_utxo=None, job_name="commit"):
     """
     挖矿生成满足bitworkc前缀的commit交易
     
+    两级搜索: 先在当前payload下遍历sequence；sequence空间耗尽后递增payload的nonce
+    (nonce用完则刷新time)，得到新的临时地址后重新遍历sequence
+    
     Args:
         private_key: 私钥对象
-        bitworkc_prefix: 目标txid前缀
+        bitworkc_prefix: bitwork目标，支持 "前缀" 和 "前缀.N" 两种写法
+        workers: 挖矿进程数，默认读取MINING_CONFIG；1为单核，0为全部CPU核心
+        selected_utxo: 要花费的UTXO，默认从地址中选择金额最大的
+        job_name: 检查点文件名和进度输出中的任务名，同时运行多个挖矿任务时必须不同，也是UTXO的预留者标识
         
     Returns:
         tuple: (temp_address, inscription_script, time_val, nonce, payload_hex, commit_tx)
@@ -40,124 +80,207 @@ def mine_commit_address(private_key, bitworkc_prefix):
     public_key = private_key.get_public_key()
     pubkey_xonly = public_key.to_x_only_hex()
     
-    print(f"开始挖矿，目标txid前缀: {bitworkc_prefix}")
+    bitworkc = compile_bitwork(bitworkc_prefix)
+    print(f"开始挖矿，目标bitwork: {bitworkc.to_string()} (平均约 {bitworkc.expected_hashes():,.0f} 次hash)")
     print(f"公钥: {pubkey_xonly}")
     
-    # 预计算固定部分
-    protocol_hex = get_protocol_hex()
-    op_type_hex = get_op_type_hex()
-    
     # 获取真实UTXO
     inscription_amount = calculate_inscription_amount()
     commit_fee = FEE_CONFIG["commit_fee"]
     min_utxo_amount = inscription_amount + commit_fee + 546  # 预留找零
     
-    selected_utxo = select_best_utxo(min_utxo_amount)
+    # 调用方传入的UTXO由调用方负责预留和释放
+    reserved = selected_utxo is None
+    if reserved:
+        # 以任务名预留，挖矿可能持续很久；中断后重启的同名任务会选回同一个UTXO，检查点继续有效
+        selected_utxo = select_best_utxo(min_utxo_amount, owner=job_name, ttl=MINING_CONFIG["reservation_ttl"],
+                                         protect_unavailable=True)
     if not selected_utxo:
         print(f"❌ 没有足够的UTXO支付 {min_utxo_amount} sats")
         return None, None, None, None, None, None
     
     print(f"✅ 选择UTXO: {selected_utxo['txid']}:{selected_utxo['vout']} ({selected_utxo['amount']} sats)")
     
-    # 固定时间戳和nonce，用于生成临时地址
-    now = int(time.time())
-    nonce = 0
+    try:
+        result = _mine_selected_utxo(private_key, bitworkc, selected_utxo, inscription_amount, workers, job_name)
+    except Exception:
+        if reserved:
+            get_reservations().release([selected_utxo], owner=job_name)
+        raise
+    if reserved and result[0] is None:
+        # 挖矿或签名失败，释放预留，其他脚本可以使用这个UTXO (Ctrl+C中断时保留预留，重启后继续)
+        get_reservations().release([selected_utxo], owner=job_name)
+    return result
+
+def _mine_selected_utxo(private_key, bitworkc, selected_utxo, inscription_amount, workers, job_name):
+    """mine_commit_address的挖矿和签名部分，返回值相同"""
+    public_key = private_key.get_public_key()
+    pubkey_xonly = public_key.to_x_only_hex()
     
-    # 生成payload
-    payload = {
-        "args": {
-            "time": now,
-            "nonce": nonce,
-            "bitworkc": PROTOCOL_CONFIG["bitworkc"],
+    if workers is None:
+        workers = MINING_CONFIG["workers"]
+    min_sequence = MINING_CONFIG["min_sequence"]
+    
+    # 预计算固定部分: 内部公钥点、脚本前后缀、tagged hash中间状态
+    deriver = InscriptionAddressDeriver(public_key)
+    
+    # 检查点: 同一UTXO、金额、公钥和bitwork的任务重启后从上次的payload和已搜索区间继续
+    checkpoint = MiningCheckpoint.load_or_create(
+        checkpoint_path(job_name),
+        {
+            "kind": "commit",
+            "utxo": f"{selected_utxo['txid']}:{selected_utxo['vout']}",
+            "inscription_amount": inscription_amount,
+            "pubkey": pubkey_xonly,
+            "bitworkc": bitworkc.to_string(),
             "bitworkr": PROTOCOL_CONFIG["bitworkr"],
-            "mint_ticker": PROTOCOL_CONFIG["mint_ticker"]
-        }
-    }
-    payload_bytes = cbor2.dumps(payload)
-    payload_hex = binascii.hexlify(payload_bytes).decode()
-    
-    # 创建inscription脚本
-    inscription_script = Script([
-        pubkey_xonly,
-        "OP_CHECKSIG",
-        "OP_0",
-        "OP_IF",
-        protocol_hex,            # "atom"
-        op_type_hex,             # "dmt"
-        payload_hex,             # CBOR编码的payload
-        "OP_ENDIF"
-    ])
-    
-    # 生成临时地址
-    temp_address = public_key.get_taproot_address([[inscription_script]])
-    
-    # 创建基础commit交易（不签名）
-    tx_input = TxInput(selected_utxo["txid"], selected_utxo["vout"])
-    tx_output = TxOutput(inscription_amount, temp_address.to_script_pub_key())
-    
-    commit_tx = Transaction([tx_input], [tx_output], has_segwit=True)
-    
-    print(f"临时地址: {temp_address.to_string()}")
-    print(f"开始挖矿，只改变sequence number...")
-    
-    # 开始挖矿 - 只改变sequence number
+            "mint_ticker": PROTOCOL_CONFIG["mint_ticker"],
+            "min_sequence": min_sequence
+        },
+        interval=MINING_CONFIG["checkpoint_interval"]
+    )
+    
+    # 初始时间戳和nonce，sequence空间耗尽后依次递增
+    if checkpoint.payload:
+        now = checkpoint.payload["time"]
+        nonce = checkpoint.payload["nonce"]
+    else:
+        now = int(time.time())
+        nonce = 0
+        checkpoint.set_payload(now, nonce)
     start_time = time.time()
-    sequence = 0xffffffff  # 直接使用BIP68兼容的sequence
     
-    while sequence >= 0:  # 从0xffffffff开始递减
-        # 重新创建TxInput对象，设置新的sequence
-        new_tx_input = TxInput(selected_utxo["txid"], selected_utxo["vout"])
-        new_tx_input.sequence = struct.pack("<I", sequence)  # 4字节小端序
-        
-        # 重新创建Transaction
-        commit_tx = Transaction([new_tx_input], [tx_output], has_segwit=True)
-        
-        # 计算交易hash（不签名）
-        txid = commit_tx.get_txid()
+    # 整个任务共用一个遥测对象，payload切换时EWMA速率和计数不会重置
+    telemetry = create_telemetry(bitworkc, job_name, MINING_CONFIG)
+    telemetry.set_status(nonce=nonce)
+    
+    coordinator_port = MINING_CONFIG["coordinator_port"]
+    if coordinator_port:
+        # 分布式模式: 本进程只分发 (time, nonce, sequence区间) 工作单元，
+        # 由局域网内的 tools/mining_worker.py 计算并回报结果
+        coordinator = MiningCoordinator(
+            lambda t, n: build_commit_template(deriver, selected_utxo, inscription_amount, t, n)[2],
+            bitworkc,
+            now,
+            nonce,
+            unit_size=MINING_CONFIG["unit_size"],
+            min_sequence=min_sequence,
+            telemetry=telemetry
+        )
+        server = start_server(coordinator, port=coordinator_port)
+        print(f"等待worker连接: python tools/mining_worker.py http://<本机IP>:{coordinator_port}")
+        try:
+            solution = wait_for_solution(coordinator)
+        finally:
+            server.shutdown()
         
-        # 检查是否满足挖矿条件
-        if txid.startswith(bitworkc_prefix):
-            elapsed = time.time() - start_time
-            print(f"✅ 挖矿成功!")
-            print(f"  耗时: {elapsed:.2f}秒")
-            print(f"  sequence: {sequence} (0x{sequence:08x})")
-            print(f"  time: {now}")
-            print(f"  nonce: {nonce}")
-            print(f"  临时地址: {temp_address.to_string()}")
-            print(f"  commit txid: {txid}")
-            print(f"  payload hex: {payload_hex}")
-            print(f"  脚本 hex: {inscription_script.to_hex()}")
+        now, nonce, sequence = solution["time"], solution["nonce"], solution["sequence"]
+        derived, tx_output, _ = build_commit_template(deriver, selected_utxo, inscription_amount, now, nonce)
+        print(f"worker {solution['worker']} 找到解")
+    else:
+        telemetry.start()
+        while True:
+            derived, tx_output, template = build_commit_template(deriver, selected_utxo, inscription_amount, now, nonce)
+            
+            print(f"time: {now}, nonce: {nonce}, 临时地址输出键: {derived['output_key'].hex()}")
+            print(f"开始挖矿，只改变sequence number...")
             
-            # 现在签名交易
-            try:
-                signature = private_key.sign_taproot_input(
-                    commit_tx,
-                    0,
-                    [public_key.get_taproot_address().to_script_pub_key()],
-                    [selected_utxo["amount"]]
+            # 开始挖矿 - 只改变sequence number，从0xffffffff开始递减
+            if workers != 1:
+                # 多进程模式: 切分sequence空间，任一进程命中后取消其余进程
+                result = mine_sequence_parallel(
+                    template,
+                    bitworkc,
+                    workers=workers,
+                    chunk_size=MINING_CONFIG["chunk_size"],
+                    end=min_sequence,
+                    checkpoint=checkpoint,
+                    telemetry=telemetry
                 )
-                commit_tx.witnesses.append(TxWitnessInput([signature]))
-                print(f"✅ 交易签名成功!")
-                print(f"最终TxID: {commit_tx.get_txid()}")
-                print(f"最终sequence: {sequence} (0x{sequence:08x}) - BIP68兼容")
-                
-                return temp_address, inscription_script, now, nonce, payload_hex, commit_tx
-                
-            except Exception as e:
-                print(f"❌ 签名失败: {e}")
-                sequence -= 1
-                continue
-        
-        sequence -= 1
-        
-        # 每10000次显示进度
-        if sequence % 10000 == 0:
-            elapsed = time.time() - start_time
-            rate = (0xffffffff - sequence) / elapsed if elapsed > 0 else 0
-            print(f"已尝试 {0xffffffff - sequence} 次, 耗时 {elapsed:.1f}s, 速率 {rate:.0f} hash/s, 当前txid: {txid}")
-    
-    print("❌ 挖矿失败，未找到满足条件的sequence")
-    return None, None, None, None, None, None
+                sequence = result["sequence"] if result else None
+            else:
+                sequence = mine_sequence(template, bitworkc, end=min_sequence, checkpoint=checkpoint, telemetry=telemetry)
+            
+            if sequence is not None:
+                break
+            
+            # sequence空间耗尽，滚动payload参数
+            now, nonce = next_payload_params(now, nonce)
+            checkpoint.set_payload(now, nonce)
+            telemetry.set_status(nonce=nonce)
+            print(f"⚠️ sequence空间已耗尽，切换payload: time={now}, nonce={nonce}")
+        telemetry.stop()
+    
+    payload_hex = derived["payload_hex"]
+    temp_address, inscription_script = deriver.to_objects(derived)
+    
+    # 用bitcoinutils完整计算一次临时地址，确认推导结果一致
+    if public_key.get_taproot_address([[inscription_script]]).to_string() != temp_address.to_string():
+        print("❌ 临时地址推导结果不一致")
+        return None, None, None, None, None, None
+    
+    # 只为命中的sequence创建一次交易对象
+    new_tx_input = TxInput(selected_utxo["txid"], selected_utxo["vout"])
+    new_tx_input.sequence = struct.pack("<I", sequence)  # 4字节小端序
+    commit_tx = Transaction([new_tx_input], [tx_output], has_segwit=True)
+    txid = commit_tx.get_txid()
+    
+    elapsed = time.time() - start_time
+    print(f"✅ 挖矿成功!")
+    print(f"  耗时: {elapsed:.2f}秒")
+    print(f"  sequence: {sequence} (0x{sequence:08x})")
+    print(f"  time: {now}")
+    print(f"  nonce: {nonce}")
+    print(f"  临时地址: {temp_address.to_string()}")
+    print(f"  commit txid: {txid}")
+    print(f"  payload hex: {payload_hex}")
+    print(f"  脚本 hex: {inscription_script.to_hex()}")
+    
+    # 现在签名交易
+    try:
+        sign_commit_transaction(private_key, commit_tx, selected_utxo)
+    except Exception as e:
+        print(f"❌ 签名失败: {e}")
+        return None, None, None, None, None, None
+    
+    print(f"✅ 交易签名成功!")
+    print(f"最终TxID: {commit_tx.get_txid()}")
+    print(f"最终sequence: {sequence} (0x{sequence:08x}) - BIP68兼容")
+    
+    checkpoint.clear()
+    return temp_address, inscription_script, now, nonce, payload_hex, commit_tx
+
+def build_commit_info(commit_tx, temp_address, key_path_address, time_val, nonce, payload_hex):
+    """整理reveal需要的commit信息"""
+    return {
+        "commit_txid": commit_tx.get_txid(),
+        "temp_address": temp_address.to_string(),
+        "key_path_address": key_path_address.to_string(),
+        "inscription_amount": calculate_inscription_amount(),
+        "operation": "arc20_mint",
+        "protocol": PROTOCOL_CONFIG["protocol"],
+        "op_type": PROTOCOL_CONFIG["op_type"],
+        "mint_ticker": PROTOCOL_CONFIG["mint_ticker"],
+        "bitworkc": PROTOCOL_CONFIG["bitworkc"],
+        "bitworkr": PROTOCOL_CONFIG["bitworkr"],
+        "time": time_val,
+        "nonce": nonce,
+        "sequence": struct.unpack("<I", commit_tx.inputs[0].sequence)[0],
+        "payload_hex": payload_hex
+    }
+
+def save_commit_info(commit_info):
+    """保存commit信息到 persistence/commit_arc20_info.json"""
+    # 确保persistence目录存在
+    persistence_dir = os.path.join(os.path.dirname(__file__), "persistence")
+    os.makedirs(persistence_dir, exist_ok=True)
+    
+    commit_file = os.path.join(persistence_dir, "commit_arc20_info.json")
+    with open(commit_file, "w") as f:
+        json.dump(commit_info, f, indent=2)
+    
+    print(f"\n💾 ARC-20信息已保存到 {commit_file}")
+    return commit_file
 
 def create_mint_commit_transaction():
     """
@@ -192,7 +315,7 @@ def create_mint_commit_transaction():
     # 挖矿生成临时地址和commit交易
     print(f"\n=== 开始挖矿 ===")
     result = mine_commit_address(private_key, PROTOCOL_CONFIG['bitworkc'])
-    if not result:
+    if not result[0]:
         print("❌ 挖矿失败")
         return None, None, None
     
@@ -204,31 +327,8 @@ def create_mint_commit_transaction():
     print(f"Commit TxID: {commit_tx.get_txid()}")
     
     # 保存关键信息到文件，供reveal使用
-    commit_info = {
-        "commit_txid": commit_tx.get_txid(),
-        "temp_address": temp_address.to_string(),
-        "key_path_address": key_path_address.to_string(),
-        "inscription_amount": calculate_inscription_amount(),
-        "operation": "arc20_mint",
-        "protocol": PROTOCOL_CONFIG["protocol"],
-        "op_type": PROTOCOL_CONFIG["op_type"],
-        "mint_ticker": PROTOCOL_CONFIG["mint_ticker"],
-        "bitworkc": PROTOCOL_CONFIG["bitworkc"],
-        "bitworkr": PROTOCOL_CONFIG["bitworkr"],
-        "time": time_val,
-        "nonce": nonce,
-        "payload_hex": payload_hex
-    }
-    
-    # 确保persistence目录存在
-    persistence_dir = os.path.join(os.path.dirname(__file__), "persistence")
-    os.makedirs(persistence_dir, exist_ok=True)
-    
-    import json
-    with open(os.path.join(persistence_dir, "commit_arc20_info.json"), "w") as f:
-        json.dump(commit_info, f, indent=2)
-    
-    print(f"\n💾 ARC-20信息已保存到 {os.path.join(persistence_dir, 'commit_arc20_info.json')}")
+    commit_info = build_commit_info(commit_tx, temp_address, key_path_address, time_val, nonce, payload_hex)
+    save_commit_info(commit_info)
     
     # 显示广播信息
     broadcast_mint_commit(commit_tx)
@@ -6,12 +6,9 @@ ARC-20/Atomicals MINT REVEAL交易创建
 """
 
 import time
-import cbor2
-import binascii
 import struct
 from bitcoinutils.setup import setup
 from bitcoinutils.utils import ControlBlock
-from bitcoinutils.script import Script
 from bitcoinutils.transactions import Transaction, TxInput, TxOutput, TxWitnessInput
 from bitcoinutils.keys import PrivateKey
 
@@ -21,10 +18,14 @@ import os
 import json
 sys.path.append(os.path.join(os.path.dirname(__file__), 'tools'))
 
+from bitwork import compile_bitwork
+from mining_engine import TxidTemplate, mine_sequence
+from mining_telemetry import create_telemetry
+from inscription_address import build_mint_payload_hex, build_inscription_script
+from mining_checkpoint import MiningCheckpoint, checkpoint_path
 from arc20_config import (
-    PRIVATE_KEY_WIF, NETWORK, FEE_CONFIG, PROTOCOL_CONFIG,
-    get_atomicals_payload_hex, calculate_inscription_amount,
-    INSCRIPTION_CONFIG, get_protocol_hex, get_op_type_hex
+    PRIVATE_KEY_WIF, NETWORK, FEE_CONFIG, MINING_CONFIG,
+    calculate_inscription_amount
 )
 
 def load_arc20_commit_info():
@@ -39,14 +40,15 @@ def load_arc20_commit_info():
         print("请先运行 5_commit_mint_arc20.py 创建ARC-20 MINT COMMIT交易")
         return None
 
-def mine_reveal_transaction(private_key, commit_info, bitworkr_prefix):
+def mine_reveal_transaction(private_key, commit_info, bitworkr_prefix, job_name="reveal"):
     """
     挖矿生成满足bitworkr前缀的reveal交易
     
     Args:
         private_key: 私钥对象
         commit_info: commit信息
-        bitworkr_prefix: 目标txid前缀
+        bitworkr_prefix: bitwork目标，支持 "前缀" 和 "前缀.N" 两种写法
+        job_name: 检查点文件名和进度输出中的任务名，同时运行多个挖矿任务时必须不同
         
     Returns:
         tuple: (reveal_tx, inscription_script, time_val, nonce, payload_hex)
@@ -55,7 +57,8 @@ def mine_reveal_transaction(private_key, commit_info, bitworkr_prefix):
     public_key = private_key.get_public_key()
     pubkey_xonly = public_key.to_x_only_hex()
     
-    print(f"开始reveal挖矿，目标txid前缀: {bitworkr_prefix}")
+    bitworkr = compile_bitwork(bitworkr_prefix)
+    print(f"开始reveal挖矿，目标bitwork: {bitworkr.to_string()} (平均约 {bitworkr.expected_hashes():,.0f} 次hash)")
     print(f"公钥: {pubkey_xonly}")
     
     # 从commit信息获取参数
@@ -68,6 +71,8 @@ def mine_reveal_transaction(private_key, commit_info, bitworkr_prefix):
         now = commit_info['time']
         nonce = commit_info['nonce']
         print(f"使用commit时的时间戳: {now}, nonce: {nonce}")
+        if 'sequence' in commit_info:
+            print(f"commit挖矿命中的sequence: {commit_info['sequence']} (0x{commit_info['sequence']:08x})")
     else:
         # 如果没有保存，使用当前值
         now = int(time.time())
@@ -87,33 +92,9 @@ def mine_reveal_transaction(private_key, commit_info, bitworkr_prefix):
     print(f"REVEAL费用: {reveal_fee} sats")
     print(f"输出金额: {output_amount} sats")
     
-    # 生成payload
-    payload = {
-        "args": {
-            "time": now,
-            "nonce": nonce,
-            "bitworkc": PROTOCOL_CONFIG["bitworkc"],
-            "bitworkr": PROTOCOL_CONFIG["bitworkr"],
-            "mint_ticker": PROTOCOL_CONFIG["mint_ticker"]
-        }
-    }
-    payload_bytes = cbor2.dumps(payload)
-    payload_hex = binascii.hexlify(payload_bytes).decode()
-    
-    # 重建inscription脚本（使用commit时保存的参数）
-    protocol_hex = get_protocol_hex()
-    op_type_hex = get_op_type_hex()
-    
-    inscription_script = Script([
-        pubkey_xonly,
-        "OP_CHECKSIG",
-        "OP_0",
-        "OP_IF",
-        protocol_hex,            # "atom"
-        op_type_hex,             # "dmt"
-        payload_hex,             # CBOR编码的payload
-        "OP_ENDIF"
-    ])
+    # 重建payload和inscription脚本（与commit使用同一套函数和保存的time/nonce）
+    payload_hex = build_mint_payload_hex(now, nonce)
+    inscription_script = build_inscription_script(pubkey_xonly, payload_hex)
     
     # 验证临时地址
     temp_address_obj = public_key.get_taproot_address([[inscription_script]])
@@ -130,97 +111,98 @@ def mine_reveal_transaction(private_key, commit_info, bitworkr_prefix):
     print("✅ inscription脚本验证通过!")
     print(f"inscription脚本hex: {inscription_script.to_hex()}")
     
-    # 创建基础reveal交易（不签名）
+    # 创建基础reveal交易（不签名），非witness部分只序列化一次作为挖矿模板
     tx_input = TxInput(commit_txid, 0)
     tx_output = TxOutput(output_amount, public_key.get_taproot_address().to_script_pub_key())
     
     reveal_tx = Transaction([tx_input], [tx_output], has_segwit=True)
+    template = TxidTemplate.from_transaction(reveal_tx)
     
     print(f"\n开始reveal挖矿，只改变sequence number...")
     
     # 开始挖矿 - 只改变sequence number（和commit一样的逻辑）
+    # 检查点: 同一commit txid和bitwork的reveal挖矿重启后跳过已搜索区间
+    checkpoint = MiningCheckpoint.load_or_create(
+        checkpoint_path(job_name),
+        {
+            "kind": "reveal",
+            "commit_txid": commit_txid,
+            "output_amount": output_amount,
+            "pubkey": pubkey_xonly,
+            "bitworkr": bitworkr.to_string()
+        },
+        interval=MINING_CONFIG["checkpoint_interval"]
+    )
+    checkpoint.set_payload(now, nonce)
+    
     start_time = time.time()
-    sequence = 0xffffffff  # 从0xffffffff开始递减
+    with create_telemetry(bitworkr, job_name, MINING_CONFIG) as telemetry:
+        sequence = mine_sequence(template, bitworkr, checkpoint=checkpoint, telemetry=telemetry)
     
-    while sequence >= 0:  # 从0xffffffff开始递减
-        # 重新创建TxInput对象，设置新的sequence
-        new_tx_input = TxInput(commit_txid, 0)
-        new_tx_input.sequence = struct.pack("<I", sequence)  # 4字节小端序
-        
-        # 重新创建Transaction
-        reveal_tx = Transaction([new_tx_input], [tx_output], has_segwit=True)
-        
-        # 计算交易hash（不签名）
-        txid = reveal_tx.get_txid()
-        
-        # 检查是否满足挖矿条件
-        if txid.startswith(bitworkr_prefix):
-            elapsed = time.time() - start_time
-            print(f"✅ reveal挖矿成功!")
-            print(f"  耗时: {elapsed:.2f}秒")
-            print(f"  sequence: {sequence} (0x{sequence:08x})")
-            print(f"  time: {now}")
-            print(f"  nonce: {nonce}")
-            print(f"  reveal txid: {txid}")
-            print(f"  payload hex: {payload_hex}")
-            
-            # 现在签名交易
-            try:
-                # 关键: script path签名
-                signature = private_key.sign_taproot_input(
-                    reveal_tx,
-                    0,
-                    [temp_address_obj.to_script_pub_key()],
-                    [inscription_amount],
-                    script_path=True,
-                    tapleaf_script=inscription_script,
-                    tweak=False
-                )
-                
-                print(f"✅ 签名成功: {signature}")
-                
-                # 创建控制块
-                control_block = ControlBlock(
-                    public_key,
-                    scripts=[inscription_script],
-                    index=0,
-                    is_odd=temp_address_obj.is_odd()
-                )
-                
-                print(f"✅ 控制块: {control_block.to_hex()}")
-                print(f"parity bit: {temp_address_obj.is_odd()}")
-                
-                # 构建witness
-                reveal_tx.witnesses.append(TxWitnessInput([
-                    signature,
-                    inscription_script.to_hex(),
-                    control_block.to_hex()
-                ]))
-                
-                print(f"✅ reveal交易签名成功!")
-                print(f"TxID: {reveal_tx.get_txid()}")
-                print(f"WTxID: {reveal_tx.get_wtxid()}")
-                print(f"交易大小: {reveal_tx.get_size()} bytes")
-                print(f"虚拟大小: {reveal_tx.get_vsize()} vbytes")
-                print(f"最终sequence: {sequence} (0x{sequence:08x}) - BIP68兼容")
-                
-                return reveal_tx, inscription_script, now, nonce, payload_hex
-                
-            except Exception as e:
-                print(f"❌ 签名失败: {e}")
-                sequence -= 1
-                continue
-        
-        sequence -= 1
-        
-        # 每10000次显示进度
-        if sequence % 10000 == 0:
-            elapsed = time.time() - start_time
-            rate = (0xffffffff - sequence) / elapsed if elapsed > 0 else 0
-            print(f"已尝试 {0xffffffff - sequence} 次, 耗时 {elapsed:.1f}s, 速率 {rate:.0f} hash/s, 当前txid: {txid}")
-    
-    print("❌ reveal挖矿失败，未找到满足条件的sequence")
-    return None, None, None, None, None
+    if sequence is None:
+        print("❌ reveal挖矿失败，未找到满足条件的sequence")
+        return None, None, None, None, None
+    
+    # 只为命中的sequence创建一次交易对象
+    new_tx_input = TxInput(commit_txid, 0)
+    new_tx_input.sequence = struct.pack("<I", sequence)  # 4字节小端序
+    reveal_tx = Transaction([new_tx_input], [tx_output], has_segwit=True)
+    txid = reveal_tx.get_txid()
+    
+    elapsed = time.time() - start_time
+    print(f"✅ reveal挖矿成功!")
+    print(f"  耗时: {elapsed:.2f}秒")
+    print(f"  sequence: {sequence} (0x{sequence:08x})")
+    print(f"  time: {now}")
+    print(f"  nonce: {nonce}")
+    print(f"  reveal txid: {txid}")
+    print(f"  payload hex: {payload_hex}")
+    
+    # 现在签名交易
+    try:
+        # 关键: script path签名
+        signature = private_key.sign_taproot_input(
+            reveal_tx,
+            0,
+            [temp_address_obj.to_script_pub_key()],
+            [inscription_amount],
+            script_path=True,
+            tapleaf_script=inscription_script,
+            tweak=False
+        )
+    except Exception as e:
+        print(f"❌ 签名失败: {e}")
+        return None, None, None, None, None
+    
+    print(f"✅ 签名成功: {signature}")
+    
+    # 创建控制块
+    control_block = ControlBlock(
+        public_key,
+        scripts=[inscription_script],
+        index=0,
+        is_odd=temp_address_obj.is_odd()
+    )
+    
+    print(f"✅ 控制块: {control_block.to_hex()}")
+    print(f"parity bit: {temp_address_obj.is_odd()}")
+    
+    # 构建witness
+    reveal_tx.witnesses.append(TxWitnessInput([
+        signature,
+        inscription_script.to_hex(),
+        control_block.to_hex()
+    ]))
+    
+    print(f"✅ reveal交易签名成功!")
+    print(f"TxID: {reveal_tx.get_txid()}")
+    print(f"WTxID: {reveal_tx.get_wtxid()}")
+    print(f"交易大小: {reveal_tx.get_size()} bytes")
+    print(f"虚拟大小: {reveal_tx.get_vsize()} vbytes")
+    print(f"最终sequence: {sequence} (0x{sequence:08x}) - BIP68兼容")
+    
+    checkpoint.clear()
+    return reveal_tx, inscription_script, now, nonce, payload_hex
 
 def create_mint_reveal_transaction():
     """
@@ -275,7 +257,7 @@ def create_mint_reveal_transaction():
     # 挖矿生成reveal交易
     print(f"\n=== 开始reveal挖矿 ===")
     result = mine_reveal_transaction(private_key, commit_info, commit_info['bitworkr'])
-    if not result:
+    if not result[0]:
         print("❌ reveal挖矿失败")
         return None
     
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+ARC-20/Atomicals MINT 一次性流水线: commit挖矿 -> reveal挖矿 -> 同时输出两笔交易
+用途: reveal的txid只依赖commit的txid，commit挖矿结束后立即挖reveal并签名，
+      不需要等commit确认后再单独运行6_reveal_mint_arc20.py
+"""
+
+import os
+import sys
+import json
+import importlib
+from bitcoinutils.setup import setup
+from bitcoinutils.keys import PrivateKey
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'tools'))
+
+from arc20_config import PRIVATE_KEY_WIF, NETWORK, PROTOCOL_CONFIG
+
+# 文件名以数字开头，只能通过importlib导入
+commit_module = importlib.import_module("5_commit_mint_arc20")
+reveal_module = importlib.import_module("6_reveal_mint_arc20")
+
+def save_pipeline_result(commit_tx, reveal_tx, commit_info):
+    """把两笔签名后的交易一起保存到 persistence/pipeline_arc20_txs.json"""
+    persistence_dir = os.path.join(os.path.dirname(__file__), "persistence")
+    os.makedirs(persistence_dir, exist_ok=True)
+
+    result = {
+        "commit_txid": commit_tx.get_txid(),
+        "commit_hex": commit_tx.serialize(),
+        "reveal_txid": reveal_tx.get_txid(),
+        "reveal_hex": reveal_tx.serialize(),
+        "temp_address": commit_info["temp_address"],
+        "time": commit_info["time"],
+        "nonce": commit_info["nonce"],
+        "sequence": commit_info["sequence"]
+    }
+
+    pipeline_file = os.path.join(persistence_dir, "pipeline_arc20_txs.json")
+    with open(pipeline_file, "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"\n💾 commit和reveal交易已保存到 {pipeline_file}")
+    return pipeline_file
+
+def create_mint_pipeline(workers=None):
+    """
+    一次完成commit挖矿和reveal挖矿
+
+    Args:
+        workers: commit挖矿进程数，默认读取MINING_CONFIG
+
+    Returns:
+        tuple: (commit_tx, reveal_tx)
+    """
+    setup(NETWORK)
+
+    print(f"=== ARC-20/Atomicals MINT 流水线 ===")
+    print(f"代币符号: {PROTOCOL_CONFIG['mint_ticker']}")
+    print(f"bitworkc: {PROTOCOL_CONFIG['bitworkc']}")
+    print(f"bitworkr: {PROTOCOL_CONFIG['bitworkr']}")
+
+    private_key = PrivateKey.from_wif(PRIVATE_KEY_WIF)
+    key_path_address = private_key.get_public_key().get_taproot_address()
+    print(f"主地址: {key_path_address.to_string()}")
+
+    # 第一阶段: commit挖矿并签名
+    print(f"\n=== 第一阶段: commit挖矿 ===")
+    result = commit_module.mine_commit_address(private_key, PROTOCOL_CONFIG['bitworkc'], workers=workers)
+    temp_address, inscription_script, time_val, nonce, payload_hex, commit_tx = result
+    if not commit_tx:
+        print("❌ commit挖矿失败")
+        return None, None
+
+    # commit信息仍然写入commit_arc20_info.json，流水线中断时可以单独运行6_reveal_mint_arc20.py
+    commit_info = commit_module.build_commit_info(
+        commit_tx, temp_address, key_path_address, time_val, nonce, payload_hex
+    )
+    commit_module.save_commit_info(commit_info)
+
+    # 第二阶段: commit txid已知，直接在内存中挖reveal
+    print(f"\n=== 第二阶段: reveal挖矿 (commit txid: {commit_info['commit_txid']}) ===")
+    reveal_tx = reveal_module.mine_reveal_transaction(private_key, commit_info, commit_info['bitworkr'])[0]
+    if not reveal_tx:
+        print("❌ reveal挖矿失败，可稍后单独运行 6_reveal_mint_arc20.py")
+        return commit_tx, None
+
+    save_pipeline_result(commit_tx, reveal_tx, commit_info)
+    return commit_tx, reveal_tx
+
+def broadcast_mint_pipeline(commit_tx, reveal_tx):
+    """显示两笔交易的广播信息"""
+
+    print(f"\n" + "="*60)
+    print(f"🚀 ARC-20/Atomicals MINT commit + reveal 交易准备就绪!")
+    print(f"="*60)
+
+    print(f"commit txid: {commit_tx.get_txid()}")
+    print(f"commit hex: {commit_tx.serialize()}")
+    print(f"")
+    print(f"reveal txid: {reveal_tx.get_txid()}")
+    print(f"reveal hex: {reveal_tx.serialize()}")
+    print(f"")
+    print(f"作为交易包一起广播 (reveal花费未确认的commit输出):")
+    print(f"bitcoin-cli -{NETWORK} submitpackage '[\"{commit_tx.serialize()}\", \"{reveal_tx.serialize()}\"]'")
+    print(f"")
+    print(f"或者依次广播:")
+    print(f"bitcoin-cli -{NETWORK} sendrawtransaction {commit_tx.serialize()}")
+    print(f"bitcoin-cli -{NETWORK} sendrawtransaction {reveal_tx.serialize()}")
+
+if __name__ == "__main__":
+    commit_tx, reveal_tx = create_mint_pipeline()
+
+    if commit_tx and reveal_tx:
+        broadcast_mint_pipeline(commit_tx, reveal_tx)
+    elif commit_tx:
+        commit_module.broadcast_mint_commit(commit_tx)
+    else:
+        print(f"❌ ARC-20 MINT 流水线失败")
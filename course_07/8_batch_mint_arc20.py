@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+ARC-20/Atomicals 批量MINT
+用途: 一笔资金交易拆出N个输出，每个输出由一个进程独立完成 commit挖矿 -> reveal挖矿，
+      所有mint的状态记录在 persistence/batch_mint_arc20.json，中断后重新运行只处理未完成的mint
+
+交易结构:
+    资金交易: 主地址UTXO -> N x (inscription金额 + commit费用) + 找零
+    commit_i: 资金交易输出i -> 临时地址_i
+    reveal_i: 临时地址_i -> 主地址
+"""
+
+import os
+import sys
+import json
+import time
+import importlib
+import multiprocessing
+from bitcoinutils.setup import setup
+from bitcoinutils.keys import PrivateKey
+from bitcoinutils.transactions import Transaction, TxInput, TxOutput, TxWitnessInput
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'tools'))
+
+from utxo_scanner import select_best_utxo
+from parallel_miner import resolve_worker_count
+from arc20_config import (
+    PRIVATE_KEY_WIF, NETWORK, FEE_CONFIG, PROTOCOL_CONFIG, MINING_CONFIG, BATCH_CONFIG,
+    calculate_inscription_amount
+)
+
+# 文件名以数字开头，只能通过importlib导入
+commit_module = importlib.import_module("5_commit_mint_arc20")
+reveal_module = importlib.import_module("6_reveal_mint_arc20")
+
+PERSISTENCE_DIR = os.path.join(os.path.dirname(__file__), "persistence")
+BATCH_FILE = os.path.join(PERSISTENCE_DIR, "batch_mint_arc20.json")
+
+def estimate_funding_vsize(output_count):
+    """单个taproot key path输入、output_count个P2TR输出的交易虚拟大小"""
+    # 交易头约10.5 vB，key path输入约57.5 vB，每个P2TR输出43 vB
+    return 11 + 58 + 43 * output_count
+
+def build_funding_transaction(private_key, utxo, mint_count):
+    """
+    创建并签名资金交易: 前mint_count个输出各自够一次commit，最后是找零
+
+    Returns:
+        Transaction: 签名后的资金交易，余额不足返回None
+    """
+    script_pubkey = private_key.get_public_key().get_taproot_address().to_script_pub_key()
+    per_mint = calculate_inscription_amount() + FEE_CONFIG["commit_fee"]
+    fee = estimate_funding_vsize(mint_count + 1) * BATCH_CONFIG["funding_fee_rate"]
+    change = utxo["amount"] - per_mint * mint_count - fee
+
+    if change < 0:
+        print(f"❌ UTXO金额不足: 需要 {per_mint * mint_count + fee} sats，只有 {utxo['amount']} sats")
+        return None
+
+    outputs = [TxOutput(per_mint, script_pubkey) for _ in range(mint_count)]
+    if change >= FEE_CONFIG["min_output"]:
+        outputs.append(TxOutput(change, script_pubkey))
+    else:
+        print(f"⚠️ 找零 {change} sats 低于dust限制，并入手续费")
+
+    funding_tx = Transaction([TxInput(utxo["txid"], utxo["vout"])], outputs, has_segwit=True)
+    signature = private_key.sign_taproot_input(funding_tx, 0, [script_pubkey], [utxo["amount"]])
+    funding_tx.witnesses.append(TxWitnessInput([signature]))
+
+    print(f"✅ 资金交易: {mint_count} 个输出 x {per_mint} sats, 手续费 {fee} sats, 找零 {max(change, 0)} sats")
+    return funding_tx
+
+def load_batch_state():
+    """读取批量mint状态文件，不存在返回None"""
+    try:
+        with open(BATCH_FILE, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_batch_state(state):
+    """原子写入批量mint状态文件"""
+    os.makedirs(PERSISTENCE_DIR, exist_ok=True)
+    state["updated_at"] = int(time.time())
+    tmp_path = BATCH_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, BATCH_FILE)
+
+def archive_batch_state(state):
+    """已全部完成的批次改名保存，为新批次腾出状态文件"""
+    archive_file = os.path.join(PERSISTENCE_DIR, f"batch_mint_arc20_{state['funding_txid'][:16]}.json")
+    os.replace(BATCH_FILE, archive_file)
+    print(f"📂 上一批次已全部完成，归档到 {archive_file}")
+
+def create_batch_state(private_key, mint_count):
+    """选择UTXO、创建资金交易并生成新的批次状态"""
+    per_mint = calculate_inscription_amount() + FEE_CONFIG["commit_fee"]
+    min_amount = per_mint * mint_count + estimate_funding_vsize(mint_count + 1) * BATCH_CONFIG["funding_fee_rate"]
+
+    utxo = select_best_utxo(min_amount, owner="batch_mint_arc20", ttl=BATCH_CONFIG["reservation_ttl"],
+                            protect_unavailable=True)
+    if not utxo:
+        return None
+
+    funding_tx = build_funding_transaction(private_key, utxo, mint_count)
+    if not funding_tx:
+        return None
+
+    funding_txid = funding_tx.get_txid()
+    state = {
+        "funding_txid": funding_txid,
+        "funding_hex": funding_tx.serialize(),
+        "funding_utxo": f"{utxo['txid']}:{utxo['vout']}",
+        "mint_ticker": PROTOCOL_CONFIG["mint_ticker"],
+        "bitworkc": PROTOCOL_CONFIG["bitworkc"],
+        "bitworkr": PROTOCOL_CONFIG["bitworkr"],
+        "created_at": int(time.time()),
+        "mints": [
+            {
+                "index": i,
+                "status": "pending",
+                "utxo": {"txid": funding_txid, "vout": i, "amount": per_mint, "note": "批量资金输出"}
+            }
+            for i in range(mint_count)
+        ]
+    }
+    save_batch_state(state)
+    return state
+
+def _init_batch_worker():
+    """每个进程内单核挖一个mint，不启动分布式协调服务 (多个进程会争用同一端口)"""
+    MINING_CONFIG["coordinator_port"] = 0
+
+def _mint_worker(mint):
+    """
+    在一个进程中完成一个mint的commit挖矿和reveal挖矿
+
+    Returns:
+        dict: 更新后的mint记录
+    """
+    setup(NETWORK)
+    index = mint["index"]
+    start_time = time.time()
+
+    private_key = PrivateKey.from_wif(PRIVATE_KEY_WIF)
+    key_path_address = private_key.get_public_key().get_taproot_address()
+
+    result = commit_module.mine_commit_address(
+        private_key, PROTOCOL_CONFIG["bitworkc"], workers=1,
+        selected_utxo=mint["utxo"], job_name=f"batch_commit_{index}"
+    )
+    temp_address, _, time_val, nonce, payload_hex, commit_tx = result
+    if not commit_tx:
+        return {**mint, "status": "failed", "error": "commit挖矿失败"}
+
+    commit_info = commit_module.build_commit_info(
+        commit_tx, temp_address, key_path_address, time_val, nonce, payload_hex
+    )
+    reveal_tx = reveal_module.mine_reveal_transaction(
+        private_key, commit_info, commit_info["bitworkr"], job_name=f"batch_reveal_{index}"
+    )[0]
+    if not reveal_tx:
+        return {**mint, "status": "failed", "error": "reveal挖矿失败", "commit_info": commit_info}
+
+    return {
+        **mint,
+        "status": "mined",
+        "commit_info": commit_info,
+        "commit_hex": commit_tx.serialize(),
+        "reveal_txid": reveal_tx.get_txid(),
+        "reveal_hex": reveal_tx.serialize(),
+        "elapsed": time.time() - start_time
+    }
+
+def run_batch_mint(mint_count=None, processes=None):
+    """
+    批量mint: 资金交易 + 并行的commit/reveal挖矿
+
+    Args:
+        mint_count: 新批次的mint数量，默认读取BATCH_CONFIG
+        processes: 同时挖矿的进程数，默认读取BATCH_CONFIG，0表示全部CPU核心
+
+    Returns:
+        dict: 批次状态，失败返回None
+    """
+    setup(NETWORK)
+    if mint_count is None:
+        mint_count = BATCH_CONFIG["mint_count"]
+    if processes is None:
+        processes = BATCH_CONFIG["processes"]
+
+    print(f"=== ARC-20/Atomicals 批量MINT ===")
+    print(f"代币符号: {PROTOCOL_CONFIG['mint_ticker']}")
+    print(f"bitworkc: {PROTOCOL_CONFIG['bitworkc']}, bitworkr: {PROTOCOL_CONFIG['bitworkr']}")
+
+    private_key = PrivateKey.from_wif(PRIVATE_KEY_WIF)
+
+    state = load_batch_state()
+    if state and all(m["status"] == "mined" for m in state["mints"]):
+        archive_batch_state(state)
+        state = None
+    if state and (state["mint_ticker"], state["bitworkc"], state["bitworkr"]) != (
+            PROTOCOL_CONFIG["mint_ticker"], PROTOCOL_CONFIG["bitworkc"], PROTOCOL_CONFIG["bitworkr"]):
+        print(f"❌ {BATCH_FILE} 中未完成的批次使用了不同的代币或bitwork，请先处理或删除该文件")
+        return None
+
+    if state:
+        print(f"📂 继续未完成的批次: 资金交易 {state['funding_txid']}")
+    else:
+        if mint_count > 12:
+            print(f"⚠️ {mint_count} 个mint超过未确认交易链的后代数量限制，需等资金交易确认后再广播commit")
+        state = create_batch_state(private_key, mint_count)
+        if not state:
+            print("❌ 创建资金交易失败")
+            return None
+
+    pending = [m for m in state["mints"] if m["status"] != "mined"]
+    processes = min(resolve_worker_count(processes), len(pending))
+    print(f"待挖矿: {len(pending)} 个mint, {processes} 个进程")
+
+    start_time = time.time()
+    with multiprocessing.Pool(processes=processes, initializer=_init_batch_worker) as pool:
+        for mint in pool.imap_unordered(_mint_worker, pending):
+            state["mints"][mint["index"]] = mint
+            save_batch_state(state)
+            done = sum(1 for m in state["mints"] if m["status"] == "mined")
+            if mint["status"] == "mined":
+                print(f"✅ mint {mint['index']} 完成 ({done}/{len(state['mints'])}): "
+                      f"commit {mint['commit_info']['commit_txid']}, reveal {mint['reveal_txid']}, 耗时 {mint['elapsed']:.1f}s")
+            else:
+                print(f"❌ mint {mint['index']} 失败: {mint['error']}")
+
+    elapsed = time.time() - start_time
+    done = sum(1 for m in state["mints"] if m["status"] == "mined")
+    print(f"\n批量mint结束: {done}/{len(state['mints'])} 完成, 耗时 {elapsed:.1f}s")
+    print(f"💾 批次状态已保存到 {BATCH_FILE}")
+    return state
+
+def broadcast_batch_mint(state):
+    """按依赖顺序显示广播命令: 资金交易 -> 全部commit -> 全部reveal"""
+    mined = [m for m in state["mints"] if m["status"] == "mined"]
+
+    print(f"\n" + "="*60)
+    print(f"🚀 ARC-20/Atomicals 批量MINT交易准备就绪! ({len(mined)} 个mint)")
+    print(f"="*60)
+
+    print(f"bitcoin-cli -{NETWORK} sendrawtransaction {state['funding_hex']}")
+    for mint in mined:
+        print(f"bitcoin-cli -{NETWORK} sendrawtransaction {mint['commit_hex']}")
+    for mint in mined:
+        print(f"bitcoin-cli -{NETWORK} sendrawtransaction {mint['reveal_hex']}")
+
+    if len(mined) < len(state["mints"]):
+        print(f"\n⚠️ 还有 {len(state['mints']) - len(mined)} 个mint未完成，重新运行本脚本继续")
+
+if __name__ == "__main__":
+    state = run_batch_mint()
+
+    if state:
+        broadcast_batch_mint(state)
+    else:
+        print(f"❌ ARC-20 批量MINT失败")
@@ -20,11 +20,36 @@ FEE_CONFIG = {
 PROTOCOL_CONFIG = {
     "protocol": "atom",     # 协议标识
     "op_type": "dmt",       # 操作类型: dmt, deploy, mint
-    "bitworkc": "000000",   # commit挖矿难度前缀
-    "bitworkr": "6238",     # reveal挖矿难度前缀
+    "bitworkc": "000000",   # commit挖矿难度前缀，支持 "前缀.N" (前缀后一位hex >= N)
+    "bitworkr": "6238",     # reveal挖矿难度前缀，语法同bitworkc
     "mint_ticker": "sophon" # 代币符号
 }
 
+# 挖矿配置
+MINING_CONFIG = {
+    "workers": 1,           # 挖矿进程数: 1为单核, 0表示使用全部CPU核心
+    "chunk_size": 65536,    # 多进程模式下每个任务的sequence区间大小
+    "min_sequence": 0,      # 每个payload搜索的最小sequence，耗尽后滚动payload的nonce/time
+                            # 设为0x80000000可保证sequence的BIP68禁用位始终为1
+    "checkpoint_interval": 30,  # 挖矿检查点写入persistence目录的间隔 (秒)
+    "coordinator_port": 0,  # 分布式挖矿协调服务端口，0为不启用；启用后由局域网内的
+                            # tools/mining_worker.py 领取工作单元，本机不参与计算
+    "unit_size": 1 << 22,   # 分布式模式下每个工作单元的sequence数量
+    "report_interval": 5,   # 后台线程报告挖矿进度的间隔 (秒)
+    "telemetry_prometheus": "",  # 可选: Prometheus textfile路径，留空不写
+    "telemetry_jsonl": "",  # 可选: 挖矿进度JSON lines文件路径，留空不写
+    "reservation_ttl": 86400,  # commit花费的UTXO的预留时间（秒），挖矿期间其他脚本不能选中它
+}
+
+# 批量MINT配置 (8_batch_mint_arc20.py)
+BATCH_CONFIG = {
+    "mint_count": 4,        # 每批mint数量 = 资金交易的输出数
+                            # 资金交易未确认时全部广播，mempool后代数量上限(25)要求不超过12
+    "funding_fee_rate": 2,  # 资金交易费率 (sat/vB)
+    "processes": 0,         # 同时挖矿的mint数，0表示全部CPU核心 (每个mint单核挖矿)
+    "reservation_ttl": 86400,  # 资金UTXO的预留时间（秒），批量挖矿可能持续很久，期间其他脚本不能选中它
+}
+
 # Atomicals Payload配置
 PAYLOAD_CONFIG = {
     "deploy": {
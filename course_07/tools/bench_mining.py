@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+挖矿速度基准测试
+用途: 用固定的合成交易模板 (不需要网络和真实私钥) 对比不同挖矿方式的hash/s、
+      不同前缀长度的出解时间分布和内存占用，结果写入JSON文件便于发现性能回退
+
+用法:
+    python bench_mining.py                      # 结果写入 persistence/bench_mining_<时间>.json
+    python bench_mining.py --baseline 旧结果.json  # 同时和旧结果对比
+"""
+
+import os
+import json
+import time
+import struct
+import platform
+import argparse
+import resource
+import statistics
+import tracemalloc
+import multiprocessing
+from bitcoinutils.setup import setup
+from bitcoinutils.keys import PrivateKey
+from bitcoinutils.transactions import Transaction, TxInput, TxOutput
+
+from bitwork import compile_bitwork
+from mining_engine import TxidTemplate, scan_sequences, scan_sequences_patching, MAX_SEQUENCE
+from parallel_miner import _init_worker, _mine_chunk, split_sequence_range, resolve_worker_count
+from mining_checkpoint import PERSISTENCE_DIR
+
+# 合成的UTXO和密钥，只用于基准测试
+BENCH_UTXO_TXID = "11" * 32
+BENCH_UTXO_VOUT = 0
+BENCH_AMOUNT = 1046
+BENCH_SECRET = 0x1234567890abcdef
+# 64个f的前缀实际上不可能命中，保证每种方式都跑满同样的次数
+UNREACHABLE_BITWORK = compile_bitwork("f" * 64)
+# 出解时间测试的前缀长度
+SOLUTION_PREFIXES = ["0", "00", "000", "0000"]
+# 内存测试只跑少量次数 (tracemalloc会明显拖慢速度)
+MEMORY_SAMPLE_COUNT = 10000
+
+def build_bench_transaction(vout=BENCH_UTXO_VOUT):
+    """构建一个与commit交易结构相同的单输入单输出交易"""
+    setup("testnet")
+    public_key = PrivateKey(secret_exponent=BENCH_SECRET).get_public_key()
+    tx_input = TxInput(BENCH_UTXO_TXID, vout)
+    tx_output = TxOutput(BENCH_AMOUNT, public_key.get_taproot_address().to_script_pub_key())
+    return Transaction([tx_input], [tx_output], has_segwit=True), tx_output
+
+def scan_object_rebuild(tx_output, high, low, bitwork):
+    """原来的挖矿循环: 每个候选都重建TxInput和Transaction再get_txid()"""
+    for sequence in range(high, low - 1, -1):
+        tx_input = TxInput(BENCH_UTXO_TXID, BENCH_UTXO_VOUT)
+        tx_input.sequence = struct.pack("<I", sequence)
+        tx = Transaction([tx_input], [tx_output], has_segwit=True)
+        if bitwork.matches_txid(tx.get_txid()):
+            return sequence, high - sequence + 1
+    return None, high - low + 1
+
+def scan_multiprocess(template, high, low, bitwork, workers, chunk_size=1 << 16):
+    """与mine_sequence_parallel相同的进程池切分方式 (不含检查点和遥测)"""
+    hashed_total = 0
+    with multiprocessing.Pool(
+        processes=workers,
+        initializer=_init_worker,
+        initargs=(bytes(template.raw_tx), template.sequence_offset, bitwork.to_string())
+    ) as pool:
+        for sequence, hashed, _, _ in pool.imap_unordered(_mine_chunk, split_sequence_range(chunk_size, high, low)):
+            hashed_total += hashed
+            if sequence is not None:
+                pool.terminate()
+                return sequence, hashed_total
+    return None, hashed_total
+
+def measure(name, scan, count):
+    """
+    运行一种挖矿方式count次
+
+    Returns:
+        dict: {"hashes", "elapsed", "hash_rate"}
+    """
+    high = MAX_SEQUENCE
+    low = MAX_SEQUENCE - count + 1
+    start = time.perf_counter()
+    _, hashed = scan(high, low)
+    elapsed = time.perf_counter() - start
+    rate = hashed / elapsed if elapsed > 0 else 0
+    print(f"  {name:<16} {hashed:>9} 次  {elapsed:7.2f}s  {rate:>12.0f} hash/s")
+    return {"hashes": hashed, "elapsed": elapsed, "hash_rate": rate}
+
+def measure_memory(scan, count=MEMORY_SAMPLE_COUNT):
+    """用tracemalloc统计一次扫描的Python堆峰值 (字节)"""
+    tracemalloc.start()
+    scan(MAX_SEQUENCE, MAX_SEQUENCE - count + 1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def run_benchmark(count=100000, workers=0):
+    """
+    对比原对象重建循环、字节修补、midstate复用、多进程四种方式
+
+    Args:
+        count: 单进程方式的hash次数 (多进程方式按进程数放大)
+        workers: 多进程方式的进程数，0表示全部CPU核心
+
+    Returns:
+        dict: 每种方式的 {"hashes", "elapsed", "hash_rate", "peak_memory"}
+    """
+    tx, tx_output = build_bench_transaction()
+    template = TxidTemplate.from_transaction(tx)
+    workers = resolve_worker_count(workers)
+
+    # 先确认几种方式算出的txid一致
+    check_input = TxInput(BENCH_UTXO_TXID, BENCH_UTXO_VOUT)
+    check_input.sequence = struct.pack("<I", 0x12345678)
+    expected = Transaction([check_input], [tx_output], has_segwit=True).get_txid()
+    assert template.txid(0x12345678) == expected, "midstate txid不一致"
+
+    strategies = {
+        "object_rebuild": ("对象重建(原循环)", lambda h, l: scan_object_rebuild(tx_output, h, l, UNREACHABLE_BITWORK), count),
+        "byte_patching": ("字节修补", lambda h, l: scan_sequences_patching(template, h, l, UNREACHABLE_BITWORK), count),
+        "midstate": ("midstate复用", lambda h, l: scan_sequences(template, h, l, UNREACHABLE_BITWORK), count),
+        "multiprocess": (f"多进程({workers})", lambda h, l: scan_multiprocess(template, h, l, UNREACHABLE_BITWORK, workers), count * workers),
+    }
+
+    print(f"=== 挖矿基准测试 ({count} 次) ===")
+    results = {}
+    for key, (name, scan, strategy_count) in strategies.items():
+        results[key] = measure(name, scan, strategy_count)
+
+    # 多进程的内存主要在子进程中，tracemalloc只统计本进程，因此只测单进程方式
+    for key in ("object_rebuild", "byte_patching", "midstate"):
+        results[key]["peak_memory"] = measure_memory(strategies[key][1])
+    results["multiprocess"]["workers"] = workers
+
+    baseline = results["object_rebuild"]["hash_rate"]
+    if baseline:
+        print(f"\n字节修补加速: {results['byte_patching']['hash_rate'] / baseline:.1f}x")
+        print(f"midstate加速: {results['midstate']['hash_rate'] / baseline:.1f}x")
+        print(f"多进程加速: {results['multiprocess']['hash_rate'] / baseline:.1f}x")
+    print(f"\nPython堆峰值 ({MEMORY_SAMPLE_COUNT} 次):")
+    for key in ("object_rebuild", "byte_patching", "midstate"):
+        print(f"  {strategies[key][0]:<16} {results[key]['peak_memory'] / 1024:>8.1f} KiB")
+    return results
+
+def run_solution_times(prefixes=SOLUTION_PREFIXES, trials=20):
+    """
+    用midstate方式测量不同前缀长度的出解时间分布
+
+    每次试验使用不同vout的合成交易，相当于独立的模板
+
+    Returns:
+        dict: 前缀 -> {"expected_hashes", "mean_hashes", "mean_time", "median_time", "p90_time", "max_time"}
+    """
+    print(f"\n=== 出解时间分布 (每个前缀 {trials} 次) ===")
+    results = {}
+    for prefix in prefixes:
+        bitwork = compile_bitwork(prefix)
+        times = []
+        hashes = []
+        for trial in range(trials):
+            template = TxidTemplate.from_transaction(build_bench_transaction(vout=trial)[0])
+            start = time.perf_counter()
+            _, hashed = scan_sequences(template, MAX_SEQUENCE, 0, bitwork)
+            times.append(time.perf_counter() - start)
+            hashes.append(hashed)
+
+        times.sort()
+        results[prefix] = {
+            "trials": trials,
+            "expected_hashes": bitwork.expected_hashes(),
+            "mean_hashes": statistics.mean(hashes),
+            "mean_time": statistics.mean(times),
+            "median_time": statistics.median(times),
+            "p90_time": times[int(len(times) * 0.9) - 1] if len(times) >= 10 else times[-1],
+            "max_time": times[-1]
+        }
+        r = results[prefix]
+        print(f"  {prefix:<6} 期望 {r['expected_hashes']:>9.0f} 次, 实际平均 {r['mean_hashes']:>11.0f} 次, "
+              f"中位 {r['median_time']:.3f}s, p90 {r['p90_time']:.3f}s, 最长 {r['max_time']:.3f}s")
+    return results
+
+def compare_results(baseline_path, current):
+    """和旧结果对比各方式的hash/s，变化超过10%时标出"""
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+
+    print(f"\n=== 与 {baseline_path} 对比 ===")
+    for key, result in current["strategies"].items():
+        old = baseline.get("strategies", {}).get(key)
+        if not old or not old["hash_rate"]:
+            continue
+        change = result["hash_rate"] / old["hash_rate"] - 1
+        mark = "⚠️" if change < -0.1 else ("✅" if change > 0.1 else "  ")
+        print(f"  {mark} {key:<16} {old['hash_rate']:>12.0f} -> {result['hash_rate']:>12.0f} hash/s ({change:+.1%})")
+
+def run_suite(count=100000, workers=0, trials=20, prefixes=SOLUTION_PREFIXES, output=None, baseline=None):
+    """
+    运行全部基准测试并写入JSON结果
+
+    Returns:
+        dict: 完整结果
+    """
+    results = {
+        "timestamp": int(time.time()),
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "count": count,
+        "strategies": run_benchmark(count, workers),
+        "solution_times": run_solution_times(prefixes, trials),
+    }
+    # Linux下ru_maxrss单位为KiB
+    results["max_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if output is None:
+        os.makedirs(PERSISTENCE_DIR, exist_ok=True)
+        output = os.path.join(PERSISTENCE_DIR, f"bench_mining_{results['timestamp']}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 基准测试结果已保存到 {output}")
+
+    if baseline:
+        compare_results(baseline, results)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="挖矿速度基准测试")
+    parser.add_argument("--count", type=int, default=100000, help="每种单进程方式的hash次数")
+    parser.add_argument("--workers", type=int, default=0, help="多进程方式的进程数，0表示全部CPU核心")
+    parser.add_argument("--trials", type=int, default=20, help="每个前缀的出解试验次数")
+    parser.add_argument("--prefixes", default=",".join(SOLUTION_PREFIXES), help="出解时间测试的前缀，逗号分隔")
+    parser.add_argument("--output", default=None, help="结果JSON路径")
+    parser.add_argument("--baseline", default=None, help="用于对比的旧结果JSON")
+    args = parser.parse_args()
+
+    run_suite(args.count, args.workers, args.trials, args.prefixes.split(","), args.output, args.baseline)
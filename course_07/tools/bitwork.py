@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Atomicals bitwork匹配工具
+用途: 把 "前缀" 或 "前缀.N" 形式的bitwork编译成直接比较txid原始摘要字节的匹配器，
+      挖矿时不再需要把每个候选摘要反转并转成hex字符串
+
+bitwork语法:
+    "000000"    txid以000000开头
+    "0000.10"   txid以0000开头，且紧随其后的第5个hex字符 >= a (10)
+"""
+
+import re
+
+_BITWORK_PATTERN = re.compile(r"^([0-9a-f]{1,64})(?:\.(\d{1,2}))?$")
+
+class Bitwork:
+    """
+    编译后的bitwork目标
+
+    txid是摘要字节反转后的hex，所以txid的第k个hex字符对应
+    digest[31 - k // 2] 的高4位 (k为偶数) 或低4位 (k为奇数)
+    """
+
+    def __init__(self, prefix, ext=0):
+        """
+        Args:
+            prefix: txid的hex前缀
+            ext: 前缀之后下一个hex字符的最小值 (0-15, 0表示不限制)
+        """
+        if not re.fullmatch(r"[0-9a-f]{1,64}", prefix):
+            raise ValueError(f"无效的bitwork前缀: {prefix}")
+        if not 0 <= ext <= 15:
+            raise ValueError(f"bitwork扩展值必须在0-15之间: {ext}")
+        if ext and len(prefix) >= 64:
+            raise ValueError("前缀已占满64个hex字符，不能再指定扩展值")
+
+        self.prefix = prefix
+        self.ext = ext
+
+        full_bytes = len(prefix) // 2
+        # 完整字节部分: 反转后正好是摘要的结尾
+        self.digest_tail = bytes.fromhex(prefix[:full_bytes * 2])[::-1]
+        # 奇数长度前缀的最后一个hex字符落在 digest[31 - full_bytes] 的高4位
+        self.odd_nibble = int(prefix[-1], 16) if len(prefix) % 2 else None
+        self.odd_index = 31 - full_bytes
+
+        # 扩展值检查的是第len(prefix)个hex字符
+        position = len(prefix)
+        self.ext_index = 31 - position // 2
+        self.ext_shift = 4 if position % 2 == 0 else 0
+
+    def matches_digest(self, digest):
+        """检查txid原始摘要 (内部字节序，未反转) 是否满足bitwork"""
+        if not digest.endswith(self.digest_tail):
+            return False
+        if self.odd_nibble is not None and digest[self.odd_index] >> 4 != self.odd_nibble:
+            return False
+        if self.ext and (digest[self.ext_index] >> self.ext_shift) & 0x0f < self.ext:
+            return False
+        return True
+
+    def matches_txid(self, txid):
+        """检查txid (区块浏览器显示的hex) 是否满足bitwork"""
+        txid = txid.lower()
+        if not txid.startswith(self.prefix):
+            return False
+        if self.ext and int(txid[len(self.prefix)], 16) < self.ext:
+            return False
+        return True
+
+    def expected_hashes(self):
+        """平均需要尝试的hash次数"""
+        return 16 ** len(self.prefix) * 16 / (16 - self.ext)
+
+    def to_string(self):
+        """返回bitwork的字符串形式 (写入payload的格式)"""
+        if self.ext:
+            return f"{self.prefix}.{self.ext}"
+        return self.prefix
+
+    def __repr__(self):
+        return f"Bitwork({self.to_string()!r})"
+
+def compile_bitwork(bitwork):
+    """
+    解析bitwork字符串
+
+    Args:
+        bitwork: "前缀" 或 "前缀.N" 字符串，已编译的Bitwork原样返回
+
+    Returns:
+        Bitwork: 编译后的匹配器
+    """
+    if isinstance(bitwork, Bitwork):
+        return bitwork
+
+    match = _BITWORK_PATTERN.match(str(bitwork).lower())
+    if not match:
+        raise ValueError(f"无效的bitwork: {bitwork}")
+
+    prefix, ext = match.groups()
+    return Bitwork(prefix, int(ext) if ext else 0)
+
+if __name__ == "__main__":
+    for text in ["000000", "6238", "0000.10", "abc.5"]:
+        bitwork = compile_bitwork(text)
+        print(f"{text:>10} -> 平均 {bitwork.expected_hashes():,.0f} 次hash")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+ARC-20 inscription临时地址推导工具
+用途: payload的time/nonce变化时，只重新计算变化的部分来得到新的临时地址
+
+一个临时地址的推导过程:
+    脚本   = <x-only公钥> OP_CHECKSIG OP_0 OP_IF "atom" "dmt" <payload> OP_ENDIF
+    叶子   = TaggedHash("TapLeaf", 0xc0 || 长度 || 脚本)
+    tweak  = TaggedHash("TapTweak", 内部公钥x || 叶子)     (只有一个叶子，merkle根就是叶子)
+    输出键 = P + tweak * G
+
+不变的部分只计算一次: 内部公钥点P、脚本中payload之前/之后的字节、
+两个tagged hash的SHA-256中间状态 (TapTweak的中间状态已包含内部公钥x)、
+以及G的倍点表 (tweak * G 只需要查表和最多64次点加法)
+"""
+
+import time
+import hashlib
+import binascii
+import cbor2
+from bitcoinutils.script import Script
+from bitcoinutils.keys import P2trAddress
+from bitcoinutils.schnorr import G, p as FIELD_P, lift_x
+
+from arc20_config import PROTOCOL_CONFIG, get_protocol_hex, get_op_type_hex
+
+LEAF_VERSION_TAPSCRIPT = 0xc0
+OP_ENDIF = b"\x68"
+
+# Atomicals客户端的nonce上限，超过后刷新time并把nonce归零
+MAX_PAYLOAD_NONCE = 9999999
+
+def build_mint_payload_hex(time_val, nonce):
+    """
+    生成mint payload的CBOR hex (commit和reveal必须使用同一个函数以保证脚本一致)
+
+    Args:
+        time_val: payload中的time字段
+        nonce: payload中的nonce字段
+    """
+    payload = {
+        "args": {
+            "time": time_val,
+            "nonce": nonce,
+            "bitworkc": PROTOCOL_CONFIG["bitworkc"],
+            "bitworkr": PROTOCOL_CONFIG["bitworkr"],
+            "mint_ticker": PROTOCOL_CONFIG["mint_ticker"]
+        }
+    }
+    return binascii.hexlify(cbor2.dumps(payload)).decode()
+
+def build_inscription_script(pubkey_xonly, payload_hex):
+    """构建inscription脚本对象"""
+    return Script([
+        pubkey_xonly,
+        "OP_CHECKSIG",
+        "OP_0",
+        "OP_IF",
+        get_protocol_hex(),      # "atom"
+        get_op_type_hex(),       # "dmt"
+        payload_hex,             # CBOR编码的payload
+        "OP_ENDIF"
+    ])
+
+def next_payload_params(time_val, nonce):
+    """
+    sequence空间耗尽后的下一组payload参数
+
+    Returns:
+        tuple: (time_val, nonce)
+    """
+    if nonce < MAX_PAYLOAD_NONCE:
+        return time_val, nonce + 1
+    return max(int(time.time()), time_val + 1), 0
+
+def _push_data(data):
+    """最小化的数据push编码 (与bitcoinutils Script的编码一致)"""
+    length = len(data)
+    if length < 0x4c:
+        return bytes([length]) + data
+    if length <= 0xff:
+        return b"\x4c" + bytes([length]) + data
+    return b"\x4d" + length.to_bytes(2, "little") + data
+
+def _compact_size(length):
+    if length < 0xfd:
+        return bytes([length])
+    return b"\xfd" + length.to_bytes(2, "little")
+
+def _point_add(P1, P2):
+    """secp256k1仿射坐标点加法 (None表示无穷远点)"""
+    if P1 is None:
+        return P2
+    if P2 is None:
+        return P1
+    if P1[0] == P2[0]:
+        if (P1[1] + P2[1]) % FIELD_P == 0:
+            return None
+        lam = 3 * P1[0] * P1[0] * pow(2 * P1[1], -1, FIELD_P) % FIELD_P
+    else:
+        lam = (P2[1] - P1[1]) * pow(P2[0] - P1[0], -1, FIELD_P) % FIELD_P
+    x3 = (lam * lam - P1[0] - P2[0]) % FIELD_P
+    return (x3, (lam * (P1[0] - x3) - P1[1]) % FIELD_P)
+
+# G的固定窗口预计算表: _G_TABLE[i][j] = j * 16^i * G，首次使用时生成
+_G_TABLE = None
+
+def _mul_generator(k):
+    """计算 k * G: 每4位查一次表，最多64次点加法"""
+    global _G_TABLE
+    if _G_TABLE is None:
+        table = []
+        base = G
+        for _ in range(64):
+            row = [None, base]
+            for _ in range(14):
+                row.append(_point_add(row[-1], base))
+            table.append(row)
+            base = _point_add(row[-1], base)
+        _G_TABLE = table
+
+    result = None
+    for i in range(64):
+        digit = (k >> (4 * i)) & 0x0f
+        if digit:
+            result = _point_add(result, _G_TABLE[i][digit])
+    return result
+
+def _tag_state(tag):
+    """返回已经吸收了 SHA256(tag) || SHA256(tag) 的hash状态"""
+    tag_hash = hashlib.sha256(tag.encode()).digest()
+    return hashlib.sha256(tag_hash + tag_hash)
+
+class InscriptionAddressDeriver:
+    """缓存不变部分的临时地址推导器"""
+
+    def __init__(self, public_key):
+        """
+        Args:
+            public_key: 主地址的PublicKey对象 (内部公钥)
+        """
+        self.pubkey_xonly = public_key.to_x_only_hex()
+        internal_x = bytes.fromhex(self.pubkey_xonly)
+
+        # 内部公钥点 (BIP340: 取偶数y)
+        self.internal_point = lift_x(int.from_bytes(internal_x, "big"))
+
+        # 脚本中payload之前和之后的字节
+        self.script_prefix = (
+            _push_data(internal_x)
+            + b"\xac"            # OP_CHECKSIG
+            + b"\x00"            # OP_0
+            + b"\x63"            # OP_IF
+            + _push_data(bytes.fromhex(get_protocol_hex()))
+            + _push_data(bytes.fromhex(get_op_type_hex()))
+        )
+        self.script_suffix = OP_ENDIF
+
+        # tagged hash中间状态
+        self.tapleaf_state = _tag_state("TapLeaf")
+        self.taptweak_state = _tag_state("TapTweak")
+        self.taptweak_state.update(internal_x)
+
+    def derive(self, time_val, nonce):
+        """
+        推导指定time/nonce对应的临时地址
+
+        Returns:
+            dict: {"time", "nonce", "payload_hex", "script_bytes", "output_key", "is_odd", "script_pubkey"}
+        """
+        payload_hex = build_mint_payload_hex(time_val, nonce)
+        script_bytes = self.script_prefix + _push_data(bytes.fromhex(payload_hex)) + self.script_suffix
+
+        leaf_state = self.tapleaf_state.copy()
+        leaf_state.update(bytes([LEAF_VERSION_TAPSCRIPT]) + _compact_size(len(script_bytes)) + script_bytes)
+        leaf_hash = leaf_state.digest()
+
+        tweak_state = self.taptweak_state.copy()
+        tweak_state.update(leaf_hash)
+        tweak = int.from_bytes(tweak_state.digest(), "big")
+
+        output_point = _point_add(self.internal_point, _mul_generator(tweak))
+        output_key = output_point[0].to_bytes(32, "big")
+
+        return {
+            "time": time_val,
+            "nonce": nonce,
+            "payload_hex": payload_hex,
+            "script_bytes": script_bytes,
+            "output_key": output_key,
+            "is_odd": output_point[1] % 2 == 1,
+            # OP_1 <32字节输出键>
+            "script_pubkey": b"\x51\x20" + output_key
+        }
+
+    def to_objects(self, derived):
+        """
+        把derive()的结果转换成bitcoinutils对象
+
+        Returns:
+            tuple: (temp_address, inscription_script)
+        """
+        inscription_script = build_inscription_script(self.pubkey_xonly, derived["payload_hex"])
+        temp_address = P2trAddress(witness_program=derived["output_key"].hex(), is_odd=derived["is_odd"])
+        return temp_address, inscription_script
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+挖矿断点续传工具
+用途: 定期把已搜索的sequence区间 (按worker记录) 和payload参数写入persistence目录，
+      进程被杀或机器被抢占后重新运行时跳过已经搜索过的区间
+
+检查点文件格式:
+{
+  "job_id": "...",              # 任务标识 (UTXO、金额、公钥、bitwork等的hash)
+  "job": {...},                 # 任务参数原文，便于人工检查
+  "payload": {"time": 1751340382, "nonce": 3},
+  "workers": {"0": [[4294967295, 4294901760], ...]},   # 每个worker已搜索的 [high, low] 区间
+  "updated_at": 1751340999
+}
+"""
+
+import os
+import json
+import time
+import hashlib
+
+PERSISTENCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "persistence")
+
+def checkpoint_path(kind):
+    """检查点文件路径，kind为任务名，如 "commit"、"reveal"、"batch_commit_3" """
+    return os.path.join(PERSISTENCE_DIR, f"mining_checkpoint_{kind}.json")
+
+def make_job_id(job):
+    """根据任务参数计算任务标识，参数变化后旧检查点自动失效"""
+    encoded = json.dumps(job, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+def merge_ranges(ranges):
+    """
+    合并重叠或相邻的 [high, low] 区间
+
+    Returns:
+        list: 按high从大到小排列的不重叠区间
+    """
+    merged = []
+    for high, low in sorted(ranges, key=lambda r: r[0], reverse=True):
+        if merged and high >= merged[-1][1] - 1:
+            merged[-1][1] = min(merged[-1][1], low)
+        else:
+            merged.append([high, low])
+    return merged
+
+class MiningCheckpoint:
+    """单个挖矿任务的检查点"""
+
+    def __init__(self, path, job, interval=30):
+        """
+        Args:
+            path: 检查点文件路径
+            job: 任务参数dict (用于生成job_id)
+            interval: 两次自动保存之间的最小间隔 (秒)
+        """
+        self.path = path
+        self.job = job
+        self.job_id = make_job_id(job)
+        self.interval = interval
+        self.payload = None
+        self.workers = {}
+        self.last_save = time.time()
+
+    @classmethod
+    def load_or_create(cls, path, job, interval=30):
+        """读取已有检查点；文件不存在或任务参数不同时创建新检查点"""
+        checkpoint = cls(path, job, interval)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return checkpoint
+
+        if data.get("job_id") != checkpoint.job_id:
+            print(f"⚠️ 检查点 {path} 属于其他任务，忽略")
+            return checkpoint
+
+        checkpoint.payload = data.get("payload")
+        checkpoint.workers = {
+            worker: [list(r) for r in ranges]
+            for worker, ranges in data.get("workers", {}).items()
+        }
+        covered = sum(high - low + 1 for high, low in checkpoint.covered_ranges())
+        print(f"📂 从检查点恢复: payload={checkpoint.payload}, 已搜索 {covered} 个sequence")
+        return checkpoint
+
+    def set_payload(self, time_val, nonce):
+        """切换到新的payload参数，新payload的sequence空间从头开始"""
+        payload = {"time": time_val, "nonce": nonce}
+        if payload != self.payload:
+            self.payload = payload
+            self.workers = {}
+            self.save()
+
+    def record(self, worker, high, low):
+        """记录某个worker已搜索完的 [high, low] 区间，按间隔自动保存"""
+        ranges = self.workers.setdefault(str(worker), [])
+        ranges.append([high, low])
+        self.workers[str(worker)] = merge_ranges(ranges)
+        if time.time() - self.last_save >= self.interval:
+            self.save()
+
+    def covered_ranges(self):
+        """所有worker已搜索区间的并集"""
+        all_ranges = []
+        for ranges in self.workers.values():
+            all_ranges.extend(ranges)
+        return merge_ranges(all_ranges)
+
+    def remaining_ranges(self, start, end):
+        """
+        [end, start] 中还没有搜索过的区间
+
+        Returns:
+            list: 按high从大到小排列的 (high, low) 区间
+        """
+        remaining = []
+        high = start
+        for covered_high, covered_low in self.covered_ranges():
+            if covered_low > high or covered_high < end:
+                continue
+            if covered_high < high:
+                remaining.append((high, max(covered_high + 1, end)))
+            high = covered_low - 1
+            if high < end:
+                break
+        if high >= end:
+            remaining.append((high, end))
+        return remaining
+
+    def save(self):
+        """原子写入检查点文件"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            "job_id": self.job_id,
+            "job": self.job,
+            "payload": self.payload,
+            "workers": self.workers,
+            "updated_at": int(time.time())
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self.last_save = time.time()
+
+    def clear(self):
+        """挖矿成功后删除检查点"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+bitwork挖矿引擎
+用途: 把交易的非witness部分只序列化一次，挖矿时只覆盖sequence的4个字节，
+      并复用sequence之前固定前缀的SHA-256中间状态(midstate)来计算txid
+"""
+
+import struct
+import hashlib
+from bitcoinutils.utils import encode_varint
+from bitwork import compile_bitwork
+from mining_telemetry import create_telemetry
+
+MAX_SEQUENCE = 0xffffffff
+
+_pack_sequence = struct.Struct("<I").pack
+
+class TxidTemplate:
+    """
+    txid挖矿模板
+
+    txid = SHA256(SHA256(非witness序列化))，挖矿时只有某个输入的sequence在变化，
+    所以把序列化结果拆成 前缀 + sequence + 后缀 三段:
+    - 前缀的SHA-256状态只计算一次，每个候选只需copy()
+    - 后缀是不变的字节串
+    """
+
+    def __init__(self, raw_tx, sequence_offset):
+        """
+        Args:
+            raw_tx: 交易的非witness序列化字节
+            sequence_offset: 被挖矿输入的sequence在raw_tx中的字节偏移
+        """
+        self.raw_tx = bytearray(raw_tx)
+        self.sequence_offset = sequence_offset
+        self.prefix_state = hashlib.sha256(bytes(raw_tx[:sequence_offset]))
+        self.suffix = bytes(raw_tx[sequence_offset + 4:])
+
+    @classmethod
+    def from_transaction(cls, tx, input_index=0):
+        """
+        从bitcoinutils的Transaction创建模板
+
+        Args:
+            tx: Transaction对象 (不需要签名)
+            input_index: 用sequence挖矿的输入索引
+        """
+        raw_tx = tx.to_bytes(False)
+        offset = 4 + len(encode_varint(len(tx.inputs)))
+        for txin in tx.inputs[:input_index + 1]:
+            offset += len(txin.to_bytes())
+        offset -= 4
+
+        if raw_tx[offset:offset + 4] != tx.inputs[input_index].sequence:
+            raise ValueError("无法定位sequence字段")
+
+        return cls(raw_tx, offset)
+
+    def serialize(self, sequence):
+        """把sequence写入缓冲区并返回完整的非witness序列化 (字节修补方式)"""
+        self.raw_tx[self.sequence_offset:self.sequence_offset + 4] = _pack_sequence(sequence)
+        return bytes(self.raw_tx)
+
+    def digest(self, sequence):
+        """返回sequence对应的txid原始摘要 (内部字节序，未反转)"""
+        state = self.prefix_state.copy()
+        state.update(_pack_sequence(sequence) + self.suffix)
+        return hashlib.sha256(state.digest()).digest()
+
+    def txid(self, sequence):
+        """返回sequence对应的txid (区块浏览器显示的反转hex)"""
+        return self.digest(sequence)[::-1].hex()
+
+def scan_sequences(template, high, low, bitwork):
+    """
+    在 [low, high] 区间内从high向low递减搜索满足bitwork的sequence
+
+    Args:
+        template: TxidTemplate
+        high: 起始sequence (包含)
+        low: 结束sequence (包含)
+        bitwork: 编译后的Bitwork
+
+    Returns:
+        tuple: (命中的sequence或None, 本次实际计算的hash数)
+    """
+    # 热循环里只用局部变量，先用bytes.endswith快速排除，再做完整的半字节检查
+    copy_state = template.prefix_state.copy
+    suffix = template.suffix
+    sha256 = hashlib.sha256
+    pack = _pack_sequence
+    tail = bitwork.digest_tail
+    matches = bitwork.matches_digest
+
+    for sequence in range(high, low - 1, -1):
+        state = copy_state()
+        state.update(pack(sequence) + suffix)
+        digest = sha256(state.digest()).digest()
+        if digest.endswith(tail) and matches(digest):
+            return sequence, high - sequence + 1
+    return None, high - low + 1
+
+def scan_sequences_patching(template, high, low, bitwork):
+    """
+    只做字节修补、不复用midstate的搜索 (用于基准对比)
+
+    Returns:
+        tuple: (命中的sequence或None, 本次实际计算的hash数)
+    """
+    raw_tx = template.raw_tx
+    offset = template.sequence_offset
+    end = offset + 4
+    sha256 = hashlib.sha256
+    pack = _pack_sequence
+    tail = bitwork.digest_tail
+    matches = bitwork.matches_digest
+
+    for sequence in range(high, low - 1, -1):
+        raw_tx[offset:end] = pack(sequence)
+        digest = sha256(sha256(raw_tx).digest()).digest()
+        if digest.endswith(tail) and matches(digest):
+            return sequence, high - sequence + 1
+    return None, high - low + 1
+
+def mine_sequence(template, bitwork, start=MAX_SEQUENCE, end=0, progress_interval=10000, checkpoint=None,
+                  telemetry=None):
+    """
+    单核挖矿: 从start递减到end搜索满足bitwork的sequence
+
+    Args:
+        template: TxidTemplate
+        bitwork: bitwork字符串 ("前缀" 或 "前缀.N") 或编译后的Bitwork
+        start: 起始sequence (包含)
+        end: 结束sequence (包含)
+        progress_interval: 每个搜索区间的sequence数量 (每个区间结束时更新计数和检查点)
+        checkpoint: 可选的MiningCheckpoint，跳过已搜索区间并记录新搜索的区间
+        telemetry: 可选的MiningTelemetry (由调用方启动)，默认创建一个只用于本次搜索的
+
+    Returns:
+        int: 命中的sequence，未找到返回None
+    """
+    bitwork = compile_bitwork(bitwork)
+    ranges = checkpoint.remaining_ranges(start, end) if checkpoint else [(start, end)]
+
+    own_telemetry = telemetry is None
+    if own_telemetry:
+        telemetry = create_telemetry(bitwork, "mining").start()
+    try:
+        for range_high, range_low in ranges:
+            high = range_high
+            while high >= range_low:
+                low = max(high - progress_interval + 1, range_low)
+                sequence, hashed = scan_sequences(template, high, low, bitwork)
+                telemetry.add(hashed)
+                if sequence is not None:
+                    return sequence
+                if checkpoint:
+                    checkpoint.record(0, high, low)
+                high = low - 1
+    finally:
+        if checkpoint:
+            checkpoint.save()
+        if own_telemetry:
+            telemetry.stop()
+    return None
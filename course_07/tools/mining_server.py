@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+分布式bitwork挖矿协调服务
+用途: 在局域网内把commit交易的 (time, nonce, sequence区间) 工作单元通过HTTP分发给
+      多台机器上的mining_worker.py，收集并验证解，汇总全部worker的hash速率
+
+协议 (JSON over HTTP，只使用标准库):
+    POST /work    {"worker": "host-1"}  -> 工作单元 或 {"done": true}
+    POST /result  {"worker", "unit_id", "sequence", "hashes"} -> {"accepted": bool, "done": bool}
+    GET  /status  -> 进度和速率统计
+
+工作单元只包含挖矿内核需要的数据 (非witness交易字节、sequence偏移、区间、bitwork)，
+worker不需要私钥、UTXO接口或本地的ARC-20配置
+"""
+
+import json
+import time
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from bitwork import compile_bitwork
+from mining_engine import MAX_SEQUENCE
+from inscription_address import next_payload_params
+from mining_telemetry import create_telemetry
+
+DEFAULT_UNIT_SIZE = 1 << 22
+DEFAULT_LEASE_TIMEOUT = 300
+
+def _is_int(value):
+    """JSON中的整数 (bool不算)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+class MiningCoordinator:
+    """
+    工作单元分配器
+
+    按 payload(time, nonce) -> sequence区间 的顺序生成工作单元；
+    超过租期没有回报的单元会重新分配给其他worker
+    """
+
+    def __init__(self, template_factory, bitwork, time_val, nonce=0,
+                 unit_size=DEFAULT_UNIT_SIZE, min_sequence=0, lease_timeout=DEFAULT_LEASE_TIMEOUT,
+                 telemetry=None):
+        """
+        Args:
+            template_factory: 函数 (time_val, nonce) -> TxidTemplate
+            bitwork: bitwork字符串或编译后的Bitwork
+            time_val: 起始payload time
+            nonce: 起始payload nonce
+            unit_size: 每个工作单元的sequence数量
+            min_sequence: 每个payload搜索的最小sequence
+            lease_timeout: 工作单元租期 (秒)
+            telemetry: 可选的MiningTelemetry，默认创建只打印进度的，由wait_for_solution启动
+        """
+        self.template_factory = template_factory
+        self.bitwork = compile_bitwork(bitwork)
+        self.unit_size = unit_size
+        self.min_sequence = min_sequence
+        self.lease_timeout = lease_timeout
+
+        self.lock = threading.Lock()
+        self.done_event = threading.Event()
+        self.templates = {}
+        self.outstanding = {}
+        # 分配过、还没有回报的工作单元 (unit_id -> 单元)，租期过期后迟到的解也能验证
+        self.units = {}
+        self.reissue = deque()
+        self.next_unit_id = 0
+        self.cursor = (time_val, nonce, MAX_SEQUENCE)
+
+        self.solution = None
+        self.start_time = time.time()
+        self.total_hashes = 0
+        self.worker_stats = {}
+        self.telemetry = telemetry or create_telemetry(self.bitwork, "distributed")
+        self.telemetry.set_status(nonce=nonce, workers=0)
+
+    def _template(self, time_val, nonce):
+        key = (time_val, nonce)
+        if key not in self.templates:
+            self.templates[key] = self.template_factory(time_val, nonce)
+        return self.templates[key]
+
+    def _new_unit(self):
+        """按游标生成下一个工作单元，当前payload的sequence空间用完后滚动nonce/time"""
+        time_val, nonce, high = self.cursor
+        if high < self.min_sequence:
+            time_val, nonce = next_payload_params(time_val, nonce)
+            high = MAX_SEQUENCE
+            self.telemetry.set_status(nonce=nonce)
+        low = max(high - self.unit_size + 1, self.min_sequence)
+        self.cursor = (time_val, nonce, low - 1)
+
+        template = self._template(time_val, nonce)
+        unit = {
+            "unit_id": self.next_unit_id,
+            "time": time_val,
+            "nonce": nonce,
+            "raw_tx": bytes(template.raw_tx).hex(),
+            "sequence_offset": template.sequence_offset,
+            "high": high,
+            "low": low,
+            "bitwork": self.bitwork.to_string()
+        }
+        self.units[unit["unit_id"]] = unit
+        self.next_unit_id += 1
+        return unit
+
+    def _copy_unit(self, unit):
+        """相同区间的工作单元，使用新的unit_id"""
+        copy = dict(unit, unit_id=self.next_unit_id)
+        self.units[copy["unit_id"]] = copy
+        self.next_unit_id += 1
+        return copy
+
+    def next_unit(self, worker):
+        """
+        给worker分配一个工作单元
+
+        Returns:
+            dict: 工作单元，已找到解时返回None
+        """
+        with self.lock:
+            if self.solution:
+                return None
+
+            now = time.time()
+            for unit_id, (unit, issued_at, _) in list(self.outstanding.items()):
+                if now - issued_at > self.lease_timeout:
+                    del self.outstanding[unit_id]
+                    # 重新分配的单元使用新id，原worker迟到的回报不会结束新worker的租期
+                    self.reissue.append(self._copy_unit(unit))
+
+            unit = self.reissue.popleft() if self.reissue else self._new_unit()
+            self.outstanding[unit["unit_id"]] = (unit, now, worker)
+            self.worker_stats.setdefault(worker, {"hashes": 0, "units": 0, "first_seen": now, "last_seen": now})
+            self.telemetry.set_status(workers=len(self.worker_stats))
+            return unit
+
+    def submit_result(self, worker, unit_id, sequence, hashes):
+        """
+        接收worker的结果；声称找到的解会在这里重新计算txid验证
+
+        Returns:
+            bool: 结果是否被接受
+        """
+        with self.lock:
+            # 租期过期的单元不在outstanding中，但worker仍可能已经算完；它的解照常验证
+            unit = self.units.get(unit_id)
+            if unit is None or not _is_int(hashes) or not (sequence is None or _is_int(sequence)):
+                return False
+            # 回报过的单元从units中移除，同一单元重复回报不会重复计数
+            self.outstanding.pop(unit_id, None)
+            del self.units[unit_id]
+
+            now = time.time()
+            stats = self.worker_stats.setdefault(worker, {"hashes": 0, "units": 0, "first_seen": now})
+            stats["hashes"] += hashes
+            stats["units"] += 1
+            stats["last_seen"] = now
+            self.total_hashes += hashes
+            self.telemetry.add(hashes)
+
+            if sequence is None:
+                return True
+
+            template = self._template(unit["time"], unit["nonce"])
+            if not unit["low"] <= sequence <= unit["high"] or not self.bitwork.matches_digest(template.digest(sequence)):
+                # 这个worker的结果不可信，区间重新分配，不会漏搜
+                print(f"⚠️ worker {worker} 提交的解无效: sequence={sequence}")
+                self.reissue.append(self._copy_unit(unit))
+                return False
+
+            if not self.solution:
+                self.solution = {
+                    "time": unit["time"],
+                    "nonce": unit["nonce"],
+                    "sequence": sequence,
+                    "txid": template.txid(sequence),
+                    "worker": worker
+                }
+                self.done_event.set()
+            return True
+
+    def status(self):
+        """进度和汇总速率"""
+        with self.lock:
+            elapsed = time.time() - self.start_time
+            time_val, nonce, high = self.cursor
+            return {
+                "bitwork": self.bitwork.to_string(),
+                "payload": {"time": time_val, "nonce": nonce},
+                "next_sequence": high,
+                "total_hashes": self.total_hashes,
+                "elapsed": elapsed,
+                "hash_rate": self.total_hashes / elapsed if elapsed > 0 else 0,
+                "outstanding_units": len(self.outstanding),
+                "workers": {
+                    worker: {
+                        "hashes": stats["hashes"],
+                        "units": stats["units"],
+                        "hash_rate": stats["hashes"] / max(stats["last_seen"] - stats["first_seen"], 1e-9)
+                    }
+                    for worker, stats in self.worker_stats.items()
+                },
+                "solution": self.solution
+            }
+
+class _CoordinatorHandler(BaseHTTPRequestHandler):
+    """把HTTP请求转给MiningCoordinator"""
+
+    coordinator = None
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._send_json(self.coordinator.status())
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        try:
+            request = self._read_json()
+        except ValueError:
+            self._send_json({"error": "invalid json"}, 400)
+            return
+
+        if not isinstance(request, dict):
+            self._send_json({"error": "request body must be a json object"}, 400)
+            return
+
+        worker = str(request.get("worker", self.client_address[0]))
+        if self.path == "/work":
+            unit = self.coordinator.next_unit(worker)
+            self._send_json(unit if unit else {"done": True})
+        elif self.path == "/result":
+            unit_id, sequence, hashes = request.get("unit_id"), request.get("sequence"), request.get("hashes", 0)
+            if not _is_int(unit_id) or not (sequence is None or _is_int(sequence)) or not _is_int(hashes) or hashes < 0:
+                self._send_json({"error": "unit_id and hashes must be integers, sequence an integer or null"}, 400)
+                return
+            accepted = self.coordinator.submit_result(worker, unit_id, sequence, hashes)
+            self._send_json({"accepted": accepted, "done": self.coordinator.done_event.is_set()})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def log_message(self, format, *args):
+        # 关闭默认的逐请求日志
+        pass
+
+def start_server(coordinator, host="0.0.0.0", port=8765):
+    """
+    在后台线程启动协调服务
+
+    Returns:
+        ThreadingHTTPServer: 调用shutdown()停止
+    """
+    handler = type("CoordinatorHandler", (_CoordinatorHandler,), {"coordinator": coordinator})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"挖矿协调服务已启动: http://{host}:{server.server_address[1]}")
+    return server
+
+def wait_for_solution(coordinator, timeout=None):
+    """
+    阻塞等待任一worker找到解，汇总速率由coordinator.telemetry的后台线程定期报告
+
+    Returns:
+        dict: {"time", "nonce", "sequence", "txid", "worker"}，超时返回None
+    """
+    coordinator.telemetry.start()
+    try:
+        coordinator.done_event.wait(timeout)
+    finally:
+        coordinator.telemetry.stop()
+
+    for worker, stats in coordinator.status()["workers"].items():
+        print(f"  {worker}: {stats['hashes']} 次, {stats['units']} 个单元, {stats['hash_rate']:.0f} hash/s")
+    return coordinator.solution
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+挖矿遥测工具
+用途: 挖矿循环每搜索完一个区间只调用一次 add() 累加计数，
+      由后台线程定期读取计数，计算EWMA hash速率和按难度估算的剩余时间，
+      打印进度并可选写入Prometheus textfile或JSON lines文件
+
+Prometheus textfile可以交给node_exporter的textfile collector采集:
+    MINING_CONFIG["telemetry_prometheus"] = "/var/lib/node_exporter/textfile/mining.prom"
+"""
+
+import os
+import json
+import time
+import threading
+
+from bitwork import compile_bitwork
+
+def format_duration(seconds):
+    """把秒数格式化为 1h02m03s 形式"""
+    if seconds is None:
+        return "未知"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m{seconds:02d}s"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+class MiningTelemetry:
+    """
+    挖矿计数器和后台报告线程
+
+    计数器只由挖矿线程写入 (add)，报告线程只读取，热循环中没有锁和时间调用
+    """
+
+    def __init__(self, bitwork, label="mining", interval=5, alpha=0.3,
+                 prometheus_path=None, jsonl_path=None, quiet=False):
+        """
+        Args:
+            bitwork: bitwork字符串或编译后的Bitwork (用于估算剩余时间)
+            label: 任务名 (commit / reveal / ...)，用于输出和Prometheus标签
+            interval: 报告间隔 (秒)
+            alpha: EWMA平滑系数，越大越接近瞬时速率
+            prometheus_path: 可选，Prometheus textfile路径
+            jsonl_path: 可选，JSON lines文件路径 (每次报告追加一行)
+            quiet: 为True时不打印进度，只写文件
+        """
+        self.bitwork = compile_bitwork(bitwork)
+        self.label = label
+        self.interval = interval
+        self.alpha = alpha
+        self.prometheus_path = prometheus_path
+        self.jsonl_path = jsonl_path
+        self.quiet = quiet
+
+        self.hashes = 0
+        self.status = {}
+        self.ewma_rate = None
+        self.start_time = None
+        self._last_hashes = 0
+        self._last_time = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add(self, hashes):
+        """累加已计算的hash数 (挖矿循环中唯一的遥测调用)"""
+        self.hashes += hashes
+
+    def set_status(self, **fields):
+        """附加到报告中的状态字段，如当前payload nonce"""
+        self.status.update(fields)
+
+    def start(self):
+        """启动后台报告线程"""
+        self.start_time = self._last_time = time.time()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止报告线程并输出最终统计"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        return self.report(final=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.report()
+
+    def snapshot(self):
+        """
+        读取计数器并更新EWMA速率
+
+        Returns:
+            dict: {"label", "hashes", "elapsed", "hash_rate", "ewma_rate", "expected_hashes", "progress", "eta", ...status}
+        """
+        now = time.time()
+        hashes = self.hashes
+        elapsed = now - self.start_time
+        window = now - self._last_time
+        if window > 0:
+            rate = (hashes - self._last_hashes) / window
+            if self.ewma_rate is None:
+                self.ewma_rate = rate
+            else:
+                self.ewma_rate = self.alpha * rate + (1 - self.alpha) * self.ewma_rate
+        self._last_hashes = hashes
+        self._last_time = now
+
+        # 每次hash独立命中，剩余期望次数始终是expected_hashes；progress只表示已付出的期望工作量比例
+        expected = self.bitwork.expected_hashes()
+        ewma_rate = self.ewma_rate or 0
+        return {
+            "label": self.label,
+            "timestamp": int(now),
+            "hashes": hashes,
+            "elapsed": elapsed,
+            "hash_rate": hashes / elapsed if elapsed > 0 else 0,
+            "ewma_rate": ewma_rate,
+            "expected_hashes": expected,
+            "progress": hashes / expected,
+            "eta": expected / ewma_rate if ewma_rate > 0 else None,
+            **self.status
+        }
+
+    def report(self, final=False):
+        """输出一次报告"""
+        data = self.snapshot()
+        if not self.quiet:
+            status = "".join(f", {key}={value}" for key, value in self.status.items())
+            if final:
+                print(f"[{self.label}] 挖矿结束: 共 {data['hashes']} 次, 耗时 {data['elapsed']:.2f}s, "
+                      f"平均速率 {data['hash_rate']:.0f} hash/s{status}")
+            else:
+                print(f"[{self.label}] 已尝试 {data['hashes']} 次, 耗时 {data['elapsed']:.1f}s, "
+                      f"速率 {data['ewma_rate']:.0f} hash/s, 期望工作量 {data['progress']:.0%}, "
+                      f"预计剩余 {format_duration(data['eta'])}{status}")
+        if self.jsonl_path:
+            self._write_jsonl(data, final)
+        if self.prometheus_path:
+            self._write_prometheus(data)
+        return data
+
+    def _write_jsonl(self, data, final):
+        with open(self.jsonl_path, "a") as f:
+            f.write(json.dumps({**data, "final": final}) + "\n")
+
+    def _write_prometheus(self, data):
+        """原子写入Prometheus textfile"""
+        label = f'job="{self.label}",bitwork="{self.bitwork.to_string()}"'
+        lines = [
+            "# HELP mining_hashes_total 已计算的hash次数",
+            "# TYPE mining_hashes_total counter",
+            f"mining_hashes_total{{{label}}} {data['hashes']}",
+            "# HELP mining_hash_rate EWMA hash速率 (hash/s)",
+            "# TYPE mining_hash_rate gauge",
+            f"mining_hash_rate{{{label}}} {data['ewma_rate']:.1f}",
+            "# HELP mining_expected_hashes 按难度估算的平均hash次数",
+            "# TYPE mining_expected_hashes gauge",
+            f"mining_expected_hashes{{{label}}} {data['expected_hashes']:.0f}",
+            "# HELP mining_eta_seconds 按EWMA速率估算的剩余时间",
+            "# TYPE mining_eta_seconds gauge",
+            f"mining_eta_seconds{{{label}}} {data['eta'] if data['eta'] is not None else 'NaN'}",
+        ]
+        tmp_path = self.prometheus_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.prometheus_path)
+
+def create_telemetry(bitwork, label, config=None):
+    """
+    按配置创建遥测对象 (未启动)
+
+    Args:
+        bitwork: bitwork字符串或编译后的Bitwork
+        label: 任务名
+        config: 含report_interval、telemetry_prometheus、telemetry_jsonl的配置 (如arc20_config.MINING_CONFIG)，
+                为None时每5秒打印进度、不写文件。这里不导入arc20_config，局域网worker不需要钱包配置
+    """
+    config = config or {}
+    return MiningTelemetry(
+        bitwork,
+        label=label,
+        interval=config.get("report_interval", 5),
+        prometheus_path=config.get("telemetry_prometheus") or None,
+        jsonl_path=config.get("telemetry_jsonl") or None
+    )
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+分布式bitwork挖矿worker
+用途: 从mining_server.py的协调服务领取工作单元，用与mine_commit_address相同的
+      scan_sequences内核计算，再把结果和hash数回报给协调服务
+
+用法 (在局域网内任意一台机器上运行，每台机器可以开多个进程):
+    python mining_worker.py http://192.168.1.10:8765 --processes 4
+"""
+
+import time
+import socket
+import argparse
+import multiprocessing
+import requests
+
+from bitwork import compile_bitwork
+from mining_engine import TxidTemplate, scan_sequences
+from parallel_miner import resolve_worker_count
+
+def _post(url, data, timeout=30):
+    resp = requests.post(url, json=data, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+def _submit_result(server_url, result, retry_interval, max_retries):
+    """
+    回报一个单元的结果，连接失败时重试 (找到的解不能丢)
+
+    Returns:
+        dict: 协调服务的回复，全部重试失败时为None
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return _post(f"{server_url}/result", result)
+        except requests.RequestException as e:
+            print(f"⚠️ [{result['worker']}] 结果回报失败 ({attempt + 1}/{max_retries + 1}): {e}")
+            if attempt < max_retries:
+                time.sleep(retry_interval)
+    return None
+
+def run_worker(server_url, worker_name, retry_interval=5, max_retries=3):
+    """
+    循环领取并计算工作单元，直到协调服务报告已找到解或连续连接失败
+
+    Args:
+        server_url: 协调服务地址，如 http://127.0.0.1:8765
+        worker_name: worker名 (协调服务按名字统计速率)
+        retry_interval: 连接失败后的重试间隔 (秒)
+        max_retries: 连续失败多少次后退出
+    """
+    server_url = server_url.rstrip("/")
+    bitworks = {}
+    failures = 0
+    total_hashes = 0
+    start_time = time.time()
+
+    while True:
+        try:
+            unit = _post(f"{server_url}/work", {"worker": worker_name})
+        except requests.RequestException as e:
+            failures += 1
+            if failures > max_retries:
+                print(f"❌ [{worker_name}] 无法连接协调服务: {e}")
+                return
+            time.sleep(retry_interval)
+            continue
+        failures = 0
+
+        if unit.get("done"):
+            print(f"✅ [{worker_name}] 协调服务已找到解，退出")
+            return
+
+        if unit["bitwork"] not in bitworks:
+            bitworks[unit["bitwork"]] = compile_bitwork(unit["bitwork"])
+        template = TxidTemplate(bytes.fromhex(unit["raw_tx"]), unit["sequence_offset"])
+        sequence, hashed = scan_sequences(template, unit["high"], unit["low"], bitworks[unit["bitwork"]])
+        total_hashes += hashed
+
+        elapsed = time.time() - start_time
+        rate = total_hashes / elapsed if elapsed > 0 else 0
+        if sequence is not None:
+            print(f"🎯 [{worker_name}] 找到解: nonce={unit['nonce']}, sequence={sequence}, txid={template.txid(sequence)}")
+        else:
+            print(f"[{worker_name}] 单元 {unit['unit_id']} 完成 (nonce={unit['nonce']}), 本机速率 {rate:.0f} hash/s")
+
+        result = {
+            "worker": worker_name,
+            "unit_id": unit["unit_id"],
+            "sequence": sequence,
+            "hashes": hashed
+        }
+        reply = _submit_result(server_url, result, retry_interval, max_retries)
+        if reply is None:
+            if sequence is not None:
+                print(f"❌ [{worker_name}] 解没有回报给协调服务，请手动记录: time={unit['time']}, nonce={unit['nonce']}, "
+                      f"sequence={sequence}, txid={template.txid(sequence)}")
+            continue
+
+        if reply.get("done"):
+            print(f"✅ [{worker_name}] 协调服务已找到解，退出")
+            return
+
+def run_workers(server_url, processes=0, name=None):
+    """
+    在本机启动多个worker进程
+
+    Args:
+        server_url: 协调服务地址
+        processes: 进程数，0表示全部CPU核心
+        name: worker名前缀，默认主机名
+    """
+    processes = resolve_worker_count(processes)
+    name = name or socket.gethostname()
+    print(f"启动 {processes} 个worker进程, 协调服务: {server_url}")
+
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(server_url, f"{name}-{i}"))
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分布式bitwork挖矿worker")
+    parser.add_argument("server_url", help="协调服务地址，如 http://192.168.1.10:8765")
+    parser.add_argument("--processes", type=int, default=0, help="worker进程数，0表示全部CPU核心")
+    parser.add_argument("--name", default=None, help="worker名前缀，默认主机名")
+    args = parser.parse_args()
+
+    run_workers(args.server_url, args.processes, args.name)
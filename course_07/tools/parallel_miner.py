@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+多进程bitwork挖矿工具
+用途: 把commit交易的sequence空间切分给进程池并行搜索，任一进程命中后立即取消其余进程
+"""
+
+import os
+import time
+import multiprocessing
+from bitwork import compile_bitwork
+from mining_engine import TxidTemplate, scan_sequences, MAX_SEQUENCE
+from mining_telemetry import create_telemetry
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# 每个worker进程的挖矿模板，由_init_worker在进程启动时设置一次
+_worker_template = None
+
+def _init_worker(raw_tx, sequence_offset, bitwork):
+    """进程池初始化: 每个worker只接收一次模板，避免每个任务重复传参"""
+    global _worker_template
+    _worker_template = (TxidTemplate(raw_tx, sequence_offset), compile_bitwork(bitwork))
+
+def _mine_chunk(chunk):
+    """
+    在一个sequence区间内挖矿 (从high递减到low，包含两端)
+
+    Returns:
+        tuple: (命中的sequence或None, 本区间实际计算的hash数, 区间, worker名)
+    """
+    high, low = chunk
+    template, bitwork = _worker_template
+    sequence, hashed = scan_sequences(template, high, low, bitwork)
+    return sequence, hashed, chunk, multiprocessing.current_process().name
+
+def split_sequence_range(chunk_size=DEFAULT_CHUNK_SIZE, start=MAX_SEQUENCE, end=0):
+    """按递减顺序把 [end, start] 切分成 (high, low) 区间"""
+    high = start
+    while high >= end:
+        low = max(high - chunk_size + 1, end)
+        yield high, low
+        high = low - 1
+
+def resolve_worker_count(workers):
+    """0或None表示使用全部CPU核心"""
+    if not workers:
+        return os.cpu_count() or 1
+    return workers
+
+def mine_sequence_parallel(template, bitwork, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                           start=MAX_SEQUENCE, end=0, checkpoint=None, telemetry=None):
+    """
+    多进程搜索满足bitwork前缀的sequence
+
+    Args:
+        template: TxidTemplate (每个worker按原始字节重建，hash状态不能跨进程传递)
+        bitwork: bitwork字符串 ("前缀" 或 "前缀.N") 或编译后的Bitwork
+        workers: 进程数，0或None表示全部CPU核心
+        chunk_size: 每个任务的sequence区间大小
+        start: 起始sequence (包含)
+        end: 结束sequence (包含)
+        checkpoint: 可选的MiningCheckpoint，跳过已搜索区间并按worker记录新搜索的区间
+        telemetry: 可选的MiningTelemetry (由调用方启动)，默认创建一个只用于本次搜索的
+
+    Returns:
+        dict: {"sequence", "hashes", "elapsed", "hash_rate"}，未找到返回None
+    """
+    workers = resolve_worker_count(workers)
+    bitwork = compile_bitwork(bitwork)
+    print(f"多进程挖矿: {workers} 个进程, 每个任务 {chunk_size} 个sequence")
+
+    own_telemetry = telemetry is None
+    if own_telemetry:
+        telemetry = create_telemetry(bitwork, "mining").start()
+
+    start_time = time.time()
+    total_hashes = 0
+    found = None
+
+    ranges = checkpoint.remaining_ranges(start, end) if checkpoint else [(start, end)]
+    chunks = (
+        chunk
+        for range_high, range_low in ranges
+        for chunk in split_sequence_range(chunk_size, range_high, range_low)
+    )
+
+    pool = multiprocessing.Pool(
+        processes=workers,
+        initializer=_init_worker,
+        initargs=(bytes(template.raw_tx), template.sequence_offset, bitwork.to_string())
+    )
+    try:
+        for sequence, hashed, chunk, worker in pool.imap_unordered(_mine_chunk, chunks):
+            total_hashes += hashed
+            telemetry.add(hashed)
+            if sequence is not None:
+                found = sequence
+                break
+            if checkpoint:
+                checkpoint.record(worker, *chunk)
+    finally:
+        # 命中后立即终止所有worker
+        pool.terminate()
+        pool.join()
+        if checkpoint:
+            checkpoint.save()
+        if own_telemetry:
+            telemetry.stop()
+
+    elapsed = time.time() - start_time
+    hash_rate = total_hashes / elapsed if elapsed > 0 else 0
+
+    if found is None:
+        return None
+
+    return {
+        "sequence": found,
+        "hashes": total_hashes,
+        "elapsed": elapsed,
+        "hash_rate": hash_rate
+    }
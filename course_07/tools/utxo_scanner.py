@@ -1,66 +1,86 @@
 #!/usr/bin/env python3
 """
 UTXO扫描和选择工具
+(UTXO查询由 course_05/tools/utxo_provider.py 统一提供，同一次运行内按地址缓存；
+ 选中的UTXO通过 course_05/tools/utxo_reservation.py 预留，同时运行的其他脚本不会再选中它；
+ PROVIDER_CONFIG["stream"] 开启时由地址推送在内存中维护UTXO集，选择UTXO不再请求API)
 """
 
-import requests
+import os
+import sys
 
-def get_available_utxos():
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "course_05"))
+
+from tools.utxo_provider import get_provider
+from tools.utxo_reservation import get_reservations
+
+DEFAULT_ADDRESS = "tb1p647tfurqxqauaae4klwkwsaljn7yueg2692hasmp4a082cdtm4yqk2895f"
+
+def get_available_utxos(address=DEFAULT_ADDRESS, owner=None, protect_unavailable=None):
     """
-    实时获取当前可用的UTXO列表（从Blockstream API）
+    实时获取当前可用的UTXO列表 (不包含已被预留或已广播花费的UTXO；owner自己预留的照常返回)
+    protect_unavailable为True时，ord不可用时无法确认是否带铭文/符文的UTXO也不返回
     """
-    url = "https://blockstream.info/testnet/api/address/tb1p647tfurqxqauaae4klwkwsaljn7yueg2692hasmp4a082cdtm4yqk2895f/utxo"
     try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        utxo_list = resp.json()
-        utxos = []
-        for u in utxo_list:
-            utxos.append({
-                "txid": u["txid"],
-                "vout": u["vout"],
-                "amount": u["value"],
-                "note": "API获取"
-            })
-        return utxos
+        utxos = get_provider().get_utxos(address, owner=owner, protect_unavailable=protect_unavailable)
     except Exception as e:
         print(f"[错误] 获取UTXO失败: {e}")
         return []
+    for utxo in utxos:
+        utxo["note"] = f"API获取 ({utxo['source']})"
+    return utxos
 
-def select_best_utxo(min_amount=1500):
+def select_best_utxo(min_amount=1500, address=DEFAULT_ADDRESS, reserve=True, owner=None, ttl=None,
+                     protect_unavailable=None):
     """
     选择最适合的UTXO
     
     Args:
         min_amount: 最小金额要求
+        address: 查询的地址
+        reserve: 是否预留选中的UTXO (在广播或过期前其他脚本不会选中它)
+        owner: 预留者标识，默认 主机名:进程号；使用固定名称 (如任务名) 时重启后优先选回自己预留的UTXO
+        ttl: 预留有效期（秒），默认读取RESERVATION_CONFIG
+        protect_unavailable: 为True时ord不可用也不选无法确认是否带铭文/符文的UTXO (构建commit交易时使用)
     
     Returns:
         dict: 选中的UTXO，如果没有合适的返回None
     """
-    utxos = get_available_utxos()
+    utxos = get_available_utxos(address, owner, protect_unavailable)
     
     print("=== 扫描可用UTXO ===")
     for i, utxo in enumerate(utxos):
         status = "✅" if utxo["amount"] >= min_amount else "❌"
         print(f"  {i+1}. {utxo['txid'][:16]}...:{utxo['vout']} = {utxo['amount']} sats - {utxo['note']} {status}")
     
-    # 选择金额最大且满足要求的UTXO
+    # 满足要求的UTXO
     suitable_utxos = [u for u in utxos if u["amount"] >= min_amount]
     
     if not suitable_utxos:
         print(f"❌ 没有找到满足最小金额 {min_amount} sats 的UTXO")
         return None
     
-    # 返回金额最大的
-    selected = max(suitable_utxos, key=lambda x: x["amount"])
+    # 单输入交易的手续费与选哪个UTXO无关，选满足要求的最小UTXO，大额UTXO留给后续交易，避免钱包被拆碎
+    suitable_utxos.sort(key=lambda x: x["amount"])
+    if owner:
+        # 同名任务重启: 自己已经预留的UTXO排在最前，继续使用同一个UTXO (挖矿检查点按UTXO区分)
+        owned = get_reservations().owned(owner)
+        suitable_utxos.sort(key=lambda u: f"{u['txid']}:{u['vout']}" not in owned)
+    selected = suitable_utxos[0]
+    if reserve:
+        # 其他进程可能刚刚预留了同一个UTXO，预留失败时换下一个
+        selected = next((u for u in suitable_utxos if get_reservations().reserve([u], owner, ttl)), None)
+        if not selected:
+            print(f"❌ 满足要求的UTXO都已被其他脚本预留")
+            return None
     print(f"\n✅ 选择UTXO: {selected['txid'][:16]}...:{selected['vout']} ({selected['amount']} sats)")
     print(f"选择原因: {selected['note']}")
     
     return selected
 
-def show_utxo_list():
+def show_utxo_list(address=DEFAULT_ADDRESS):
     """显示所有UTXO列表"""
-    utxos = get_available_utxos()
+    utxos = get_available_utxos(address)
     print("=== 所有可用UTXO ===")
     for i, utxo in enumerate(utxos):
         print(f"  {i+1}. TxID: {utxo['txid']}")
@@ -72,6 +92,6 @@ def show_utxo_list():
 if __name__ == "__main__":
     show_utxo_list()
     print()
-    selected = select_best_utxo(1500)
+    selected = select_best_utxo(1500, reserve=False)
     if selected:
-        print(f"\n推荐使用: {selected['txid']}:{selected['vout']}")
\ No newline at end of file
+        print(f"\n推荐使用: {selected['txid']}:{selected['vout']}")